@@ -0,0 +1,14 @@
+from agents.backtest_agent import BacktestAgent
+import json
+import time
+
+backtester = BacktestAgent()
+tickers = ["AAPL", "MSFT", "GOOGL", "AMZN", "JPM", "XOM", "JNJ", "PG", "KO", "WMT"]
+
+bars = backtester.fetch_bars(tickers, period="10y")
+backtester.save_bars("downloads/backtest_bars.npz", bars)
+
+start = time.time()
+results = backtester.run(BacktestAgent.load_bars("downloads/backtest_bars.npz"))
+print(f"Backtest took {time.time() - start:.2f}s")
+print(json.dumps(results, indent=2, default=str))
@@ -0,0 +1,67 @@
+from agents.pipeline import Pipeline, Stage
+from agents.portfolio_orchestrator import EarlyExitPolicy, PortfolioOrchestrator
+import asyncio
+import json
+
+# --- Offline: cancel() from on_result stops admission and keeps the results that met the target ---
+admitted = []
+
+
+def source(n=20):
+    for i in range(n):
+        admitted.append(i)
+        yield i
+
+
+async def fetch(i):
+    await asyncio.sleep(0.01 * (i % 3))
+    return i
+
+
+async def recommend(batch):
+    # Both items of a batch finish in the same loop step
+    await asyncio.sleep(0.02)
+    return [{"i": i, "buy": i % 2 == 0} for i in batch]
+
+
+async def run_offline():
+    pipeline = Pipeline([
+        Stage("fetch", fetch, workers=4),
+        Stage("recommend", recommend, workers=1, batch_size=2, batch_wait=0.05),
+    ], max_in_flight=4)
+    buys, reported = [], []
+
+    def on_result(result):
+        reported.append(result["i"])
+        if result["buy"]:
+            buys.append(result["i"])
+            if len(buys) == 2:
+                pipeline.cancel()
+
+    results = await pipeline.arun(source(), on_result=on_result)
+    return results, buys, reported
+
+
+results, buys, reported = asyncio.run(run_offline())
+kept = [r["i"] for r in results]
+print("admitted:", admitted)
+print("kept:", kept, "buys:", buys)
+assert len(admitted) < 20, "admission should stop after cancel()"
+assert len(buys) >= 2 and set(buys) <= set(kept), "results that met the target must be kept"
+assert kept == reported, "every kept result is reported to on_result"
+
+policy = EarlyExitPolicy(target_buys=2, min_sectors=2)
+buy = {"ticker": "A", "stock": {"sector": "Tech"}, "data_output": {"data": {}},
+       "recommendation": {"buy_recommendation": True}}
+assert policy.buy_sector(buy) == "Tech"
+assert policy.buy_sector({**buy, "recommendation": {"buy_recommendation": False}}) is None
+assert not policy.satisfied(["A", "B"], {"Tech"}) and policy.satisfied(["A", "B"], {"Tech", "Energy"})
+print("offline early-exit checks passed")
+
+# --- Live: stops once 3 buys across 2 sectors are in; lower-scored tickers are skipped ---
+orchestrator = PortfolioOrchestrator(early_exit=EarlyExitPolicy(target_buys=3, min_sectors=2))
+results = orchestrator.run(limit=20)
+
+print(json.dumps(results["early_exit"], indent=2))
+print([r["ticker"] for r in results["portfolio_results"]])
+print(json.dumps(results["llm_metrics"], indent=2))
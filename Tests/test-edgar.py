@@ -7,3 +7,10 @@ latest_13f = edgar.get_latest_13f(ticker)
 if latest_13f:
     txt_path = edgar.download_filing(latest_13f)
     print("Downloaded TXT filing path:", txt_path)
+
+# Parsed holdings via the holdings cache (a second call doesn't touch EDGAR)
+holdings = edgar.get_holdings(ticker)
+print(len(holdings), holdings[:3])
+cached = edgar.cached_holdings(ticker)
+assert cached is not None, f"nothing cached for {ticker}: the 13F lookup or download failed"
+print(cached["filing"])
@@ -0,0 +1,75 @@
+# Offline check: IndicatorSet over a ragged (tickers x bars) matrix matches plain per-ticker loops
+from tools.indicators import IndicatorSet, right_align
+import math
+import random
+
+import numpy as np
+
+
+def ewm(xs, alpha):
+    out, prev = [], None
+    for x in xs:
+        prev = x if prev is None else alpha * x + (1 - alpha) * prev
+        out.append(prev)
+    return out
+
+
+def reference(closes, highs, lows, volumes):
+    """Latest value of each indicator for one ticker, computed bar by bar."""
+    n = len(closes)
+    deltas = [closes[i] - closes[i - 1] for i in range(1, n)]
+    gain = ewm([max(d, 0.0) for d in deltas], 1 / 14)
+    loss = ewm([max(-d, 0.0) for d in deltas], 1 / 14)
+    if not deltas:
+        rsi = math.nan
+    elif loss[-1] == 0:
+        rsi = 100.0 if gain[-1] > 0 else 50.0
+    else:
+        rsi = 100 - 100 / (1 + gain[-1] / loss[-1])
+
+    line = [f - s for f, s in zip(ewm(closes, 2 / 13), ewm(closes, 2 / 27))]
+    signal = ewm(line, 2 / 10)
+
+    window = closes[-20:]
+    mean = sum(window) / len(window)
+    sd = math.sqrt(sum((c - mean) ** 2 for c in window) / (len(window) - 1)) if len(window) > 1 else math.nan
+
+    true_range = [highs[0] - lows[0]] + [
+        max(highs[i] - lows[i], abs(highs[i] - closes[i - 1]), abs(lows[i] - closes[i - 1])) for i in range(1, n)]
+    obv = sum(math.copysign(volumes[i], deltas[i - 1]) if deltas[i - 1] else 0.0 for i in range(1, n))
+
+    return {
+        "rsi": rsi,
+        "macd_macd": line[-1], "macd_signal": signal[-1], "macd_hist": line[-1] - signal[-1],
+        "bollinger_middle": mean, "bollinger_upper": mean + 2 * sd, "bollinger_lower": mean - 2 * sd,
+        "atr": ewm(true_range, 1 / 14)[-1],
+        "obv": obv,
+        "drawdown": closes[-1] / max(closes) - 1,
+    }
+
+
+rng = random.Random(3)
+series = []
+for i in range(60):
+    n = rng.choice([1, 2, 15, 40, 250])
+    close, closes, highs, lows, volumes = rng.uniform(10, 400), [], [], [], []
+    for _ in range(n):
+        close *= 1 + rng.gauss(0, 0.02)
+        closes.append(close)
+        highs.append(close * (1 + rng.uniform(0, 0.02)))
+        lows.append(close * (1 - rng.uniform(0, 0.02)))
+        volumes.append(rng.uniform(1e5, 1e6))
+    series.append((closes, highs, lows, volumes))
+
+indicators = IndicatorSet(*(right_align([s[k] for s in series]) for k in range(4)))
+latest = indicators.latest()
+single_row = [IndicatorSet(*(np.array([s[k]]) for k in range(4))).latest() for s in series]
+
+for i, s in enumerate(series):
+    expected = reference(*s)
+    for name, value in expected.items():
+        got, alone = latest[name][i], single_row[i][name][0]
+        assert np.isclose(got, value, rtol=1e-7, atol=1e-6, equal_nan=True), (i, name, got, value)
+        assert np.isclose(got, alone, rtol=1e-9, atol=1e-9, equal_nan=True), (i, name, got, alone)
+
+print(f"{len(series)} tickers x {len(expected)} indicators match the per-ticker reference")
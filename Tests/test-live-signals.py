@@ -0,0 +1,61 @@
+# Offline check: O(1) live updates (new bars and intrabar ticks) match a full recompute
+# of generate_signals over the same history, and survive a save/load round trip
+from agents.signal_agent import SignalAgent
+from tools.indicator_cache import IndicatorCache
+import os
+import random
+import tempfile
+
+rng = random.Random(11)
+ticker = "LIVE"
+
+
+def bar(day, close, volume):
+    return {"Date": f"day-{day}", f"Close_{ticker}": close, f"Volume_{ticker}": volume}
+
+
+def recompute(history, pe_ratio):
+    # Fresh cache each time: a revised bar keeps its date, and this is the reference
+    agent = SignalAgent(cache=IndicatorCache())
+    data = {"price_history": history, "fundamentals": {"pe_ratio": pe_ratio}}
+    return agent.generate_signals({"ticker": ticker, "data": data})["signals"]
+
+
+checked = 0
+for seed_bars in (0, 1, 12, 30, 80):
+    close = rng.uniform(50, 300)
+    history = []
+    for day in range(seed_bars):
+        close *= 1 + rng.gauss(0, 0.02)
+        history.append(bar(day, close, rng.uniform(1e5, 1e6)))
+
+    live = SignalAgent()
+    if history:
+        live.seed_live({"ticker": ticker, "data": {"price_history": list(history)}})
+
+    for day in range(seed_bars, seed_bars + 150):
+        pe_ratio = rng.uniform(10, 50)
+        close *= 1 + rng.gauss(0, 0.02)
+        volume = rng.uniform(1e5, 1e6) * (4 if rng.random() < 0.1 else 1)
+        new_bar = not history or rng.random() < 0.6
+        if new_bar:
+            history.append(bar(day, close, volume))
+        else:
+            history[-1] = bar(day - 1, close, volume)  # intrabar tick revises the current bar
+        signals = live.update_live(ticker, close, volume, pe_ratio=pe_ratio, new_bar=new_bar)["signals"]
+        expected = recompute(history, pe_ratio)
+        assert signals == expected, (seed_bars, day, new_bar, signals, expected)
+        checked += 1
+
+    # Persisted state resumes the stream with the same signals
+    path = os.path.join(tempfile.mkdtemp(), "live_state.json")
+    live.save_live_state(path)
+    restored = SignalAgent()
+    restored.load_live_state(path)
+    close *= 1.01
+    history.append(bar(seed_bars + 150, close, 5e5))
+    a = live.update_live(ticker, close, 5e5, pe_ratio=20)["signals"]
+    b = restored.update_live(ticker, close, 5e5, pe_ratio=20)["signals"]
+    assert a == b == recompute(history, 20), (a, b)
+
+print(f"{checked} live updates match a full recompute")
@@ -0,0 +1,20 @@
+# Offline throughput check against the local OpenAI-compatible stub server
+from agents.recommendation_agent import RecommendationAgent
+from tools.openai_stub_server import start_stub_server
+import time
+
+server = start_stub_server(port=8001, latency=0.5, rate_limit=0.1)
+agent = RecommendationAgent(base_url="http://localhost:8001/v1", use_cache=False, max_concurrency=10)
+agent.metrics.start_run("throughput-test")
+
+items = [({"ticker": f"T{i}", "data": {"price": 100 + i}}, None, None) for i in range(20)]
+
+start = time.time()
+recommendations = agent.generate_recommendations(items)
+elapsed = time.time() - start
+
+print(f"{len(recommendations)} recommendations in {elapsed:.2f}s "
+      f"(sequential would be ~{0.5 * len(items):.0f}s)")
+print([r["buy_recommendation"] for r in recommendations])
+print(agent.metrics.summary())
+server.shutdown()
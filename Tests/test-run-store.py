@@ -0,0 +1,46 @@
+from tools.run_store import RunStore
+import json
+import os
+import tempfile
+import time
+
+# Writes two synthetic orchestrator outputs into a temp DB, then queries the history back
+store = RunStore(os.path.join(tempfile.mkdtemp(), "runs.sqlite"))
+
+
+def output(run_id, score, price, timing, buy):
+    return {
+        "run_id": run_id,
+        "portfolio_results": [{
+            "ticker": "AAPL",
+            "score": score,
+            "data": {"price": price, "fundamentals": {"sector": "Technology", "market_cap": 3e12}},
+            "signals": {"bullish_trend": True, "short_term_trend": "upward", "volume_spike": False},
+            "timing": {"optimal_timing": timing, "confidence": 0.8, "reasoning": "Bullish."},
+            "recommendation": {"buy_recommendation": buy, "suggested_amount": 50, "rationale": "Strong trend."},
+            "risk_flags": [],
+        }],
+        "llm_metrics": {"cost_usd": 0.002},
+    }
+
+
+now = time.time()
+store.record_run(output("run-1", 0.61, 190.0, "Consider buying", False), created=now - 2 * 86400)
+store.record_run(output("run-2", 0.74, 195.5, "Buy now", True), created=now - 3600)
+store.record_allocations("run-2", [{"Ticker": "AAPL", "Weight (%)": 100.0, "Allocation($)": 100.0}], budget=100)
+
+runs = store.runs(limit=5)
+history = store.score_history("AAPL", days=90)
+calls = store.buy_now_calls(days=7)
+allocations = store.allocation_history("AAPL", days=90)
+print(json.dumps(runs, indent=2))
+print(json.dumps(history, indent=2))
+print(json.dumps(calls, indent=2))
+print(json.dumps(allocations, indent=2))
+
+assert [r["run_id"] for r in runs] == ["run-2", "run-1"]
+assert [(h["run_id"], h["score"], h["price"]) for h in history] == [("run-1", 0.61, 190.0), ("run-2", 0.74, 195.5)]
+assert [(c["run_id"], c["ticker"], c["buy"]) for c in calls] == [("run-2", "AAPL", 1)]
+assert [(a["run_id"], a["amount"]) for a in allocations] == [("run-2", 100.0)]
+assert store.score_history("AAPL", days=1)[0]["run_id"] == "run-2"
+print("run store checks passed")
@@ -0,0 +1,19 @@
+from datetime import datetime
+import tempfile
+from scheduler import MARKET_TZ, next_run_time, publish_snapshot
+from agents.portfolio_orchestrator import PortfolioOrchestrator
+from tools.snapshot_store import SnapshotStore
+
+# Upcoming schedule slots from now (hourly in market hours + 16:15 ET)
+when = datetime.now(MARKET_TZ)
+for _ in range(5):
+    when = next_run_time(when)
+    print(when.strftime("%a %Y-%m-%d %H:%M %Z"))
+
+# One run, published and read back the way the web app loads it (in a temp dir, not the repo tree)
+with tempfile.TemporaryDirectory() as snapshot_dir:
+    store = SnapshotStore(snapshot_dir, keep=3)
+    version = publish_snapshot(PortfolioOrchestrator(), store, limit=5)
+    snapshot = store.latest()
+    print(version, snapshot["version"] == version, store.versions())
+    print([r["ticker"] for r in snapshot["output"]["portfolio_results"]], snapshot["allocation"]["allocations"])
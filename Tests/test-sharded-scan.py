@@ -0,0 +1,17 @@
+from agents.market_scanner_agent import MarketScannerAgent
+
+if __name__ == "__main__":  # spawn-based workers import this file
+    scanner = MarketScannerAgent()
+    results = scanner.scan_universe_sharded(limit=40, workers=4)
+
+    print("\n=== Top 10 Picks (sharded) ===")
+    for stock in results[:10]:
+        print(f"{stock['ticker']} | Score: {stock['score']} | Sector: {stock['sector']}")
+
+    # Merge of hand-made shards matches a single sorted ranking
+    shards = [
+        [(80, 0, {"ticker": "A", "score": 80}), (50, 2, {"ticker": "C", "score": 50})],
+        [(80, 3, {"ticker": "D", "score": 80}), (60, 1, {"ticker": "B", "score": 60})],
+    ]
+    merged = MarketScannerAgent.merge_shards(shards)
+    print([s["ticker"] for s in merged])  # ['A', 'D', 'B', 'C']
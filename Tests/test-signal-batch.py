@@ -0,0 +1,66 @@
+# Offline check: batch signals (generate_signals_many) match one-ticker generate_signals
+# and the original scalar formulas, including tickers with no valid closes
+from agents.signal_agent import SignalAgent
+from tools.indicator_cache import IndicatorCache
+import random
+
+
+def reference_signals(closes, volumes, price, pe_ratio, pe_threshold=30, volume_multiplier=1.5):
+    """The per-ticker arithmetic SignalAgent used before batching."""
+    if not closes:
+        return None
+    price = closes[-1] if price is None else price
+    avg_50 = sum(closes[-50:]) / min(len(closes), 50)
+    avg_10 = sum(closes[-10:]) / min(len(closes), 10)
+    signals = {
+        "bullish_trend": price > avg_50,
+        "short_term_trend": "upward" if avg_10 > avg_50 else ("downward" if avg_10 < avg_50 else "neutral"),
+        "volume_spike": len(volumes) >= 20 and volumes[-1] > volume_multiplier * sum(volumes[-20:]) / 20,
+    }
+    if pe_ratio is not None:
+        signals["pe_signal"] = pe_ratio < pe_threshold
+    return signals
+
+
+def random_output(ticker, rng):
+    n = rng.choice([0, 1, 5, 19, 20, 49, 50, 120])
+    close, history = rng.uniform(20, 500), []
+    for day in range(n):
+        close *= 1 + rng.gauss(0, 0.02)
+        bar = {"Date": f"2024-01-{day:03d}", f"Close_{ticker}": close,
+               f"Volume_{ticker}": rng.uniform(1e5, 1e6) * (3 if rng.random() < 0.1 else 1)}
+        if rng.random() < 0.03:
+            bar[f"Close_{ticker}"] = None  # a missing close, skipped like a missing bar
+        history.append(bar)
+    if n and rng.random() < 0.1:
+        for bar in history:
+            bar[f"Close_{ticker}"] = None  # bars without a single valid close
+    data = {"price_history": history}
+    if rng.random() < 0.7:
+        data["price"] = close * rng.uniform(0.97, 1.03)
+    if rng.random() < 0.7:
+        data["fundamentals"] = {"pe_ratio": rng.uniform(5, 60)}
+    return {"ticker": ticker, "data": data}
+
+
+rng = random.Random(7)
+agent = SignalAgent(cache=IndicatorCache())
+outputs = [random_output(f"T{i}", rng) for i in range(400)]
+batch = agent.generate_signals_many(outputs)
+
+checked = invalid = 0
+for output, from_batch in zip(outputs, batch):
+    single = agent.generate_signals(output)["signals"]
+    assert from_batch["signals"] == single, (output["ticker"], from_batch["signals"], single)
+
+    closes, volumes, price, pe_ratio = agent._extract_series(output)
+    expected = reference_signals(closes, volumes,
+                                 None if price != price else price, None if pe_ratio != pe_ratio else pe_ratio)
+    if expected is None:
+        assert single["bullish_trend"] is None and "error" in single, single
+        invalid += 1
+    else:
+        assert single == expected, (output["ticker"], single, expected)
+    checked += 1
+
+print(f"{checked} tickers match (batch == per-ticker == reference), {invalid} without valid closes")
@@ -0,0 +1,20 @@
+# Offline check against the local stub server: streamed batch partials only report requested tickers
+from agents.recommendation_agent import RecommendationAgent
+from tools.openai_stub_server import start_stub_server
+
+server = start_stub_server(port=8002, latency=0.3)
+agent = RecommendationAgent(base_url="http://localhost:8002/v1", use_cache=False, batch_size=4)
+
+# Ticker lengths vary so stream chunks end mid-ticker ("G", "T") somewhere in each reply
+for requested in (["AAPL", "AMZN", "GOOGL", "MSFT"], ["JPM", "GOOGL", "TSLA", "AMD"]):
+    items = [({"ticker": t, "data": {"price": 100 + i}}, None, None) for i, t in enumerate(requested)]
+    reported = []
+    recommendations = agent.generate_recommendations(
+        items, on_partial=lambda ticker, fields: reported.append(ticker))
+
+    print("tickers seen by on_partial:", sorted(set(reported)))
+    print([(r["ticker"], r["buy_recommendation"]) for r in recommendations])
+    assert reported, "expected streamed partials"
+    assert set(reported) <= set(requested), f"truncated tickers reached on_partial: {set(reported) - set(requested)}"
+server.shutdown()
+print("streaming partial checks passed")
@@ -0,0 +1,47 @@
+# Offline check: generate_timing_batch matches per-ticker generate_timing (label, confidence,
+# reasoning), including rows with no valid closes
+from agents.signal_agent import SignalAgent
+from agents.timing_agent import TimingAgent
+from tools.indicator_cache import IndicatorCache
+from tools.indicators import right_align
+import random
+
+rng = random.Random(5)
+signal_agent = SignalAgent(cache=IndicatorCache())
+timing_agent = TimingAgent(cache=IndicatorCache())
+
+outputs = []
+for i in range(300):
+    ticker = f"T{i}"
+    close, history = rng.uniform(20, 300), []
+    for day in range(rng.choice([1, 8, 30, 60, 90])):
+        close *= 1 + rng.gauss(0.001, 0.02)
+        history.append({"Date": f"day-{day}", f"Close_{ticker}": close,
+                        f"Volume_{ticker}": rng.uniform(1e5, 1e6) * (3 if rng.random() < 0.15 else 1)})
+    if rng.random() < 0.1:
+        for bar in history:
+            bar[f"Close_{ticker}"] = None  # bars, but no valid close
+    data = {"price_history": history}
+    if rng.random() < 0.6:
+        data["fundamentals"] = {"pe_ratio": rng.uniform(5, 60)}
+    outputs.append({"ticker": ticker, "data": data})
+
+series = [signal_agent._extract_series(o) for o in outputs]
+signal_batch = signal_agent.generate_signals_batch(
+    [o["ticker"] for o in outputs],
+    right_align([s[0] for s in series]),
+    right_align([s[1] for s in series]),
+    prices=[s[2] for s in series],
+    pe_ratios=[s[3] for s in series],
+)
+batch = timing_agent.generate_timing_batch(signal_batch).to_records()
+
+invalid = 0
+for output, from_batch in zip(outputs, batch):
+    single = timing_agent.generate_timing(output, signal_agent.generate_signals(output))
+    got = (from_batch["optimal_timing"], from_batch["confidence"], from_batch["reasoning"])
+    expected = (single["optimal_timing"], single["confidence"], single["reasoning"])
+    assert got == expected, (output["ticker"], got, expected)
+    invalid += single["optimal_timing"] is None
+
+print(f"{len(outputs)} tickers match (batch == per-ticker), {invalid} without valid closes")
@@ -0,0 +1,10 @@
+from agents.backtest_agent import BacktestAgent
+from agents.walk_forward_optimizer import WalkForwardOptimizer
+import json
+
+# Reuses the bars stored by test-backtest.py
+bars = BacktestAgent.load_bars("downloads/backtest_bars.npz")
+
+optimizer = WalkForwardOptimizer(horizon=20, workers=4)
+results = optimizer.run(bars)
+print(json.dumps(results, indent=2, default=str))
@@ -0,0 +1,146 @@
+import datetime
+from typing import Dict, Optional
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from agents.signal_agent import SignalAgent
+from agents.timing_agent import TimingAgent, encode_signal_batch
+from tools.yahoo_finance import YahooFinanceTool
+
+FORWARD_HORIZONS = (5, 20, 60)
+
+
+def forward_returns(closes: np.ndarray, horizon: int) -> np.ndarray:
+    """Return from each bar's close to the close `horizon` bars later (NaN past the end)."""
+    out = np.full(closes.shape, np.nan)
+    if closes.shape[1] > horizon:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out[:, :-horizon] = closes[:, horizon:] / closes[:, :-horizon] - 1
+    return out
+
+
+def forward_drawdown(closes: np.ndarray, horizon: int) -> np.ndarray:
+    """Worst close over the next `horizon` bars relative to today's close (<= 0)."""
+    out = np.full(closes.shape, np.nan)
+    n_bars = closes.shape[1]
+    if n_bars > horizon:
+        lows = np.fmin.reduce(sliding_window_view(closes[:, 1:], horizon, axis=1), axis=-1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out[:, :n_bars - horizon] = np.minimum(lows / closes[:, :n_bars - horizon] - 1, 0.0)
+    return out
+
+
+def _summarize(fwd: np.ndarray, drawdown: np.ndarray, mask: np.ndarray) -> Dict:
+    count = int(mask.sum())
+    if count == 0:
+        return {"count": 0, "hit_rate": None, "mean_return": None, "median_return": None,
+                "mean_drawdown": None, "worst_drawdown": None}
+    r, dd = fwd[mask], drawdown[mask]
+    return {
+        "count": count,
+        "hit_rate": round(float((r > 0).mean()), 4),
+        "mean_return": round(float(r.mean()), 4),
+        "median_return": round(float(np.median(r)), 4),
+        "mean_drawdown": round(float(np.nanmean(dd)), 4),
+        "worst_drawdown": round(float(np.nanmin(dd)), 4),
+    }
+
+
+class BacktestAgent:
+    """
+    Replays the SignalAgent and TimingAgent rules over stored daily bars for
+    a whole universe and measures what each timing call was worth:
+    hit rates, forward returns and forward drawdowns per label and horizon.
+
+    The whole ticker x date grid is evaluated with array operations; there is
+    no Python loop over days or tickers. P/E is taken as given (usually today's
+    value), so the P/E rule carries look-ahead bias in long replays.
+    """
+
+    def __init__(self, signal_agent: Optional[SignalAgent] = None, timing_agent: Optional[TimingAgent] = None,
+                 horizons=FORWARD_HORIZONS, warmup: int = 50):
+        self.signal_agent = signal_agent or SignalAgent()
+        self.timing_agent = timing_agent or TimingAgent()
+        self.horizons = tuple(horizons)
+        self.warmup = warmup
+
+    # --- Stored bars ---
+    @staticmethod
+    def fetch_bars(tickers: list, period: str = "10y") -> Optional[Dict]:
+        return YahooFinanceTool().get_price_matrix(tickers, period=period)
+
+    @staticmethod
+    def save_bars(path: str, bars: Dict):
+        np.savez_compressed(path, tickers=np.asarray(bars["tickers"]), dates=bars["dates"],
+                            closes=bars["closes"], volumes=bars["volumes"])
+
+    @staticmethod
+    def load_bars(path: str) -> Dict:
+        with np.load(path, allow_pickle=False) as f:
+            return {
+                "tickers": f["tickers"].tolist(),
+                "dates": f["dates"],
+                "closes": f["closes"],
+                "volumes": f["volumes"],
+            }
+
+    # --- Replay ---
+    def score_grid(self, closes: np.ndarray, volumes: np.ndarray = None, pe_ratios=None):
+        """Timing confidence and decision index (into timing_agent.labels) for every ticker x bar."""
+        grid = self.signal_agent.generate_signals_grid(closes, volumes, pe_ratios)
+        confidence, decision, _ = self.timing_agent.score_codes(encode_signal_batch(grid))
+        return grid["valid"], confidence, decision
+
+    def run(self, bars: Dict, pe_ratios=None) -> Dict:
+        """
+        Backtest the timing rules over `bars` (as returned by fetch_bars/load_bars).
+        Returns per-horizon stats for each timing label plus an unconditional
+        baseline, and per-ticker stats for the first label ("Buy now").
+        """
+        closes = np.asarray(bars["closes"], dtype=float)
+        volumes = bars.get("volumes")
+        tickers = list(bars["tickers"])
+        dates = bars.get("dates")
+
+        valid, confidence, decision = self.score_grid(closes, volumes, pe_ratios)
+        eligible = valid.copy()
+        eligible[:, :self.warmup] = False
+
+        labels = self.timing_agent.labels
+        results = {
+            "generated_time": datetime.datetime.utcnow().isoformat(),
+            "tickers": len(tickers),
+            "bars": closes.shape[1],
+            "start": str(dates[0]) if dates is not None and len(dates) else None,
+            "end": str(dates[-1]) if dates is not None and len(dates) else None,
+            "horizons": {},
+            "per_ticker": [],
+        }
+
+        for h in self.horizons:
+            fwd = forward_returns(closes, h)
+            dd = forward_drawdown(closes, h)
+            scored = eligible & ~np.isnan(fwd)
+            stats = {"All bars": _summarize(fwd, dd, scored)}
+            for k, label in enumerate(labels):
+                stats[label] = _summarize(fwd, dd, scored & (decision == k))
+            results["horizons"][h] = stats
+
+            if h == self.horizons[0]:
+                top = scored & (decision == 0)
+                calls = top.sum(axis=1)
+                hits = (top & (fwd > 0)).sum(axis=1)
+                mean_ret = np.where(top, fwd, 0.0).sum(axis=1)
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    hit_rate = hits / calls
+                    mean_ret = mean_ret / calls
+                results["per_ticker"] = [
+                    {
+                        "ticker": t,
+                        "calls": int(calls[i]),
+                        "hit_rate": None if calls[i] == 0 else round(float(hit_rate[i]), 4),
+                        "mean_return": None if calls[i] == 0 else round(float(mean_ret[i]), 4),
+                    }
+                    for i, t in enumerate(tickers)
+                ]
+
+        return results
@@ -108,10 +108,13 @@
 #
 #         return data
 
+import asyncio
 import datetime
 from tools.yahoo_finance import YahooFinanceTool
 from tools.edgar import EdgarTool
 from pathlib import Path
+from tools.tracing import traced
+from tools.async_utils import run_sync
 
 class DataAgent:
     """
@@ -123,6 +126,11 @@ class DataAgent:
         self.yahoo = YahooFinanceTool()
         self.edgar = EdgarTool(user_agent="MyStockApp/0.1 (email@example.com)")
 
+    def set_context(self, context):
+        """Share upstream responses with the other agents for one run (see tools/run_context.py)."""
+        self.yahoo.context = context
+        self.edgar.context = context
+
     def download_latest_13f(self, ticker: str):
         """
         Download the latest 13F filing for the given ticker.
@@ -154,7 +162,18 @@ class DataAgent:
             return None
 
 
-    def fetch_data(self, ticker: str, fetch_earnings=True, fetch_13f=True) -> dict:
+    def fetch_data(self, ticker: str, fetch_earnings=True, fetch_13f=False) -> dict:
+        """Sync wrapper around afetch_data (see tools.async_utils.run_sync)."""
+        return run_sync(self.afetch_data(ticker, fetch_earnings=fetch_earnings, fetch_13f=fetch_13f))
+
+    @traced("data_agent.fetch_data")
+    async def afetch_data(self, ticker: str, fetch_earnings=True, fetch_13f=False) -> dict:
+        """
+        Fetch every source for ticker concurrently (blocking tool calls run in
+        the default executor). Same result layout as the original sequential fetch.
+        EDGAR is opt-in (fetch_13f=True downloads the latest 13F filing); for
+        parsed holdings use EdgarTool.get_holdings, which is cached.
+        """
         result = {
             "ticker": ticker,
             "fetch_time": datetime.datetime.utcnow().isoformat(),
@@ -163,59 +182,50 @@ class DataAgent:
         }
 
         # --- Yahoo Finance Summary ---
-        try:
-            summary = self.yahoo.get_summary(ticker)
-            result["data"]["summary"] = summary
-            result["data"]["price"] = self.yahoo.get_current_price(ticker)
-            result["sources"].append("YahooFinance")
-        except Exception as e:
-            result["data"]["summary"] = None
-            result["data"]["price"] = None
-            result["sources"].append(f"YahooFinance_failed:{str(e)}")
+        async def summary():
+            summary, price = await asyncio.gather(self.yahoo.aget_summary(ticker),
+                                                  self.yahoo.aget_current_price(ticker))
+            return {"summary": summary, "price": price}
 
         # --- Yahoo Recommendations ---
-        try:
-            recommendations = self.yahoo.get_recommendations(ticker)
-            result["data"]["recommendations"] = recommendations
-            result["sources"].append("YahooRecommendations")
-        except Exception as e:
-            result["data"]["recommendations"] = None
-            result["sources"].append(f"YahooRecommendations_failed:{str(e)}")
+        async def recommendations():
+            return {"recommendations": await self.yahoo.aget_recommendations(ticker)}
 
         # --- Yahoo Fundamentals ---
-        try:
-            fundamentals = self.yahoo.get_fundamentals(ticker)
-            result["data"]["fundamentals"] = fundamentals
-            result["sources"].append("YahooFundamentals")
-        except Exception as e:
-            result["data"]["fundamentals"] = None
-            result["sources"].append(f"YahooFundamentals_failed:{str(e)}")
+        async def fundamentals():
+            return {"fundamentals": await self.yahoo.aget_fundamentals(ticker)}
 
         # --- Yahoo Price History ---
-        if fetch_earnings:
-            try:
-                price_history = self.yahoo.get_price_history(ticker)
-                result["data"]["price_history"] = price_history
-                result["sources"].append("YahooPriceHistory")
-            except Exception as e:
-                result["data"]["price_history"] = None
-                result["sources"].append(f"YahooPriceHistory_failed:{str(e)}")
+        async def price_history():
+            return {"price_history": await self.yahoo.aget_price_history(ticker)}
 
         # --- Edgar 13F Filings ---
+        async def filings():
+            latest_filing = await self.edgar.aget_latest_13f(ticker)
+            filing = dict(latest_filing or {})
+            # Optionally download filing
+            if latest_filing and latest_filing.get("txt_url"):
+                filing["downloaded_file"] = await self.edgar.adownload_filing(latest_filing)
+            return {"filings": filing}
+
+        # (source label, fetch, values on failure), in result order
+        parts = [
+            ("YahooFinance", summary, {"summary": None, "price": None}),
+            ("YahooRecommendations", recommendations, {"recommendations": None}),
+            ("YahooFundamentals", fundamentals, {"fundamentals": None}),
+        ]
+        if fetch_earnings:
+            parts.append(("YahooPriceHistory", price_history, {"price_history": None}))
         if fetch_13f:
-            try:
-                cik = self.edgar.get_cik(ticker)
-                latest_filing = self.edgar.get_latest_13f(cik)
-                result["data"]["filings"] = latest_filing or {}
-                result["sources"].append("EDGAR")
-
-                # Optionally download filing
-                if latest_filing and latest_filing.get("url"):
-                    downloaded_file = self.edgar.download_filing(latest_filing["url"])
-                    result["data"]["filings"]["downloaded_file"] = downloaded_file
-
-            except Exception as e:
-                result["data"]["filings"] = {}
-                result["sources"].append(f"EDGAR_failed:{str(e)}")
+            parts.append(("EDGAR", filings, {"filings": {}}))
+
+        outcomes = await asyncio.gather(*(fetch() for _, fetch, _ in parts), return_exceptions=True)
+        for (label, _, on_failure), outcome in zip(parts, outcomes):
+            if isinstance(outcome, BaseException):
+                result["data"].update(on_failure)
+                result["sources"].append(f"{label}_failed:{str(outcome)}")
+            else:
+                result["data"].update(outcome)
+                result["sources"].append(label)
 
         return result
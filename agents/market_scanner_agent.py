@@ -141,8 +141,87 @@
 
 
 import yfinance as yf
+import asyncio
 import random
 import statistics
+import heapq
+import ipaddress
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import pickle
+from multiprocessing.connection import AuthenticationError, Client, Listener
+from tools.yahoo_finance import YahooFinanceTool
+from tools.tracing import traced
+
+
+def _shard_authkey() -> bytes:
+    """
+    Shared secret for shard connections, from SCANNER_AUTHKEY. There is no
+    default: Listener/Client unpickle what they receive, so a known key would
+    let anyone who can reach a worker run code on it.
+    """
+    key = os.getenv("SCANNER_AUTHKEY")
+    if not key:
+        raise RuntimeError("SCANNER_AUTHKEY must be set to use remote shard workers")
+    return key.encode()
+
+
+def _is_loopback(host: str) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def _scan_shard_worker(shard):
+    """Process-pool entry point: scan one (offset, tickers) shard."""
+    offset, tickers = shard
+    return MarketScannerAgent(universe=tickers).scan_shard(tickers, offset=offset)
+
+
+def _scan_shard_remote(address, shard):
+    """Send one shard to a worker node started with serve_shard_worker()."""
+    with Client(address, authkey=_shard_authkey()) as conn:
+        conn.send(shard)
+        return conn.recv()
+
+
+def _parse_shard(payload):
+    """Validate a received (offset, tickers) shard."""
+    offset, tickers = payload
+    if not isinstance(offset, int) or not isinstance(tickers, (list, tuple)) \
+            or not all(isinstance(t, str) for t in tickers):
+        raise ValueError("shard must be (int offset, list of ticker strings)")
+    return offset, list(tickers)
+
+
+def serve_shard_worker(address=("localhost", 6001), authkey: bytes = None, allow_remote: bool = False):
+    """
+    Run a scanner worker node on a local socket.
+    Each connection sends an (offset, tickers) shard and receives the
+    compact partial ranking produced by scan_shard().
+    Binding anything but a loopback address needs allow_remote=True; the
+    authkey (default: SCANNER_AUTHKEY) is then the only thing guarding it.
+    """
+    authkey = authkey or _shard_authkey()
+    if not allow_remote and not _is_loopback(address[0]):
+        raise ValueError(f"Refusing to listen on non-loopback address {address[0]!r} without allow_remote=True")
+    with Listener(address, authkey=authkey) as listener:
+        print(f"[MarketScanner] Shard worker listening on {address}")
+        while True:
+            # A bad client (wrong authkey, dropped connection, malformed shard) only loses its own request
+            try:
+                with listener.accept() as conn:
+                    offset, tickers = _parse_shard(conn.recv())
+                    agent = MarketScannerAgent(universe=tickers)
+                    conn.send(agent.scan_shard(tickers, offset=offset))
+            except (AuthenticationError, EOFError, ConnectionError, pickle.UnpicklingError,
+                    ValueError, TypeError) as e:
+                print(f"[MarketScanner] Rejected shard request: {type(e).__name__}: {e}")
+
 
 class MarketScannerAgent:
     """
@@ -152,8 +231,13 @@ class MarketScannerAgent:
     - Produces a ranked list of stocks with composite 'score'.
     """
 
-    def __init__(self):
-        self.default_universe = self._load_sp500_tickers()
+    def __init__(self, universe=None):
+        self.default_universe = universe or self._load_sp500_tickers()
+        self.yahoo = YahooFinanceTool()
+
+    def set_context(self, context):
+        """Share upstream responses with the other agents for one run (see tools/run_context.py)."""
+        self.yahoo.context = context
 
     # def _load_sp500_tickers(self):
     #     """Load S&P 500 tickers from Wikipedia (via yfinance fallback)."""
@@ -197,11 +281,11 @@ class MarketScannerAgent:
             "XOM", "CVX", "CSCO", "ORCL", "MRK", "ABBV", "T", "VZ", "WMT", "MCD"
         ]
 
+    @traced("scanner.analyze_ticker", source="yahoo")
     def _analyze_ticker(self, ticker: str):
         """Analyze single ticker and compute score."""
         try:
-            stock = yf.Ticker(ticker)
-            info = stock.info
+            info = self.yahoo.get_info(ticker)
 
             price = info.get("currentPrice") or info.get("previousClose")
             sector = info.get("sector", "Unknown")
@@ -246,14 +330,27 @@ class MarketScannerAgent:
         except Exception as e:
             return {"ticker": ticker, "error": str(e)}
 
+    def tickers_to_scan(self, tickers=None, limit=50):
+        """The tickers a scan covers: the given list (or the default universe), cut to limit."""
+        tickers = tickers or self.default_universe
+        return tickers[:limit] if limit else tickers
+
+    def analyze_for_pipeline(self, ticker: str):
+        """Pipeline stage: the scan result for one ticker, or None if it failed."""
+        result = self._analyze_ticker(ticker)
+        return None if "error" in result else result
+
+    async def aanalyze_for_pipeline(self, ticker: str):
+        """Async analyze_for_pipeline; the Yahoo calls run in the default executor."""
+        return await asyncio.to_thread(self.analyze_for_pipeline, ticker)
+
     def scan_universe(self, tickers=None, limit=50):
         """
         Scan tickers and rank them.
         - If tickers=None, scans default S&P 500 universe.
         - limit: number of stocks to scan (default 50 for speed).
         """
-        tickers = tickers or self.default_universe
-        tickers = tickers[:limit] if limit else tickers
+        tickers = self.tickers_to_scan(tickers, limit)
 
         results = []
         for t in tickers:
@@ -264,3 +361,67 @@ class MarketScannerAgent:
         # Sort by score
         results_sorted = sorted(results, key=lambda x: x.get("score", 0), reverse=True)
         return results_sorted
+
+    # --- Sharded scanning ---
+    def scan_shard(self, tickers, offset=0):
+        """
+        Scan one shard of the universe.
+        Returns a compact partial ranking: a list of (score, index, result)
+        tuples sorted by score (desc), where index is the ticker's position
+        in the full universe so ties merge in the same order as a single scan.
+        """
+        ranking = []
+        for i, t in enumerate(tickers):
+            result = self._analyze_ticker(t)
+            if "error" not in result:
+                ranking.append((result.get("score", 0), offset + i, result))
+        ranking.sort(key=lambda r: (-r[0], r[1]))
+        return ranking
+
+    @staticmethod
+    def merge_shards(rankings):
+        """
+        Merge partial rankings from scan_shard() into one global ranking,
+        identical to what scan_universe() returns for the same results.
+        """
+        merged = heapq.merge(*rankings, key=lambda r: (-r[0], r[1]))
+        return [result for _, _, result in merged]
+
+    @staticmethod
+    def _make_shards(tickers, n_shards):
+        size = -(-len(tickers) // max(1, n_shards))  # ceil division
+        return [(i, tickers[i:i + size]) for i in range(0, len(tickers), size)]
+
+    def scan_universe_sharded(self, tickers=None, limit=50, workers=4, nodes=None):
+        """
+        Scan tickers across worker processes (or worker nodes) and merge.
+        - workers: number of local processes / shards.
+        - nodes: optional list of (host, port) addresses running
+          serve_shard_worker(); shards are dispatched round-robin to them.
+        """
+        tickers = self.tickers_to_scan(tickers, limit)
+        if not tickers:
+            return []
+
+        if nodes:
+            shards = self._make_shards(tickers, len(nodes))
+            with ThreadPoolExecutor(max_workers=len(shards)) as pool:
+                futures = [
+                    pool.submit(_scan_shard_remote, nodes[i % len(nodes)], shard)
+                    for i, shard in enumerate(shards)
+                ]
+                rankings = [f.result() for f in futures]
+        else:
+            shards = self._make_shards(tickers, workers)
+            with ProcessPoolExecutor(max_workers=len(shards)) as pool:
+                rankings = list(pool.map(_scan_shard_worker, shards))
+
+        return self.merge_shards(rankings)
+
+
+if __name__ == "__main__":
+    # Start a worker node: SCANNER_AUTHKEY=... python -m agents.market_scanner_agent localhost:6001
+    # (add --allow-remote to listen on a non-loopback address)
+    args = [a for a in sys.argv[1:] if a != "--allow-remote"]
+    host, _, port = (args[0] if args else "localhost:6001").partition(":")
+    serve_shard_worker((host, int(port)), allow_remote="--allow-remote" in sys.argv[1:])
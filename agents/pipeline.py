@@ -0,0 +1,198 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+from tools.async_utils import run_sync
+
+
+class Stage:
+    """
+    One step of a Pipeline. fn is a coroutine function; at most `workers`
+    calls of it run at once.
+
+    fn(item) returns the item for the next stage, or None to drop it.
+    With batch_size > 1, fn receives a list of up to batch_size items
+    (whatever arrives within batch_wait seconds) and returns a list; up to
+    `workers` batches run at once.
+    """
+
+    def __init__(self, name: str, fn: Callable[..., Awaitable], workers: int = 1,
+                 batch_size: int = 1, batch_wait: float = 0.05):
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self.batch_wait = batch_wait
+
+
+class AsyncBatcher:
+    """
+    Collects items submitted by concurrent coroutines into batches of up to
+    batch_size, waiting at most batch_wait for stragglers, and runs
+    fn(batch) -> results once per batch. Each submit() gets its own result.
+    """
+
+    def __init__(self, fn: Callable[[List], Awaitable[List]], batch_size: int = 8, batch_wait: float = 0.05):
+        self.fn = fn
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self._pending = []
+        self._timer = None
+        self._tasks = set()
+
+    async def submit(self, item):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.batch_wait, self._flush)
+        return await future
+
+    def cancel(self):
+        """Cancel queued items and every batch still running."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        for _, future in self._pending:
+            future.cancel()
+        self._pending = []
+        for task in list(self._tasks):
+            task.cancel()
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        # Submitters that were cancelled while waiting don't need a result
+        batch = [(item, future) for item, future in self._pending if not future.done()]
+        self._pending = []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch):
+        try:
+            results = await self.fn([item for item, _ in batch])
+        except asyncio.CancelledError:
+            for _, future in batch:
+                future.cancel()
+            raise
+        except BaseException as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+
+class Pipeline:
+    """
+    Streams items through a chain of async stages, each with its own
+    concurrency limit, so stage k works on item i while stage k+1 is still
+    on item i-1. At most max_in_flight items are admitted at once, which
+    keeps a fast source from running arbitrarily far ahead of a slow stage.
+    End-to-end latency tends towards the slowest stage instead of the sum
+    of all stages times the number of items.
+    """
+
+    def __init__(self, stages: List[Stage], max_in_flight: int = 64):
+        self.stages = stages
+        self.max_in_flight = max_in_flight
+        self.stats: Dict[str, Dict] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._batchers: Dict[str, AsyncBatcher] = {}
+        self._stopping = False
+
+    def run(self, source: Iterable) -> List:
+        """Sync wrapper around arun() (see tools.async_utils.run_sync)."""
+        return run_sync(self.arun(source))
+
+    async def arun(self, source: Iterable, on_result: Optional[Callable] = None) -> List:
+        """
+        Feed source through every stage; returns the last stage's outputs
+        (completion order). on_result(item) is called as each one finishes and
+        may call cancel() to stop early.
+        """
+        self.stats = {s.name: {"items": 0, "errors": 0, "busy_s": 0.0, "workers": s.workers} for s in self.stages}
+        limits = {s.name: asyncio.Semaphore(s.workers) for s in self.stages}
+        self._batchers = batchers = {s.name: AsyncBatcher(self._limited_batch(s, limits[s.name]), s.batch_size, s.batch_wait)
+                    for s in self.stages if s.batch_size > 1}
+        admission = asyncio.Semaphore(self.max_in_flight)
+        results = []
+
+        async def process(item):
+            try:
+                for stage in self.stages:
+                    item = await self._apply(stage, item, limits, batchers)
+                    if item is None:
+                        return
+                results.append(item)
+                if on_result is not None:
+                    on_result(item)
+            finally:
+                admission.release()
+
+        start = time.perf_counter()
+        self._tasks = []
+        self._stopping = False
+        for item in source:
+            await admission.acquire()
+            if self._stopping:
+                admission.release()
+                break
+            self._tasks.append(asyncio.create_task(process(item)))
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self.stats["_total_s"] = round(time.perf_counter() - start, 4)
+        return results
+
+    def cancel(self):
+        """
+        Stop admitting items and cancel every item still in flight; arun
+        returns what has finished. Call it from the loop (e.g. on_result).
+        Cancellation is deferred one loop step, so items whose final result
+        arrived together with the one that triggered it are still kept.
+        """
+        self._stopping = True
+        asyncio.get_running_loop().call_soon(self._cancel_in_flight)
+
+    def _cancel_in_flight(self):
+        for batcher in self._batchers.values():
+            batcher.cancel()
+        for task in self._tasks:
+            task.cancel()
+
+    def _limited_batch(self, stage: Stage, limit: asyncio.Semaphore):
+        async def run_batch(batch):
+            async with limit:
+                started = time.perf_counter()
+                try:
+                    return await stage.fn(batch)
+                finally:
+                    self.stats[stage.name]["busy_s"] = round(
+                        self.stats[stage.name]["busy_s"] + time.perf_counter() - started, 4)
+        return run_batch
+
+    async def _apply(self, stage: Stage, item, limits: Dict, batchers: Dict) -> Optional[object]:
+        stats = self.stats[stage.name]
+        try:
+            if stage.batch_size > 1:
+                out = await batchers[stage.name].submit(item)
+            else:
+                async with limits[stage.name]:
+                    started = time.perf_counter()
+                    try:
+                        out = await stage.fn(item)
+                    finally:
+                        stats["busy_s"] = round(stats["busy_s"] + time.perf_counter() - started, 4)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[Pipeline] Stage '{stage.name}' failed: {e}")
+            stats["errors"] += 1
+            out = None
+        stats["items"] += 1
+        return out
@@ -58,84 +58,382 @@
 #         return orchestrator_output
 
 
-from typing import Dict
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, List, Optional
 from agents.market_scanner_agent import MarketScannerAgent
 from agents.data_agent import DataAgent
 from agents.signal_agent import SignalAgent
 from agents.timing_agent import TimingAgent
 from agents.recommendation_agent import RecommendationAgent
+from agents.pipeline import Pipeline, Stage
 from tools.edgar import EdgarTool
+from tools.run_context import RunContext
+from tools.checkpoint_store import CheckpointStore
+from tools.run_store import RunStore
+from tools.tracing import tracer
+from tools.async_utils import run_sync
+
+# Concurrent tickers per pipeline stage (network-bound stages get more)
+STAGE_WORKERS = {
+    "scan": 8,
+    "data": 8,
+    "analysis": 2,
+    "recommendation": 2,
+}
+
+# Threads for blocking library calls (yfinance, requests) when run() owns the loop
+IO_THREADS = 32
+
+# Stage outputs that embed the DataAgent snapshot; it's checkpointed once, with "data"
+SNAPSHOT_FIELDS = ("signals", "timing", "recommendation")
+
+# Unfinished runs older than this are dropped from the checkpoint store
+CHECKPOINT_RETENTION_DAYS = 7
+
+# Record fields each stage produces; these are what gets checkpointed per ticker
+STAGE_FIELDS = {
+    "scan": ("stock",),
+    "data": ("data_output",),
+    "analysis": ("signals", "timing"),
+    "recommendation": ("recommendation",),
+}
+
+
+class EarlyExitPolicy:
+    """
+    Stop a run once it has target_buys buy recommendations spanning at least
+    min_sectors sectors. window is how many tickers past the scan may be in
+    flight at once: smaller means fewer wasted LLM calls after the target is
+    met, larger means more overlap.
+    The policy only holds settings; each run keeps its own counts, so one
+    instance can be shared by several orchestrators running at once.
+    """
+
+    def __init__(self, target_buys: int = 5, min_sectors: int = 3, window: int = 8):
+        self.target_buys = target_buys
+        self.min_sectors = min_sectors
+        self.window = window
+
+    def satisfied(self, buys: List[str], sectors: set) -> bool:
+        return len(buys) >= self.target_buys and len(sectors) >= self.min_sectors
+
+    @staticmethod
+    def buy_sector(record: Dict) -> Optional[str]:
+        """Sector a finished record counts towards, or None if it isn't a buy."""
+        if not (record.get("recommendation") or {}).get("buy_recommendation"):
+            return None
+        fundamentals = (record["data_output"].get("data") or {}).get("fundamentals") or {}
+        return record["stock"].get("sector") or fundamentals.get("sector") or "Unknown"
 
 
 class PortfolioOrchestrator:
     """
     Orchestrates the stock portfolio workflow:
-    Market scanning → Data collection → Signal generation → Timing → Recommendation → Filings
+    Market scanning → Data collection → Signal generation → Timing → Recommendation
+    Each step is an async pipeline stage with its own concurrency limit, so
+    tickers flow from the scanner into data fetching while later tickers are
+    still being scanned, all on one event loop.
+    Every stage's per-ticker output is checkpointed as it finishes, so a run
+    that dies halfway can be resumed without redoing completed work; a
+    completed run's checkpoints are deleted and the run is added to the
+    RunStore history.
+    13F holdings are not part of a run; the UI fetches them on demand with
+    EdgarTool.get_holdings when a ticker's filings panel is opened.
+    With an EarlyExitPolicy, tickers go through the pipeline in score order
+    and the run stops as soon as the policy's buy/sector target is met.
+    One orchestrator runs one workflow at a time (the run context, checkpoint
+    run_id and stats live on the instance); use one orchestrator per
+    concurrent run.
     """
 
-    def __init__(self):
+    def __init__(self, stage_workers: Optional[Dict[str, int]] = None,
+                 checkpoint_path: Optional[str] = "downloads/checkpoints.sqlite",
+                 run_store_path: Optional[str] = "downloads/runs.sqlite",
+                 early_exit: Optional[EarlyExitPolicy] = None):
         self.scanner = MarketScannerAgent()
         self.data_agent = DataAgent()
         self.signal_agent = SignalAgent()
         self.timing_agent = TimingAgent()
         self.recommendation_agent = RecommendationAgent()
         self.edgar = EdgarTool(user_agent="MyStockApp/0.1 (email@example.com)")
+        self.stage_workers = {**STAGE_WORKERS, **(stage_workers or {})}
+        self.pipeline_stats = {}
+        self.context: Optional[RunContext] = None
+        self.checkpoints = CheckpointStore(checkpoint_path) if checkpoint_path else None
+        self.runs = RunStore(run_store_path) if run_store_path else None
+        self.early_exit = early_exit
+        self._run_lock = threading.Lock()
+
+    def set_context(self, context: Optional[RunContext]):
+        """Point every agent and tool at one run-scoped memo (None turns memoization off)."""
+        self.context = context
+        self.scanner.set_context(context)
+        self.data_agent.set_context(context)
+        self.edgar.context = context
+
+    # --- Checkpoints ---
+    def _restore(self, stage: str, record: Dict) -> bool:
+        """Fill record from this run's checkpoint for the stage; False if there is none."""
+        if self.checkpoints is None:
+            return False
+        saved = self.checkpoints.get(self.context.run_id, stage, record["ticker"])
+        if saved is None:
+            return False
+        for field in SNAPSHOT_FIELDS:
+            if isinstance(saved.get(field), dict) and "data_snapshot" not in saved[field]:
+                saved[field]["data_snapshot"] = record["data_output"].get("data", {})
+        record.update(saved)
+        return True
+
+    def _save(self, stage: str, record: Dict):
+        if self.checkpoints is None:
+            return
+        values = {}
+        for field in STAGE_FIELDS[stage]:
+            value = record[field]
+            if field in SNAPSHOT_FIELDS and isinstance(value, dict):
+                # Reattached from the data checkpoint on restore
+                value = {k: v for k, v in value.items() if k != "data_snapshot"}
+            values[field] = value
+        try:
+            self.checkpoints.put(self.context.run_id, stage, record["ticker"], values)
+        except Exception as e:
+            print(f"[Orchestrator] Could not checkpoint {stage} for {record['ticker']}: {e}")
+
+    def _checkpointed(self, stage: str, fn: Callable[[Dict], Awaitable[Optional[Dict]]]) -> Callable:
+        """Wrap a per-ticker stage: reuse its checkpoint if there is one, else run and save."""
+        async def run_stage(record: Dict) -> Optional[Dict]:
+            with tracer.span(f"stage.{stage}", ticker=record["ticker"]) as span:
+                if self._restore(stage, record):
+                    if tracer.enabled:
+                        span.tags["resumed"] = True
+                    return record
+                out = await fn(record)
+                if out is not None:
+                    self._save(stage, out)
+                return out
+        return run_stage
+
+    # --- Pipeline stages: each takes/returns a per-ticker record dict ---
+    async def _scan_stage(self, record: Dict) -> Optional[Dict]:
+        stock = await self.scanner.aanalyze_for_pipeline(record["ticker"])
+        if stock is None:
+            return None
+        record["stock"] = stock
+        return record
+
+    async def _data_stage(self, record: Dict) -> Dict:
+        record["data_output"] = await self.data_agent.afetch_data(record["ticker"], fetch_13f=False)
+        return record
+
+    async def _analysis_stage(self, record: Dict) -> Dict:
+        # CPU-bound indicator math; keep it off the event loop
+        record["signals"] = await asyncio.to_thread(self.signal_agent.generate_signals, record["data_output"])
+        record["timing"] = await asyncio.to_thread(
+            self.timing_agent.generate_timing, record["data_output"], record["signals"])
+        return record
+
+    async def _recommendation_stage(self, records, on_partial=None):
+        with tracer.span("stage.recommendation", batch=len(records)):
+            return await self._recommend_batch(records, on_partial)
+
+    async def _recommend_batch(self, records, on_partial=None):
+        pending = [r for r in records if not self._restore("recommendation", r)]
+        if on_partial:
+            pending_ids = {id(r) for r in pending}
+            for r in records:
+                if id(r) not in pending_ids:
+                    on_partial(r["ticker"], r["recommendation"])
+        if not pending:
+            return records
+
+        recommendations = await self.recommendation_agent.agenerate_recommendations(
+            [(r["data_output"], r["signals"], r["timing"]) for r in pending],
+            on_partial=on_partial,
+        )
+        for record, recommendation in zip(pending, recommendations):
+            record["recommendation"] = recommendation
+            # Fallbacks (LLM errors / bad JSON) are retried on resume rather than saved
+            if not recommendation.get("fallback"):
+                self._save("recommendation", record)
+        return records
 
-    def run(self, limit: int = 20) -> Dict:
+    def _scan_stage_spec(self) -> Stage:
+        return Stage("scan", self._checkpointed("scan", self._scan_stage), workers=self.stage_workers["scan"])
+
+    def _build_pipeline(self, on_partial=None, scan: bool = True, max_in_flight: int = 64) -> Pipeline:
+        """The per-ticker stage graph; scan=False starts from already-scanned records."""
+        workers = self.stage_workers
+        return Pipeline(([self._scan_stage_spec()] if scan else []) + [
+            Stage("data", self._checkpointed("data", self._data_stage), workers=workers["data"]),
+            Stage("analysis", self._checkpointed("analysis", self._analysis_stage), workers=workers["analysis"]),
+            Stage("recommendation", lambda records: self._recommendation_stage(records, on_partial),
+                  workers=workers["recommendation"], batch_size=max(1, self.recommendation_agent.batch_size),
+                  batch_wait=0.2),
+        ], max_in_flight=max_in_flight)
+
+    async def _run_until_target(self, source, on_partial=None):
         """
-        Runs the full workflow for top-ranked stocks from the market scanner.
-        Returns a web UI-ready aggregated report.
+        Scan everything, then push tickers through the rest of the pipeline
+        best score first, at most policy.window at a time, and cancel what is
+        still in flight once the policy is satisfied. Remaining tickers are skipped.
         """
-        # --- Step 1: Scan & rank ---
-        scanned_stocks = self.scanner.scan_universe(limit=limit)
+        policy = self.early_exit
+        buys, sectors = [], set()
+        scan = Pipeline([self._scan_stage_spec()])
+        scanned = await scan.arun(source)
+        scanned.sort(key=lambda r: (-r["stock"].get("score", 0), r["index"]))
 
-        portfolio_results = []
-        for stock in scanned_stocks:
-            ticker = stock["ticker"]
+        pipeline = self._build_pipeline(on_partial, scan=False, max_in_flight=max(1, policy.window))
 
-            # --- Step 2: Data ---
-            data_output = self.data_agent.fetch_data(ticker)
+        def on_result(record):
+            sector = policy.buy_sector(record)
+            if sector is None:
+                return
+            already_met = policy.satisfied(buys, sectors)
+            buys.append(record["ticker"])
+            sectors.add(sector)
+            if policy.satisfied(buys, sectors) and not already_met:
+                print(f"[Orchestrator] Early exit: {len(buys)} buys across {len(sectors)} sectors")
+                pipeline.cancel()
 
-            # --- Step 3: Signals ---
-            signals = self.signal_agent.generate_signals(data_output)
+        records = await pipeline.arun(scanned, on_result=on_result)
+        self.pipeline_stats = {**scan.stats, **pipeline.stats,
+                               "_total_s": round(scan.stats["_total_s"] + pipeline.stats["_total_s"], 4)}
 
-            # --- Step 4: Timing ---
-            timing = self.timing_agent.generate_timing(data_output, signals)
+        done = {r["ticker"] for r in records}
+        return records, {
+            "target_buys": policy.target_buys,
+            "min_sectors": policy.min_sectors,
+            "satisfied": policy.satisfied(buys, sectors),
+            "buys": buys,
+            "sectors": sorted(sectors),
+            "skipped": [r["ticker"] for r in scanned if r["ticker"] not in done],
+        }
 
-            # --- Step 5: Recommendation ---
-            recommendation = self.recommendation_agent.generate_recommendation(
-                data_output,
-                signals, timing,
+    def run(self, limit: int = 20, on_partial: Optional[Callable[[str, dict], None]] = None,
+            resume: bool = False, run_id: Optional[str] = None, trace: bool = False) -> Dict:
+        """
+        Sync wrapper around arun(): runs it on a fresh event loop whose
+        default executor has IO_THREADS threads for the blocking tool calls
+        (on a helper thread if the caller already has a running loop; async
+        callers should await arun() instead).
+        """
+        async def main():
+            asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=IO_THREADS))
+            try:
+                return await self.arun(limit=limit, on_partial=on_partial, resume=resume, run_id=run_id,
+                                       trace=trace)
+            finally:
+                await self.recommendation_agent.aclose()
+        return run_sync(main())
 
-            )
+    async def arun(self, limit: int = 20, on_partial: Optional[Callable[[str, dict], None]] = None,
+                   resume: bool = False, run_id: Optional[str] = None, trace: bool = False) -> Dict:
+        """
+        Runs the full workflow for top-ranked stocks from the market scanner.
+        Returns a web UI-ready aggregated report.
+        on_partial(ticker, fields_so_far) receives recommendations as they stream in;
+        it is called on the event loop's thread.
+        resume=True continues the latest unfinished run (or run_id), skipping
+        every stage/ticker that already has a checkpoint. A run that ends with
+        fallback recommendations stays unfinished so resuming retries them.
+        trace=True records spans for every stage, agent and tool call and writes
+        them to downloads/traces/<run_id>.json (Chrome trace / Perfetto format);
+        each traced run starts from an empty span buffer.
+        """
+        # Non-blocking: a second run would overwrite this one's context and run_id mid-flight
+        if not self._run_lock.acquire(blocking=False):
+            raise RuntimeError("PortfolioOrchestrator is already running; use a separate instance per concurrent run")
+        started_tracing = trace and not tracer.enabled
+        try:
+            if started_tracing:
+                tracer.enable()
+            elif tracer.enabled:
+                # Globally enabled (STOCK_AGENT_TRACE): keep only this run's spans, so a
+                # long-lived process doesn't grow them forever or export earlier runs
+                tracer.reset()
+            with tracer.span("orchestrator.run", limit=limit):
+                output = await self._run(limit, on_partial, resume, run_id)
+        finally:
+            if started_tracing:
+                tracer.disable()
+            self._run_lock.release()
+        if trace or tracer.enabled:
+            output["trace"] = {
+                "path": tracer.export_chrome_trace(f"downloads/traces/{output['run_id']}.json"),
+                "by_name": tracer.summary("name", top=20),
+                "by_source": tracer.summary("source"),
+                "slowest_tickers": tracer.summary("ticker", top=10),
+            }
+        return output
 
-            # --- Step 6: 13F Filings ---
-            try:
-                latest_13f = self.edgar.get_latest_13f(ticker)
-                holdings = []
-                if latest_13f:
-                    holdings = self.edgar.parse_13f_file(latest_13f)
-            except Exception:
-                holdings = []
+    async def _run(self, limit: int, on_partial, resume: bool, run_id: Optional[str]) -> Dict:
+        if resume and run_id is None and self.checkpoints is not None:
+            run_id = self.checkpoints.latest_unfinished_run()
+            if run_id:
+                print(f"[Orchestrator] Resuming run {run_id}: {self.checkpoints.completed(run_id)}")
+        self.set_context(RunContext(run_id))
+        run_id = self.context.run_id
+        if self.checkpoints is not None:
+            self.checkpoints.prune(CHECKPOINT_RETENTION_DAYS)
+            self.checkpoints.start_run(run_id, {"limit": limit})
+        self.recommendation_agent.metrics.start_run(run_id)
+        tickers = self.scanner.tickers_to_scan(limit=limit)
+
+        source = ({"index": i, "ticker": t} for i, t in enumerate(tickers))
+        early_exit = None
+        if self.early_exit is None:
+            pipeline = self._build_pipeline(on_partial)
+            records = await pipeline.arun(source)
+            self.pipeline_stats = pipeline.stats
+        else:
+            records, early_exit = await self._run_until_target(source, on_partial)
+
+        # Same order as a sequential scan: score (desc), then universe position
+        records.sort(key=lambda r: (-r["stock"].get("score", 0), r["index"]))
 
+        portfolio_results = []
+        for record in records:
+            stock, data_output = record["stock"], record["data_output"]
             portfolio_results.append({
-                "ticker": ticker,
+                "ticker": record["ticker"],
                 "data": data_output["data"],
-                "signals": signals.get("signals", {}),
-                "timing": timing,
-                "recommendation": recommendation,
+                "signals": record["signals"].get("signals", {}),
+                "timing": record["timing"],
+                "recommendation": record["recommendation"],
                 "risk_flags": stock.get("risk_flags", []),
                 "score": stock.get("score"),
-                "13f_holdings": holdings,
             })
 
+        if self.checkpoints is not None:
+            fallbacks = sum(1 for r in records if r["recommendation"].get("fallback"))
+            if fallbacks:
+                # Left unfinished so resume=True picks it up and retries just those tickers
+                print(f"[Orchestrator] Run {run_id} stays resumable: {fallbacks} fallback recommendation(s)")
+            else:
+                # Complete runs live on in the run history; their checkpoints aren't needed
+                self.checkpoints.delete_run(run_id)
+
         orchestrator_output = {
+            "run_id": run_id,
             "portfolio_results": portfolio_results,
             "aggregated_ui": {
-                "stock_universe": [s["ticker"] for s in scanned_stocks],
+                "stock_universe": [r["ticker"] for r in records],
                 "selected_stocks": [s["ticker"] for s in portfolio_results],
             },
+            "llm_metrics": self.recommendation_agent.metrics.summary(),
+            "context_stats": self.context.summary(),
         }
+        if early_exit is not None:
+            orchestrator_output["early_exit"] = early_exit
 
-        return orchestrator_output
+        if self.runs is not None:
+            try:
+                self.runs.record_run(orchestrator_output, params={"limit": limit})
+            except Exception as e:
+                print(f"[Orchestrator] Could not record run {run_id} in history: {e}")
 
+        return orchestrator_output
@@ -1,12 +1,36 @@
+import asyncio
+import random
+import threading
+import time
+import weakref
+import numpy as np
 import openai
-from openai import OpenAI
-from typing import Optional, Dict, List
+from openai import OpenAI, AsyncOpenAI
+from typing import Callable, Optional, Dict, List
 import json, os
 from json.decoder import JSONDecodeError
 from dotenv import load_dotenv
+from tools.prompt_builder import PromptBuilder
+from tools.llm_cache import LLMCache, make_cache_key
+from tools.llm_metrics import LLMMetrics
+from tools.partial_json import parse_partial_json
+from tools.portfolio_optimizer import PortfolioOptimizer, water_fill
+from tools.tracing import traced
+from tools.async_utils import run_sync
 
 load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+# Point at any OpenAI-compatible server, e.g. tools/openai_stub_server.py for offline tests
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")
+
+# Errors worth retrying with backoff (rate limits, timeouts, transient server/network failures)
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+    asyncio.TimeoutError,
+)
 
 
 class RecommendationAgent:
@@ -15,10 +39,166 @@ class RecommendationAgent:
     Fully web UI-ready and robust to LLM errors.
     """
 
-    def __init__(self, model="gpt-4o-mini", budget=100):
+    def __init__(self, model="gpt-4o-mini", budget=100, token_budget=1200, cache: Optional[LLMCache] = None,
+                 use_cache=True, base_url: Optional[str] = None, max_concurrency=8, request_timeout=60.0,
+                 max_retries=4, batch_size=8, optimizer: Optional[PortfolioOptimizer] = None,
+                 max_sector_share=0.5, metrics: Optional[LLMMetrics] = None):
         self.model = model
         self.budget = budget
-        self.client = OpenAI(api_key=OPENAI_API_KEY)
+        self.base_url = base_url or OPENAI_BASE_URL
+        # Local stub servers don't need a real key
+        self.api_key = OPENAI_API_KEY or ("stub" if self.base_url else None)
+        self.client = OpenAI(api_key=self.api_key, base_url=self.base_url)
+        self.prompt_builder = PromptBuilder(token_budget=token_budget)
+        self.optimizer = optimizer or PortfolioOptimizer()
+        self.max_sector_share = max_sector_share  # cap per sector in generate_portfolio_recommendations
+        self.cache = (cache or LLMCache()) if use_cache else None
+        self.metrics = metrics or LLMMetrics()
+        self.max_concurrency = max_concurrency
+        self.request_timeout = request_timeout
+        self.max_retries = max_retries
+        self.batch_size = batch_size  # tickers per LLM request in batch mode; 1 disables batching
+        # Async client and semaphore are bound to the event loop that created them
+        self._async_by_loop = weakref.WeakKeyDictionary()
+        self._async_lock = threading.Lock()
+
+    def _async_resources(self):
+        # One client/semaphore per event loop (loops may run on several pipeline threads)
+        loop = asyncio.get_running_loop()
+        with self._async_lock:
+            if loop not in self._async_by_loop:
+                self._async_by_loop[loop] = (
+                    AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=0),
+                    asyncio.Semaphore(self.max_concurrency),
+                )
+            return self._async_by_loop[loop]
+
+    async def aclose(self):
+        """Close the async client for the running loop (a later call on this loop opens a new one)."""
+        with self._async_lock:
+            resources = self._async_by_loop.pop(asyncio.get_running_loop(), None)
+        if resources is not None:
+            await resources[0].close()
+
+    async def _closing(self, coro):
+        # Sync wrappers own their loop, so release its client before the loop goes away
+        try:
+            return await coro
+        finally:
+            await self.aclose()
+
+    def _stream_chunk(self, chunk, parts: List[str], call: dict, on_text: Callable[[str], None]):
+        """Fold one streamed chunk into parts/metrics and report the text so far."""
+        if getattr(chunk, "usage", None) is not None:
+            self.metrics.usage_from(chunk, call)
+        for choice in chunk.choices or []:
+            delta = choice.delta.content if choice.delta else None
+            if delta:
+                if call["first_token_at"] is None:
+                    call["first_token_at"] = time.perf_counter()
+                parts.append(delta)
+                on_text("".join(parts))
+
+    @traced("llm.achat", source="openai")
+    async def _achat(self, messages: List[dict], model: Optional[str] = None, kind: str = "chat",
+                     on_text: Optional[Callable[[str], None]] = None,
+                     validate: Optional[Callable[[str], bool]] = None, **params) -> str:
+        """
+        Async _chat: cache first, then at most max_concurrency requests in flight,
+        each with a timeout and exponential backoff (with jitter) on retryable errors.
+        With on_text, the completion is streamed and on_text gets the text so far.
+        """
+        model = model or self.model
+        with self.metrics.track(model, kind) as call:
+            key = make_cache_key(model, messages, params)
+            if self.cache is not None:
+                cached = self.cache.get(key)
+                if cached is not None and (validate is None or validate(cached)):
+                    call["cached"] = True
+                    if on_text:
+                        on_text(cached)
+                    return cached
+
+            client, semaphore = self._async_resources()
+
+            async def request() -> str:
+                if on_text is None:
+                    response = await client.chat.completions.create(model=model, messages=messages, **params)
+                    self.metrics.usage_from(response, call)
+                    return response.choices[0].message.content
+                parts = []
+                stream = await client.chat.completions.create(
+                    model=model, messages=messages, stream=True, stream_options={"include_usage": True}, **params
+                )
+                async for chunk in stream:
+                    self._stream_chunk(chunk, parts, call, on_text)
+                return "".join(parts)
+
+            for attempt in range(self.max_retries + 1):
+                call["attempts"] = attempt + 1
+                try:
+                    async with semaphore:
+                        content = await asyncio.wait_for(request(), timeout=self.request_timeout)
+                    break
+                except RETRYABLE_ERRORS as e:
+                    if attempt == self.max_retries:
+                        raise
+                    delay = min(30.0, 2 ** attempt) * (0.5 + random.random())
+                    print(f"[RecommendationAgent] {type(e).__name__}; retrying in {delay:.1f}s")
+                    await asyncio.sleep(delay)
+
+            content = content.strip()
+        self._cache_put(key, model, content, validate)
+        return content
+
+    @traced("llm.chat", source="openai")
+    def _chat(self, messages: List[dict], model: Optional[str] = None, kind: str = "chat",
+              on_text: Optional[Callable[[str], None]] = None,
+              validate: Optional[Callable[[str], bool]] = None, **params) -> str:
+        """
+        Chat completion text for messages, served from the LLM cache when an
+        identical (model, normalized prompt, params) call was made recently.
+        With on_text, the completion is streamed and on_text gets the text so far.
+        validate(content) decides whether a completion is good enough to cache
+        (and to serve from cache); malformed output is then retried next time.
+        """
+        model = model or self.model
+        with self.metrics.track(model, kind) as call:
+            key = make_cache_key(model, messages, params)
+            if self.cache is not None:
+                cached = self.cache.get(key)
+                if cached is not None and (validate is None or validate(cached)):
+                    call["cached"] = True
+                    if on_text:
+                        on_text(cached)
+                    return cached
+
+            call["attempts"] = 1
+            if on_text is None:
+                response = self.client.chat.completions.create(model=model, messages=messages, **params)
+                self.metrics.usage_from(response, call)
+                content = response.choices[0].message.content.strip()
+            else:
+                parts = []
+                stream = self.client.chat.completions.create(
+                    model=model, messages=messages, stream=True, stream_options={"include_usage": True}, **params
+                )
+                for chunk in stream:
+                    self._stream_chunk(chunk, parts, call, on_text)
+                content = "".join(parts).strip()
+        self._cache_put(key, model, content, validate)
+        return content
+
+    def _cache_put(self, key: str, model: str, content: str, validate: Optional[Callable[[str], bool]]):
+        if self.cache is None or not content:
+            return
+        if validate is not None and not validate(content):
+            self.metrics.event("cache_skip_invalid", model=model)
+            return
+        self.cache.put(key, model, content)
+
+    def _valid_recommendation_text(self, text: str) -> bool:
+        return self.is_valid_recommendation(self.safe_parse_json(text))
 
     @staticmethod
     def safe_parse_json(llm_output: str):
@@ -38,48 +218,28 @@ class RecommendationAgent:
                     pass
             return None
 
-    def generate_recommendation(
-        self,
-        data_agent_output: dict,
-        signals: Optional[dict] = None,
-        timing: Optional[dict] = None
-    ) -> dict:
-        """
-        Single-stock recommendation
-        """
-        ticker = data_agent_output.get("ticker")
-        data_snapshot = data_agent_output.get("data", {})
-
-        prompt = f"""
-        You are a highly analytical stock portfolio assistant.
-        Give **long-term buy recommendations only** for a user
-        who wants to invest up to ${self.budget} in total.
-
-        Consider this structured data for {ticker}:
-        {json.dumps(data_snapshot, default=str)}
-
-        Also consider signals and timing factors if provided.
-        Respond **ONLY in JSON format** with fields:
-        - buy_recommendation: true or false
-        - suggested_amount: numeric allocation
-        - rationale: short paragraph explaining reasoning
-        - optimal_timing: string if relevant, else null
-        """
-
+    def _recommendation_messages(self, ticker: str, data_snapshot: dict,
+                                 signals: Optional[dict], timing: Optional[dict]) -> List[dict]:
+        # Compact, token-budgeted view of the snapshot (not the raw yfinance dump)
+        prompt = self.prompt_builder.build_recommendation_prompt(
+            ticker, data_snapshot, self.budget, signals=signals, timing=timing
+        )
+        return [
+            {"role": "system", "content": "You are a helpful and accurate financial assistant."},
+            {"role": "user", "content": prompt}
+        ]
+
+    def _finalize_recommendation(self, ticker: str, data_snapshot: dict, signals: Optional[dict],
+                                 timing: Optional[dict], llm_output: str = "",
+                                 error: Optional[Exception] = None) -> dict:
+        """Parse the LLM output and attach metadata, or build the fallback recommendation."""
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a helpful and accurate financial assistant."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7
-            )
-
-            llm_output = response.choices[0].message.content.strip()
+            if error is not None:
+                raise error
             recommendation = self.safe_parse_json(llm_output)
 
             if recommendation is None:
+                self.metrics.event("parse_fallback", ticker=ticker)
                 raise ValueError("LLM returned invalid JSON")
 
             # Attach metadata
@@ -90,35 +250,213 @@ class RecommendationAgent:
             recommendation["llm_raw_response"] = llm_output
 
         except Exception as e:
+            self.metrics.event("recommendation_fallback", ticker=ticker, error=str(e))
             recommendation = {
                 "ticker": ticker,
                 "buy_recommendation": False,
                 "suggested_amount": 0.0,
                 "rationale": f"Fallback: LLM returned invalid JSON or error: {str(e)}",
                 "optimal_timing": None,
+                "fallback": True,
                 "data_snapshot": data_snapshot,
                 "signals": signals or {},
                 "timing_factors": timing or {},
-                "llm_raw_response": llm_output if 'llm_output' in locals() else ""
+                "llm_raw_response": llm_output or ""
             }
 
         return recommendation
 
-    def generate_portfolio_recommendations(self, stocks_data: List[dict]) -> List[dict]:
+    @staticmethod
+    def safe_parse_json_array(llm_output: str):
+        """
+        Parse a JSON array returned by the LLM (also accepts an object wrapping
+        a list, e.g. {"recommendations": [...]}). Returns None on failure.
+        """
+        parsed = None
+        try:
+            parsed = json.loads(llm_output)
+        except JSONDecodeError:
+            start = llm_output.find("[")
+            end = llm_output.rfind("]")
+            if start != -1 and end > start:
+                try:
+                    parsed = json.loads(llm_output[start:end + 1])
+                except JSONDecodeError:
+                    pass
+        if isinstance(parsed, dict):
+            parsed = next((v for v in parsed.values() if isinstance(v, list)), None)
+        return parsed if isinstance(parsed, list) else None
+
+    @staticmethod
+    def is_valid_recommendation(entry) -> bool:
+        """Check one LLM recommendation object has the required, well-typed fields."""
+        if not isinstance(entry, dict):
+            return False
+        amount = entry.get("suggested_amount")
+        return (
+            isinstance(entry.get("buy_recommendation"), bool)
+            and isinstance(amount, (int, float)) and not isinstance(amount, bool) and amount >= 0
+            and isinstance(entry.get("rationale"), str)
+        )
+
+    @staticmethod
+    def _partial_reporter(ticker: str, on_partial: Optional[Callable[[str, dict], None]]):
+        """on_text callback that parses the streamed JSON so far and reports it as a dict."""
+        if on_partial is None:
+            return None
+
+        def on_text(text: str):
+            partial = parse_partial_json(text)
+            if isinstance(partial, dict):
+                on_partial(ticker, partial)
+        return on_text
+
+    @traced("recommendation.generate")
+    def generate_recommendation(
+        self,
+        data_agent_output: dict,
+        signals: Optional[dict] = None,
+        timing: Optional[dict] = None,
+        on_partial: Optional[Callable[[str, dict], None]] = None
+    ) -> dict:
+        """
+        Single-stock recommendation.
+        With on_partial, the completion is streamed and on_partial(ticker, fields_so_far)
+        is called as fields (e.g. a growing "rationale") arrive.
+        """
+        ticker = data_agent_output.get("ticker")
+        data_snapshot = data_agent_output.get("data", {})
+        llm_output, error = "", None
+        try:
+            messages = self._recommendation_messages(ticker, data_snapshot, signals, timing)
+            llm_output = self._chat(messages, kind="recommendation",
+                                    on_text=self._partial_reporter(ticker, on_partial),
+                                    validate=self._valid_recommendation_text, temperature=0.7)
+        except Exception as e:
+            error = e
+        return self._finalize_recommendation(ticker, data_snapshot, signals, timing, llm_output, error)
+
+    @traced("recommendation.agenerate")
+    async def agenerate_recommendation(
+        self,
+        data_agent_output: dict,
+        signals: Optional[dict] = None,
+        timing: Optional[dict] = None,
+        on_partial: Optional[Callable[[str, dict], None]] = None
+    ) -> dict:
+        """
+        Async single-stock recommendation (bounded concurrency, retries, timeout),
+        streamed to on_partial like generate_recommendation.
+        """
+        ticker = data_agent_output.get("ticker")
+        data_snapshot = data_agent_output.get("data", {})
+        llm_output, error = "", None
+        try:
+            messages = self._recommendation_messages(ticker, data_snapshot, signals, timing)
+            llm_output = await self._achat(messages, kind="recommendation",
+                                           on_text=self._partial_reporter(ticker, on_partial),
+                                           validate=self._valid_recommendation_text, temperature=0.7)
+        except Exception as e:
+            error = e
+        return self._finalize_recommendation(ticker, data_snapshot, signals, timing, llm_output, error)
+
+    @traced("recommendation.batch")
+    async def _agenerate_batch(self, items: List[tuple],
+                               on_partial: Optional[Callable[[str, dict], None]] = None) -> List[dict]:
+        """
+        One LLM request for several tickers. Entries that are missing or
+        malformed in the returned array fall back to a single-ticker call.
+        """
+        entries = [
+            (data_agent_output.get("ticker"), data_agent_output.get("data", {}), signals, timing)
+            for data_agent_output, signals, timing in items
+        ]
+        on_text = None
+        if on_partial is not None:
+            # A ticker still streaming in ("G", "GOO") isn't one we asked for; skip it until complete
+            wanted = {str(t).upper() for t, *_ in entries}
+
+            def on_text(text: str):
+                for entry in parse_partial_json(text) or []:
+                    if isinstance(entry, dict) and str(entry.get("ticker", "")).upper() in wanted:
+                        on_partial(str(entry["ticker"]).upper(), entry)
+
+        def complete(text: str) -> bool:
+            # Cache a batch only if it covers every ticker with a valid entry
+            parsed = self.safe_parse_json_array(text) or []
+            valid = {str(e.get("ticker", "")).upper() for e in parsed if self.is_valid_recommendation(e)}
+            return all(str(e[0]).upper() in valid for e in entries)
+
+        by_ticker = {}
+        try:
+            prompt = self.prompt_builder.build_batch_recommendation_prompt(entries, self.budget)
+            llm_output = await self._achat(
+                [
+                    {"role": "system", "content": "You are a helpful and accurate financial assistant."},
+                    {"role": "user", "content": prompt}
+                ],
+                kind="batch_recommendation",
+                on_text=on_text,
+                validate=complete,
+                temperature=0.7
+            )
+            parsed = self.safe_parse_json_array(llm_output)
+            if parsed is None:
+                self.metrics.event("parse_fallback", tickers=[e[0] for e in entries])
+            for entry in parsed or []:
+                if isinstance(entry, dict) and self.is_valid_recommendation(entry):
+                    by_ticker[str(entry.get("ticker", "")).upper()] = entry
+        except Exception as e:
+            print(f"[RecommendationAgent] Batch request failed, falling back per ticker: {e}")
+        missing = [e[0] for e in entries if str(e[0]).upper() not in by_ticker]
+        if missing:
+            self.metrics.event("batch_fallback", tickers=missing)
+
+        async def resolve(item, entry_info):
+            ticker, data_snapshot, signals, timing = entry_info
+            entry = by_ticker.get(str(ticker).upper())
+            if entry is None:
+                return await self.agenerate_recommendation(*item, on_partial=on_partial)
+            return self._finalize_recommendation(ticker, data_snapshot, signals, timing, json.dumps(entry))
+
+        return await asyncio.gather(*(resolve(item, info) for item, info in zip(items, entries)))
+
+    async def agenerate_recommendations(self, items: List[tuple],
+                                        on_partial: Optional[Callable[[str, dict], None]] = None) -> List[dict]:
+        """
+        Concurrent recommendations for (data_agent_output, signals, timing) tuples, in input order.
+        With batch_size > 1, tickers are packed batch_size per request.
+        With on_partial, every completion is streamed and on_partial(ticker, fields_so_far) is called.
+        """
+        if self.batch_size <= 1:
+            return await asyncio.gather(*(self.agenerate_recommendation(*item, on_partial=on_partial)
+                                          for item in items))
+        chunks = [items[i:i + self.batch_size] for i in range(0, len(items), self.batch_size)]
+        results = await asyncio.gather(*(self._agenerate_batch(chunk, on_partial) for chunk in chunks))
+        return [rec for chunk in results for rec in chunk]
+
+    def generate_recommendations(self, items: List[tuple],
+                                 on_partial: Optional[Callable[[str, dict], None]] = None) -> List[dict]:
+        """Sync wrapper around agenerate_recommendations for non-async callers."""
+        return run_sync(self._closing(self.agenerate_recommendations(items, on_partial)))
+
+    def generate_portfolio_recommendations(self, stocks_data: List[dict],
+                                           on_partial: Optional[Callable[[str, dict], None]] = None) -> List[dict]:
         """
         Multi-stock recommendation with sector diversification.
         Normalizes suggested amounts to match self.budget.
         """
-        recommendations = []
-
-        # Step 1: Generate individual recommendations
-        for stock_data in stocks_data:
-            rec = self.generate_recommendation(
-                stock_data,
-                signals=stock_data.get("signals"),
-                timing=stock_data.get("timing")
-            )
-            recommendations.append(rec)
+        return run_sync(self._closing(self.agenerate_portfolio_recommendations(stocks_data, on_partial)))
+
+    async def agenerate_portfolio_recommendations(self, stocks_data: List[dict],
+                                                  on_partial: Optional[Callable[[str, dict], None]] = None
+                                                  ) -> List[dict]:
+        """Async generate_portfolio_recommendations."""
+        # Step 1: Generate individual recommendations (concurrently)
+        recommendations = await self.agenerate_recommendations([
+            (stock_data, stock_data.get("signals"), stock_data.get("timing"))
+            for stock_data in stocks_data
+        ], on_partial)
 
         # Step 2: Normalize suggested_amount to budget
         buy_recs = [r for r in recommendations if r.get("buy_recommendation")]
@@ -136,32 +474,56 @@ class RecommendationAgent:
                 for r in buy_recs:
                     r["suggested_amount"] = equal_alloc
 
-        # Step 3: Optional sector diversification enforcement
-        sector_alloc = {}
-        for r in buy_recs:
-            sector = r["data_snapshot"].get("fundamentals", {}).get("sector", "Other")
-            sector_alloc.setdefault(sector, 0.0)
-            sector_alloc[sector] += r["suggested_amount"]
-
-        # Scale down any sector >50% of budget
-        for r in buy_recs:
-            sector = r["data_snapshot"].get("fundamentals", {}).get("sector", "Other")
-            if sector_alloc[sector] > self.budget * 0.5:
-                over = sector_alloc[sector] - self.budget * 0.5
-                peers = [x for x in buy_recs if x["data_snapshot"].get("fundamentals", {}).get("sector") == sector]
-                for peer in peers:
-                    peer["suggested_amount"] -= round(over / len(peers), 2)
+        # Step 3: Sector diversification: cap each sector at max_sector_share of the
+        # budget and hand the excess to the remaining sectors (water-filling)
+        if buy_recs:
+            sectors = [(r["data_snapshot"].get("fundamentals") or {}).get("sector") or "Other" for r in buy_recs]
+            _, sector_ids = np.unique(sectors, return_inverse=True)
+            # With too few sectors the cap can't fill the budget; relax it rather than leave money
+            # unallocated (same rule as PortfolioOptimizer.optimize)
+            max_sector = max(self.max_sector_share, 1.0 / (sector_ids.max() + 1))
+            amounts = water_fill(np.array([r["suggested_amount"] for r in buy_recs], dtype=float),
+                                 sector_ids, max_sector=max_sector, total=self.budget)
+            for r, amount in zip(buy_recs, amounts):
+                r["suggested_amount"] = round(float(amount), 2)
+            # Put rounding drift on the largest position
+            drift = round(float(amounts.sum()) - sum(r["suggested_amount"] for r in buy_recs), 2)
+            if drift:
+                largest = buy_recs[int(np.argmax(amounts))]
+                largest["suggested_amount"] = round(largest["suggested_amount"] + drift, 2)
 
         return recommendations
 
-    def summarize_and_allocate(self, buy_stocks: list, total_budget: float = 100):
+    @staticmethod
+    def buy_stock_inputs(portfolio_results: list) -> list:
+        """summarize_and_allocate input rows for the buy-recommended orchestrator results."""
+        return [{
+            "ticker": stock["ticker"],
+            "price": stock["data"].get("price"),
+            "sector": (stock["data"].get("fundamentals") or {}).get("sector"),
+            "market_cap": (stock["data"].get("fundamentals") or {}).get("market_cap"),
+            "signals": stock.get("signals", {}),
+            "rationale": stock.get("recommendation", {}).get("rationale"),
+            "price_history": stock["data"].get("price_history"),
+        } for stock in portfolio_results if stock.get("recommendation", {}).get("buy_recommendation")]
+
+    @traced("recommendation.summarize_and_allocate")
+    def summarize_and_allocate(self, buy_stocks: list, total_budget: float = 100,
+                               use_llm_summary: bool = True, method: Optional[str] = None,
+                               on_summary: Optional[Callable[[str], None]] = None):
         """
-        Summarize buy recommendations and suggest capital allocation for total budget.
-        Ensures total allocations sum to total_budget, with optional sector diversification.
+        Summarize buy recommendations and allocate the total budget.
+        Weights come from the local PortfolioOptimizer (risk parity or
+        mean-variance over each stock's price_history, capped per position
+        and per sector); the LLM is only asked for the narrative summary.
 
         Args:
-            buy_stocks (list): List of buy-recommended stock dicts (from generate_recommendation).
+            buy_stocks (list): Buy-recommended stock dicts with 'ticker', 'sector'
+                and (optionally) 'price_history'.
             total_budget (float): Total capital to allocate across stocks.
+            use_llm_summary (bool): Ask the LLM for the summary text; otherwise it is templated.
+            method (str): "risk_parity" or "mean_variance"; defaults to the optimizer's method.
+            on_summary (callable): Streams the LLM summary; called with the text so far.
 
         Returns:
             summary_text (str): Human-readable reasoning summary.
@@ -170,77 +532,102 @@ class RecommendationAgent:
         if not buy_stocks:
             return "No buy-recommended stocks available.", []
 
-        # Step 1: Use LLM to summarize reasoning and suggested weights (as percentages)
-        from openai import OpenAI
-        import json, os
+        allocations = self._allocate(buy_stocks, total_budget, method)
+        summary_text = self._allocation_summary(buy_stocks, allocations, method or self.optimizer.method)
+        if use_llm_summary:
+            try:
+                summary_text = self._chat(
+                    self._summary_messages(buy_stocks, allocations),
+                    model="gpt-4",
+                    kind="allocation_summary",
+                    on_text=on_summary,
+                    temperature=0.7,
+                    max_tokens=300
+                ) or summary_text
+            except Exception as e:
+                print(f"[RecommendationAgent] LLM summary failed, using template: {e}")
 
-        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        return summary_text, allocations
 
-        prompt = f"""
-        You are a financial AI assistant.
-        Given the following buy-recommended stocks, provide:
-        1. A concise reasoning summary for the selections.
-        2. Suggested allocation percentages for each stock (sum to 100%).
+    @traced("recommendation.asummarize_and_allocate")
+    async def asummarize_and_allocate(self, buy_stocks: list, total_budget: float = 100,
+                                      use_llm_summary: bool = True, method: Optional[str] = None,
+                                      on_summary: Optional[Callable[[str], None]] = None):
+        """Async summarize_and_allocate (same arguments and return value)."""
+        if not buy_stocks:
+            return "No buy-recommended stocks available.", []
 
-        Ensure sector diversification. Avoid allocating more than 40% to any single sector.
+        allocations = self._allocate(buy_stocks, total_budget, method)
+        summary_text = self._allocation_summary(buy_stocks, allocations, method or self.optimizer.method)
+        if use_llm_summary:
+            try:
+                summary_text = await self._achat(
+                    self._summary_messages(buy_stocks, allocations),
+                    model="gpt-4",
+                    kind="allocation_summary",
+                    on_text=on_summary,
+                    temperature=0.7,
+                    max_tokens=300
+                ) or summary_text
+            except Exception as e:
+                print(f"[RecommendationAgent] LLM summary failed, using template: {e}")
 
-        Stock data:
-        {buy_stocks}
+        return summary_text, allocations
 
-        Output format: JSON with 'summary' (text) and 'allocations' (list of {{ticker, weight_percent}}).
-        """
+    def _allocate(self, buy_stocks: list, total_budget: float, method: Optional[str]) -> list:
+        """Optimizer weights as {'Ticker', 'Weight (%)', 'Allocation($)'} rows summing to total_budget."""
+        tickers = [s["ticker"] for s in buy_stocks]
+        sectors = [s.get("sector") for s in buy_stocks]
+        weights = self.optimizer.optimize(tickers, [s.get("price_history") for s in buy_stocks], sectors,
+                                          method=method)
+
+        allocations = [{
+            "Ticker": ticker,
+            "Weight (%)": round(float(w) * 100, 2),
+            "Allocation($)": round(total_budget * float(w), 2),
+        } for ticker, w in zip(tickers, weights)]
+        # Whatever the caps couldn't place stays in cash
+        cash = round(total_budget - sum(a["Allocation($)"] for a in allocations), 2)
+        if cash >= 0.01 and float(weights.sum()) < 1 - 1e-6:
+            allocations.append({"Ticker": "Cash", "Weight (%)": round(100 * cash / total_budget, 2),
+                                "Allocation($)": cash})
+        elif cash != 0:
+            # Rounding drift goes on the largest position
+            largest = max(range(len(tickers)), key=lambda i: weights[i])
+            allocations[largest]["Allocation($)"] = round(allocations[largest]["Allocation($)"] + cash, 2)
+        return allocations
 
-        try:
-            resp = client.chat.completions.create(
-                model="gpt-4",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.7,
-                max_tokens=400
-            )
+    @staticmethod
+    def _summary_messages(buy_stocks: list, allocations: list) -> List[dict]:
+        stocks = [{k: v for k, v in s.items() if k != "price_history"} for s in buy_stocks]
+        prompt = f"""
+        You are a financial AI assistant.
+        Write a concise reasoning summary (one short paragraph) for the following
+        buy-recommended stocks and the allocation already chosen for them.
 
-            content = resp.choices[0].message.content.strip()
+        Stock data:
+        {json.dumps(stocks, default=str)}
 
-            # Safe parsing of JSON
-            try:
-                result = json.loads(content)
-            except json.JSONDecodeError:
-                # Attempt to extract JSON between first and last braces
-                start = content.find("{")
-                end = content.rfind("}")
-                if start != -1 and end != -1:
-                    result = json.loads(content[start:end + 1])
-                else:
-                    raise ValueError("LLM returned invalid JSON")
-
-            summary_text = result.get("summary", "")
-            allocations_raw = result.get("allocations", [])
-
-            # Step 2: Convert percentages to actual $ allocations
-            allocations = []
-            for a in allocations_raw:
-                ticker = a.get("ticker")
-                weight = a.get("weight_percent", 0)
-                alloc_amount = round(total_budget * weight / 100, 2)
-                allocations.append({
-                    "Ticker": ticker,
-                    "Weight (%)": weight,
-                    "Allocation($)": alloc_amount
-                })
-
-            # Step 3: Ensure sum matches total_budget (adjust last stock if rounding caused drift)
-            total_alloc = sum(a["Allocation($)"] for a in allocations)
-            drift = round(total_budget - total_alloc, 2)
-            if allocations and drift != 0:
-                allocations[-1]["Allocation($)"] += drift
+        Allocations:
+        {json.dumps(allocations)}
 
-        except Exception as e:
-            # Fallback if LLM fails
-            summary_text = f"Fallback: LLM error or invalid output: {str(e)}"
-            equal_alloc = round(total_budget / len(buy_stocks), 2) if buy_stocks else 0
-            allocations = [{"Ticker": s["ticker"], "Weight (%)": round(100 / len(buy_stocks), 2),
-                            "Allocation($)": equal_alloc} for s in buy_stocks]
+        Respond with the summary text only.
+        """
+        return [{"role": "user", "content": prompt}]
 
-        return summary_text, allocations
+    @staticmethod
+    def _allocation_summary(buy_stocks: list, allocations: list, method: str) -> str:
+        """Deterministic summary used when the LLM narrative is disabled or fails."""
+        by_sector = {}
+        for stock, alloc in zip(buy_stocks, allocations):
+            sector = stock.get("sector") or "Unknown"
+            by_sector[sector] = by_sector.get(sector, 0) + alloc["Weight (%)"]
+        sectors = ", ".join(f"{k} {v:.1f}%" for k, v in sorted(by_sector.items(), key=lambda kv: -kv[1]))
+        label = "mean-variance" if method == "mean_variance" else "risk-parity"
+        largest = max(allocations[:len(buy_stocks)], key=lambda a: a["Weight (%)"])
+        return (f"{len(buy_stocks)} buy-recommended stocks allocated with {label} weights; "
+                f"largest position {largest['Ticker']} at {largest['Weight (%)']:.1f}%. "
+                f"Sector exposure: {sectors}.")
 
     # def summarize_and_allocate(self, buy_stocks: list, total_budget: float = 100):
     #     """
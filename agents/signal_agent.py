@@ -1,4 +1,77 @@
 import datetime
+import json
+import numpy as np
+from tools.streaming_indicators import RollingMean
+from tools.indicators import IndicatorSet, right_align, tail_mean, last_valid, rolling_mean
+from tools.indicator_cache import default_indicator_cache, last_bar_timestamp, series_digest
+from tools.tracing import traced
+
+TREND_LABELS = {1: "upward", 0: "neutral", -1: "downward"}
+NO_HISTORY_SIGNALS = {"bullish_trend": None, "error": "No price history available."}
+
+# Default thresholds (tunable via SignalAgent(pe_threshold=..., volume_multiplier=...))
+PE_THRESHOLD = 30
+VOLUME_SPIKE_MULTIPLIER = 1.5
+
+
+class LiveSignalState:
+    """
+    Rolling per-ticker state (10/50-day close MAs, 20-day volume MA) updated
+    in constant time per bar or tick, so live quotes don't replay the history.
+    """
+
+    def __init__(self):
+        self.ma_10 = RollingMean(10)
+        self.ma_50 = RollingMean(50)
+        self.vol_20 = RollingMean(20)
+        self.last_close = None
+        self.last_volume = None
+
+    def update(self, close: float = None, volume: float = None, new_bar: bool = True):
+        """Feed one bar (new_bar=True) or revise the current bar with a tick."""
+        if close is not None:
+            for ma in (self.ma_10, self.ma_50):
+                ma.update(close) if new_bar else ma.replace_last(close)
+            self.last_close = close
+        if volume is not None:
+            self.vol_20.update(volume) if new_bar else self.vol_20.replace_last(volume)
+            self.last_volume = volume
+
+    def signals(self, price: float = None, pe_ratio: float = None,
+                pe_threshold: float = PE_THRESHOLD, volume_multiplier: float = VOLUME_SPIKE_MULTIPLIER) -> dict:
+        """Same signals as SignalAgent.generate_signals, from the rolling state."""
+        if self.ma_50.count == 0:
+            return {"bullish_trend": None, "error": "No bars received yet."}
+        price = self.last_close if price is None else price
+        avg_10, avg_50 = self.ma_10.value, self.ma_50.value
+        signals = {
+            "bullish_trend": price > avg_50,
+            "short_term_trend": TREND_LABELS[(avg_10 > avg_50) - (avg_10 < avg_50)],
+            "volume_spike": self.vol_20.count >= 20 and self.last_volume > volume_multiplier * self.vol_20.value,
+        }
+        if pe_ratio is not None:
+            signals["pe_signal"] = pe_ratio < pe_threshold
+        return signals
+
+    def to_dict(self) -> dict:
+        return {
+            "ma_10": self.ma_10.to_dict(),
+            "ma_50": self.ma_50.to_dict(),
+            "vol_20": self.vol_20.to_dict(),
+            "last_close": self.last_close,
+            "last_volume": self.last_volume,
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "LiveSignalState":
+        state = cls()
+        state.ma_10 = RollingMean.from_dict(d["ma_10"])
+        state.ma_50 = RollingMean.from_dict(d["ma_50"])
+        state.vol_20 = RollingMean.from_dict(d["vol_20"])
+        state.last_close = d.get("last_close")
+        state.last_volume = d.get("last_volume")
+        return state
+
 
 class SignalAgent:
     """
@@ -7,9 +80,178 @@ class SignalAgent:
     Web UI-ready output with robust handling of missing data.
     """
 
-    def __init__(self):
-        pass
+    def __init__(self, cache=None, interval: str = "1d",
+                 pe_threshold: float = PE_THRESHOLD, volume_multiplier: float = VOLUME_SPIKE_MULTIPLIER):
+        self.live_state = {}  # ticker -> LiveSignalState
+        self.pe_threshold = pe_threshold
+        self.volume_multiplier = volume_multiplier
+        self.cache = cache or default_indicator_cache
+        self.interval = interval
+
+    def generate_signals_batch(self, tickers, closes, volumes=None, prices=None, pe_ratios=None,
+                               highs=None, lows=None, indicators=None) -> dict:
+        """
+        Vectorized signals for a whole universe in one NumPy pass.
+
+        Args:
+            tickers: list of N tickers (row labels).
+            closes, volumes: (N x bars) matrices, right-aligned, NaN where missing.
+            prices: optional latest price per ticker (NaN falls back to last close).
+            pe_ratios: optional P/E per ticker (NaN = unknown).
+            highs, lows: optional matrices, needed for ATR.
+            indicators: optional indicator names from tools.indicators.IndicatorSet
+                (e.g. ["rsi", "macd"]); latest values are returned under "indicators".
+
+        Returns:
+            dict of length-N arrays: valid, bullish_trend, short_term_trend
+            (1 upward / 0 neutral / -1 downward), volume_spike, pe_known,
+            pe_signal, avg_10, avg_50. Rows with valid=False have no signals (their
+            flags are placeholders); batch_signals_for() turns them into the same
+            {"bullish_trend": None, "error": ...} dict generate_signals returns.
+        """
+        closes = np.atleast_2d(np.asarray(closes, dtype=float))
+        n = closes.shape[0]
+        volumes = np.full((n, 0), np.nan) if volumes is None else np.atleast_2d(np.asarray(volumes, dtype=float))
+        prices = np.full(n, np.nan) if prices is None else np.asarray(prices, dtype=float)
+        pe_ratios = np.full(n, np.nan) if pe_ratios is None else np.asarray(pe_ratios, dtype=float)
+
+        avg_50, close_count = tail_mean(closes, 50)
+        avg_10, _ = tail_mean(closes, 10)
+        valid = close_count > 0
+
+        # Fallback price
+        price = np.where(np.isnan(prices), last_valid(closes), prices)
+
+        # --- Bullish trend (price vs 50-day MA) and short-term trend (10-day vs 50-day MA) ---
+        with np.errstate(invalid="ignore"):
+            bullish = valid & (price > avg_50)
+            trend = np.where(valid, np.sign(avg_10 - avg_50), 0).astype(np.int8)
+
+        # --- Volume spike detection (latest vs average of last 20 days) ---
+        avg_vol, vol_count = tail_mean(volumes, 20)
+        with np.errstate(invalid="ignore"):
+            volume_spike = (vol_count >= 20) & (last_valid(volumes) > self.volume_multiplier * avg_vol)
+
+        # --- PE ratio signal ---
+        pe_known = ~np.isnan(pe_ratios)
+        with np.errstate(invalid="ignore"):
+            pe_signal = pe_known & (pe_ratios < self.pe_threshold)
 
+        batch = {
+            "tickers": list(tickers),
+            "valid": valid,
+            "bullish_trend": bullish,
+            "short_term_trend": trend,
+            "volume_spike": volume_spike,
+            "pe_known": pe_known,
+            "pe_signal": pe_signal,
+            "avg_10": avg_10,
+            "avg_50": avg_50,
+        }
+        if indicators:
+            same_shape = volumes.shape == closes.shape
+            batch["indicators"] = IndicatorSet(
+                closes, highs, lows, volumes if same_shape else None
+            ).latest(indicators)
+        return batch
+
+    def generate_signals_grid(self, closes, volumes=None, pe_ratios=None) -> dict:
+        """
+        Signals at every bar of a (tickers x bars) history, as if
+        generate_signals had been run on each day's trailing data.
+        Same keys as generate_signals_batch, each a (tickers x bars) array.
+        pe_ratios may be per ticker (static) or per ticker and bar.
+        """
+        closes = np.atleast_2d(np.asarray(closes, dtype=float))
+        volumes = np.full(closes.shape, np.nan) if volumes is None else np.atleast_2d(np.asarray(volumes, dtype=float))
+        pe = np.full(closes.shape[0], np.nan) if pe_ratios is None else np.asarray(pe_ratios, dtype=float)
+        pe = np.broadcast_to(pe[:, None] if pe.ndim == 1 else pe, closes.shape)
+
+        avg_50 = rolling_mean(closes, 50)
+        avg_10 = rolling_mean(closes, 10)
+        avg_vol = rolling_mean(volumes, 20, min_periods=20)
+        valid = ~np.isnan(closes)
+
+        with np.errstate(invalid="ignore"):
+            pe_known = ~np.isnan(pe)
+            return {
+                "valid": valid,
+                "bullish_trend": valid & (closes > avg_50),
+                "short_term_trend": np.where(valid, np.sign(avg_10 - avg_50), 0).astype(np.int8),
+                "volume_spike": volumes > self.volume_multiplier * avg_vol,
+                "pe_known": pe_known,
+                "pe_signal": pe_known & (pe < self.pe_threshold),
+                "avg_10": avg_10,
+                "avg_50": avg_50,
+            }
+
+    @staticmethod
+    def batch_signals_for(batch: dict, i: int) -> dict:
+        """Per-ticker signals dict (same shape as generate_signals) for row i of a batch."""
+        if not batch["valid"][i]:
+            return {"bullish_trend": None, "error": f"No valid Close_{batch['tickers'][i]} in price history."}
+        signals = {
+            "bullish_trend": bool(batch["bullish_trend"][i]),
+            "short_term_trend": TREND_LABELS[int(batch["short_term_trend"][i])],
+            "volume_spike": bool(batch["volume_spike"][i]),
+        }
+        if batch["pe_known"][i]:
+            signals["pe_signal"] = bool(batch["pe_signal"][i])
+        return signals
+
+    @staticmethod
+    def _extract_series(data_agent_output: dict):
+        """Pull closes, volumes, price and P/E for one DataAgent output."""
+        ticker = data_agent_output.get("ticker")
+        data_snapshot = data_agent_output.get("data", {})
+        price_history = data_snapshot.get("price_history") or []
+        close_key = f"Close_{ticker}"
+        volume_key = f"Volume_{ticker}"
+
+        closes = [float(p[close_key]) for p in price_history if p.get(close_key) is not None]
+        volumes = [float(p[volume_key]) for p in price_history if p.get(volume_key) is not None]
+        price = data_snapshot.get("price")
+        pe_ratio = (data_snapshot.get("fundamentals") or {}).get("pe_ratio")
+        return (
+            closes,
+            volumes,
+            np.nan if price is None else float(price),
+            np.nan if pe_ratio is None else float(pe_ratio),
+        )
+
+    def generate_signals_many(self, data_agent_outputs: list) -> list:
+        """Signals for many DataAgent outputs, computed in one batch pass."""
+        series = [self._extract_series(d) for d in data_agent_outputs]
+        batch = self.generate_signals_batch(
+            [d.get("ticker") for d in data_agent_outputs],
+            right_align([s[0] for s in series]),
+            right_align([s[1] for s in series]),
+            prices=[s[2] for s in series],
+            pe_ratios=[s[3] for s in series],
+        )
+        return [
+            {
+                "ticker": d.get("ticker"),
+                "generated_time": datetime.datetime.utcnow().isoformat(),
+                "signals": self.batch_signals_for(batch, i) if (d.get("data") or {}).get("price_history")
+                else dict(NO_HISTORY_SIGNALS),
+                "data_snapshot": d.get("data", {}),
+            }
+            for i, d in enumerate(data_agent_outputs)
+        ]
+
+    def _compute_signals(self, data_agent_output: dict) -> dict:
+        ticker = data_agent_output.get("ticker")
+        closes, volumes, price, pe_ratio = self._extract_series(data_agent_output)
+        if not closes:
+            return {"bullish_trend": None, "error": f"No valid Close_{ticker} in price history."}
+        batch = self.generate_signals_batch(
+            [ticker], right_align([closes]), right_align([volumes]),
+            prices=[price], pe_ratios=[pe_ratio],
+        )
+        return self.batch_signals_for(batch, 0)
+
+    @traced("signal_agent.generate_signals")
     def generate_signals(self, data_agent_output: dict) -> dict:
         ticker = data_agent_output.get("ticker")
         data_snapshot = data_agent_output.get("data", {})
@@ -22,64 +264,62 @@ class SignalAgent:
         }
 
         try:
-            price_history = data_snapshot.get("price_history", [])
-            price = data_snapshot.get("price")
-
-            if not price_history:
-                signals_output["signals"]["bullish_trend"] = None
-                signals_output["signals"]["error"] = "No price history available."
+            if not data_snapshot.get("price_history"):
+                signals_output["signals"] = dict(NO_HISTORY_SIGNALS)
                 return signals_output
 
-            # --- Extract ticker-suffixed keys ---
-            close_key = f"Close_{ticker}"
-            open_key = f"Open_{ticker}"
-            high_key = f"High_{ticker}"
-            low_key = f"Low_{ticker}"
-            volume_key = f"Volume_{ticker}"
-
-            closes = [float(p.get(close_key)) for p in price_history if p.get(close_key) is not None]
-            opens = [float(p.get(open_key)) for p in price_history if p.get(open_key) is not None]
-            highs = [float(p.get(high_key)) for p in price_history if p.get(high_key) is not None]
-            lows = [float(p.get(low_key)) for p in price_history if p.get(low_key) is not None]
-            volumes = [float(p.get(volume_key)) for p in price_history if p.get(volume_key) is not None]
-
-            if not closes:
-                signals_output["signals"]["bullish_trend"] = None
-                signals_output["signals"]["error"] = f"No valid {close_key} in price history."
-                return signals_output
-
-            # Fallback price
-            if price is None:
-                price = closes[-1]
-
-            # --- Bullish trend (price vs 50-day MA) ---
-            avg_50 = sum(closes[-50:]) / min(len(closes), 50)
-            signals_output["signals"]["bullish_trend"] = price > avg_50
-
-            # --- Short-term trend (10-day vs 50-day MA) ---
-            avg_10 = sum(closes[-10:]) / min(len(closes), 10)
-            if avg_10 > avg_50:
-                signals_output["signals"]["short_term_trend"] = "upward"
-            elif avg_10 < avg_50:
-                signals_output["signals"]["short_term_trend"] = "downward"
-            else:
-                signals_output["signals"]["short_term_trend"] = "neutral"
-
-            # --- Volume spike detection (latest vs average of last 20 days) ---
-            if volumes and len(volumes) >= 20:
-                avg_vol = sum(volumes[-20:]) / 20
-                signals_output["signals"]["volume_spike"] = volumes[-1] > 1.5 * avg_vol
-            else:
-                signals_output["signals"]["volume_spike"] = False
-
-            # --- PE ratio signal ---
-            fundamentals = data_snapshot.get("fundamentals", {})
-            pe_ratio = fundamentals.get("pe_ratio")
-            if pe_ratio is not None:
-                signals_output["signals"]["pe_signal"] = pe_ratio < 30  # example threshold
+            fundamentals = data_snapshot.get("fundamentals") or {}
+            # A partial intraday bar keeps its timestamp while its close and volume
+            # move, so key on the series themselves too (as TimingAgent does)
+            closes, volumes, _, _ = self._extract_series(data_agent_output)
+            key = self.cache.make_key(
+                ticker, self.interval, last_bar_timestamp(data_snapshot["price_history"]),
+                ("signals", data_snapshot.get("price"), fundamentals.get("pe_ratio"),
+                 self.pe_threshold, self.volume_multiplier, len(data_snapshot["price_history"]),
+                 series_digest(closes), series_digest(volumes)),
+            )
+            signals = self.cache.get_or_compute(key, lambda: self._compute_signals(data_agent_output))
+            signals_output["signals"] = dict(signals)
 
         except Exception as e:
             signals_output["signals"]["error"] = f"Signal generation failed: {str(e)}"
             signals_output["signals"]["bullish_trend"] = None
 
         return signals_output
+
+    # --- Live / streaming mode ---
+    def seed_live(self, data_agent_output: dict) -> LiveSignalState:
+        """Initialise a ticker's rolling state from its DataAgent price history."""
+        closes, volumes, _, _ = self._extract_series(data_agent_output)
+        state = LiveSignalState()
+        for close in closes[-50:]:
+            state.update(close=close)
+        for volume in volumes[-20:]:
+            state.update(volume=volume)
+        self.live_state[data_agent_output.get("ticker")] = state
+        return state
+
+    def update_live(self, ticker: str, close: float, volume: float = None,
+                    price: float = None, pe_ratio: float = None, new_bar: bool = True) -> dict:
+        """
+        Apply one live bar (or intrabar tick with new_bar=False) and return
+        signals in the generate_signals output format, in O(1).
+        """
+        state = self.live_state.setdefault(ticker, LiveSignalState())
+        state.update(close=close, volume=volume, new_bar=new_bar)
+        return {
+            "ticker": ticker,
+            "generated_time": datetime.datetime.utcnow().isoformat(),
+            "signals": state.signals(price=price, pe_ratio=pe_ratio, pe_threshold=self.pe_threshold,
+                                     volume_multiplier=self.volume_multiplier),
+            "data_snapshot": {},
+        }
+
+    def save_live_state(self, path: str):
+        """Persist all rolling states as JSON so a later run can resume the stream."""
+        with open(path, "w") as f:
+            json.dump({t: s.to_dict() for t, s in self.live_state.items()}, f)
+
+    def load_live_state(self, path: str):
+        with open(path) as f:
+            self.live_state = {t: LiveSignalState.from_dict(d) for t, d in json.load(f).items()}
@@ -1,4 +1,112 @@
 import datetime
+import numpy as np
+from tools.indicators import IndicatorSet, tail_mean
+from tools.indicator_cache import default_indicator_cache, last_bar_timestamp, series_digest
+from tools.tracing import traced
+
+TIMING_INDICATORS = ("rsi", "macd", "drawdown")
+
+# Declarative confidence rules. For each signal the cases are checked in order;
+# the first case whose value matches adds its weight and reason, otherwise the
+# default reason (if any) is used. Missing signals never match a case.
+TIMING_RULES = [
+    {"signal": "bullish_trend",
+     "cases": [(True, 0.4, "Bullish trend confirmed.")],
+     "default": "Not bullish."},
+    {"signal": "short_term_trend",
+     "cases": [("upward", 0.2, "Short-term trend upward."),
+               ("neutral", 0.1, "Short-term trend neutral.")],
+     "default": "Short-term trend downward."},
+    {"signal": "volume_spike",
+     "cases": [(False, 0.2, "No volume spike detected.")],
+     "default": "Volume spike detected; caution."},
+    {"signal": "pe_signal",
+     "cases": [(True, 0.2, "PE ratio favorable."),
+               (False, 0.0, "PE ratio unfavorable.")],
+     "default": None},
+]
+
+# (minimum confidence, label), checked from the top; below all -> DEFAULT_TIMING
+TIMING_THRESHOLDS = [(0.7, "Buy now"), (0.4, "Consider buying soon")]
+DEFAULT_TIMING = "Wait"
+
+
+def build_timing_rules(bullish: float = 0.4, upward: float = 0.2, neutral: float = 0.1,
+                       no_volume_spike: float = 0.2, pe_favorable: float = 0.2) -> list:
+    """TIMING_RULES with custom weights (used by the walk-forward optimizer)."""
+    weights = {
+        ("bullish_trend", True): bullish,
+        ("short_term_trend", "upward"): upward,
+        ("short_term_trend", "neutral"): neutral,
+        ("volume_spike", False): no_volume_spike,
+        ("pe_signal", True): pe_favorable,
+    }
+    return [
+        {**rule, "cases": [(value, weights.get((rule["signal"], value), weight), reason)
+                           for value, weight, reason in rule["cases"]]}
+        for rule in TIMING_RULES
+    ]
+
+
+def build_timing_thresholds(buy_now: float = 0.7, consider: float = 0.4) -> list:
+    return [(buy_now, TIMING_THRESHOLDS[0][1]), (consider, TIMING_THRESHOLDS[1][1])]
+
+
+# Numeric codes used by batch mode for signal values (NaN = missing)
+SIGNAL_CODES = {True: 1.0, False: 0.0, "upward": 1.0, "neutral": 0.0, "downward": -1.0}
+
+
+def encode_signal_batch(batch: dict) -> dict:
+    """Turn a SignalAgent.generate_signals_batch() result into NaN-coded arrays per signal."""
+    valid = batch["valid"]
+    return {
+        "bullish_trend": np.where(valid, batch["bullish_trend"].astype(float), np.nan),
+        "short_term_trend": np.where(valid, batch["short_term_trend"].astype(float), np.nan),
+        "volume_spike": np.where(valid, batch["volume_spike"].astype(float), np.nan),
+        "pe_signal": np.where(valid & batch["pe_known"], batch["pe_signal"].astype(float), np.nan),
+    }
+
+
+class TimingBatchResult:
+    """
+    Timing for a whole universe. Confidence and labels are arrays; reasoning
+    text is only assembled when asked for, for the tickers actually shown.
+    """
+
+    def __init__(self, tickers, confidence, optimal_timing, matched, rules, valid=None):
+        self.tickers = list(tickers)
+        self.confidence = confidence
+        self.optimal_timing = optimal_timing
+        self._matched = matched  # per rule: index of the matching case, -1 if none
+        self._rules = rules
+        self._valid = np.ones(len(self.tickers), dtype=bool) if valid is None else np.asarray(valid)
+        self._index = {t: i for i, t in enumerate(self.tickers)}
+
+    def reasoning(self, ticker) -> str:
+        i = self._index[ticker]
+        if not self._valid[i]:
+            return f"No valid Close_{ticker} in price history."
+        parts = []
+        for rule, matched in zip(self._rules, self._matched):
+            case = int(matched[i])
+            reason = rule["cases"][case][2] if case >= 0 else rule["default"]
+            if reason:
+                parts.append(reason)
+        return " ".join(parts)
+
+    def to_records(self, tickers=None) -> list:
+        """Per-ticker timing dicts (with reasoning) for the given tickers, default all."""
+        records = []
+        for ticker in tickers if tickers is not None else self.tickers:
+            i = self._index[ticker]
+            records.append({
+                "ticker": ticker,
+                "optimal_timing": None if self.optimal_timing[i] is None else str(self.optimal_timing[i]),
+                "confidence": round(float(self.confidence[i]), 2),
+                "reasoning": self.reasoning(ticker),
+            })
+        return records
+
 
 class TimingAgent:
     """
@@ -6,9 +114,84 @@ class TimingAgent:
     and enhanced signals. Returns web UI-ready output including confidence score.
     """
 
-    def __init__(self):
-        pass
+    def __init__(self, cache=None, interval: str = "1d", rules=None, thresholds=None):
+        self.cache = cache or default_indicator_cache
+        self.interval = interval
+        self.rules = rules or TIMING_RULES
+        self.thresholds = thresholds or TIMING_THRESHOLDS
+        self.labels = [label for _, label in self.thresholds] + [DEFAULT_TIMING]
+
+    def apply_rules(self, signals: dict):
+        """Confidence and reasoning parts for one ticker's signals dict."""
+        confidence = 0.0
+        reasoning_parts = []
+        for rule in self.rules:
+            value = signals.get(rule["signal"])
+            reason = rule["default"]
+            for case_value, weight, case_reason in rule["cases"]:
+                if value is not None and value == case_value:
+                    confidence += weight
+                    reason = case_reason
+                    break
+            if reason:
+                reasoning_parts.append(reason)
+        return confidence, reasoning_parts
+
+    def decide(self, confidence: float) -> str:
+        for minimum, label in self.thresholds:
+            if confidence >= minimum:
+                return label
+        return DEFAULT_TIMING
+
+    def score_codes(self, codes: dict):
+        """
+        Vectorized rule table over NaN-coded signal arrays of any shape.
+        Returns (confidence, decision, matched case index per rule), where
+        decision indexes into self.labels.
+        """
+        shape = np.shape(next(iter(codes.values())))
+        confidence = np.zeros(shape)
+        matched = []
+        for rule in self.rules:
+            values = codes.get(rule["signal"], np.full(shape, np.nan))
+            case_idx = np.full(shape, -1, dtype=np.int8)
+            for k, (case_value, weight, _) in enumerate(rule["cases"]):
+                hit = (case_idx < 0) & (values == SIGNAL_CODES[case_value])
+                case_idx[hit] = k
+                confidence = confidence + np.where(hit, weight, 0.0)
+            matched.append(case_idx)
+
+        decision = np.select(
+            [confidence >= minimum for minimum, _ in self.thresholds],
+            list(range(len(self.thresholds))),
+            default=len(self.thresholds),
+        )
+        return confidence, decision, matched
+
+    def generate_timing_batch(self, signal_batch: dict) -> TimingBatchResult:
+        """
+        Score a whole SignalAgent.generate_signals_batch() result at once.
+        Rows without valid closes get no timing (None, 0.0), as generate_timing gives them.
+        """
+        valid = np.asarray(signal_batch["valid"], dtype=bool)
+        confidence, decision, matched = self.score_codes(encode_signal_batch(signal_batch))
+        labels = np.where(valid, np.array(self.labels, dtype=object)[decision], None)
+        confidence = np.where(valid, confidence, 0.0)
+        return TimingBatchResult(signal_batch["tickers"], confidence, labels, matched, self.rules, valid)
+
+    @staticmethod
+    def _compute_indicators(closes: list) -> dict:
+        close_matrix = np.asarray([closes], dtype=float)
+        avg_10, _ = tail_mean(close_matrix, 10)
+        avg_50, _ = tail_mean(close_matrix, 50)
+        latest = IndicatorSet(close_matrix).latest(TIMING_INDICATORS)
+        return {
+            "avg_10": float(avg_10[0]),
+            "avg_50": float(avg_50[0]),
+            **{name: float(values[0]) for name, values in latest.items()},
+        }
 
+    @traced("timing_agent.generate_timing")
     def generate_timing(self, data_agent_output: dict, signals: dict = None) -> dict:
         ticker = data_agent_output.get("ticker")
         data_snapshot = data_agent_output.get("data", {})
@@ -20,6 +203,7 @@ class TimingAgent:
             "optimal_timing": None,
             "confidence": 0.0,  # new field
             "reasoning": "",
+            "indicators": {},
             "data_snapshot": data_snapshot,
             "signals": signals.get("signals", {})
         }
@@ -37,58 +221,20 @@ class TimingAgent:
                 timing_output["reasoning"] = f"No valid {close_key} in price history."
                 return timing_output
 
-            latest_price = closes[-1]
-            avg_10 = sum(closes[-10:]) / min(len(closes), 10)
-            avg_50 = sum(closes[-50:]) / min(len(closes), 50)
-
-            reasoning_parts = []
-            confidence = 0.0
-
-            # --- Use signals if available ---
-            bullish = signals.get("signals", {}).get("bullish_trend")
-            short_term = signals.get("signals", {}).get("short_term_trend")
-            volume_spike = signals.get("signals", {}).get("volume_spike")
-            pe_signal = signals.get("signals", {}).get("pe_signal")
-
-            # Bullish trend
-            if bullish:
-                confidence += 0.4
-                reasoning_parts.append("Bullish trend confirmed.")
-            else:
-                reasoning_parts.append("Not bullish.")
-
-            # Short-term trend
-            if short_term == "upward":
-                confidence += 0.2
-                reasoning_parts.append("Short-term trend upward.")
-            elif short_term == "neutral":
-                confidence += 0.1
-                reasoning_parts.append("Short-term trend neutral.")
-            else:
-                reasoning_parts.append("Short-term trend downward.")
-
-            # Volume spike
-            if volume_spike is False:
-                confidence += 0.2
-                reasoning_parts.append("No volume spike detected.")
-            else:
-                reasoning_parts.append("Volume spike detected; caution.")
-
-            # PE ratio signal
-            if pe_signal:
-                confidence += 0.2
-                reasoning_parts.append("PE ratio favorable.")
-            elif pe_signal is False:
-                reasoning_parts.append("PE ratio unfavorable.")
-
-            # Decision logic based on confidence
-            if confidence >= 0.7:
-                timing_output["optimal_timing"] = "Buy now"
-            elif confidence >= 0.4:
-                timing_output["optimal_timing"] = "Consider buying soon"
-            else:
-                timing_output["optimal_timing"] = "Wait"
-
+            # --- Shared indicator pass (informational; not part of confidence) ---
+            # EMA/RSI seeds and drawdown depend on the whole series, and an intraday
+            # partial bar keeps its timestamp while its close moves, so key on the closes too
+            key = self.cache.make_key(
+                ticker, self.interval, last_bar_timestamp(price_history),
+                ("timing", TIMING_INDICATORS, len(closes), series_digest(closes))
+            )
+            timing_output["indicators"] = dict(
+                self.cache.get_or_compute(key, lambda: self._compute_indicators(closes))
+            )
+
+            # --- Apply the rule table to the signals ---
+            confidence, reasoning_parts = self.apply_rules(signals.get("signals", {}))
+            timing_output["optimal_timing"] = self.decide(confidence)
             timing_output["confidence"] = round(confidence, 2)
             timing_output["reasoning"] = " ".join(reasoning_parts)
 
@@ -0,0 +1,209 @@
+import datetime
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional
+import numpy as np
+from agents.backtest_agent import BacktestAgent, forward_returns
+from agents.signal_agent import SignalAgent
+from agents.timing_agent import TimingAgent, build_timing_rules, build_timing_thresholds
+
+# Candidate values for the hard-coded weights/thresholds in SignalAgent and TimingAgent
+PARAM_GRID = {
+    "bullish": [0.3, 0.4, 0.5],
+    "upward": [0.1, 0.2, 0.3],
+    "no_volume_spike": [0.1, 0.2],
+    "pe_favorable": [0.1, 0.2],
+    "buy_now": [0.6, 0.7, 0.8],
+    "consider": [0.4],
+    "pe_threshold": [20, 30, 40],
+    "volume_multiplier": [1.5, 2.0],
+}
+
+# Axes that can't change a result when the matching input is missing
+PE_PARAMS = ("pe_threshold", "pe_favorable")
+VOLUME_PARAMS = ("volume_multiplier",)
+
+# Worker-side views onto the shared price matrices (set by _init_worker)
+_SHARED = {}
+
+
+def _attach(name: str, shape, dtype):
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+def _init_worker(layout: Dict, pe_ratios, horizon: int):
+    """Pool initializer: map the shared closes/volumes once per worker process."""
+    for key, (name, shape, dtype) in layout.items():
+        shm, array = _attach(name, shape, dtype)
+        _SHARED[key] = array
+        _SHARED[f"_{key}_shm"] = shm  # keep the mapping alive
+    _SHARED["pe_ratios"] = pe_ratios
+    _SHARED["horizon"] = horizon
+
+
+def _evaluate_params(params: Dict):
+    """
+    Score one parameter set over the whole history.
+    Returns per-bar totals for "Buy now" calls (count, hits, summed forward
+    return) so the parent can evaluate any window with slice sums.
+    """
+    closes, volumes = _SHARED["closes"], _SHARED["volumes"]
+    return params, _per_bar_stats(params, closes, volumes, _SHARED["pe_ratios"], _SHARED["horizon"])
+
+
+def _per_bar_stats(params: Dict, closes, volumes, pe_ratios, horizon: int):
+    signal_agent = SignalAgent(pe_threshold=params["pe_threshold"],
+                               volume_multiplier=params["volume_multiplier"])
+    timing_agent = TimingAgent(
+        rules=build_timing_rules(bullish=params["bullish"], upward=params["upward"],
+                                 no_volume_spike=params["no_volume_spike"],
+                                 pe_favorable=params["pe_favorable"]),
+        thresholds=build_timing_thresholds(buy_now=params["buy_now"], consider=params["consider"]),
+    )
+    valid, _, decision = BacktestAgent(signal_agent, timing_agent).score_grid(closes, volumes, pe_ratios)
+    fwd = forward_returns(closes, horizon)
+    calls = valid & (decision == 0) & ~np.isnan(fwd)
+    return (
+        calls.sum(axis=0),
+        (calls & (fwd > 0)).sum(axis=0),
+        np.where(calls, fwd, 0.0).sum(axis=0),
+    )
+
+
+def _window_totals(per_bar, start: int, end: int):
+    """(calls, hits, summed forward return) over bars [start, end)."""
+    return (
+        int(per_bar[0][start:end].sum()),
+        int(per_bar[1][start:end].sum()),
+        float(per_bar[2][start:end].sum()),
+    )
+
+
+def _format_stats(calls: int, hits: int, ret_sum: float) -> Dict:
+    return {
+        "calls": calls,
+        "hit_rate": round(hits / calls, 4) if calls else None,
+        "mean_return": round(ret_sum / calls, 4) if calls else None,
+    }
+
+
+class WalkForwardOptimizer:
+    """
+    Walk-forward search over the timing/signal parameters.
+    Every parameter set is scored on the full history once (signals only use
+    trailing data), in a process pool whose workers share one read-only
+    copy of the price matrices through shared memory. Each window then picks
+    the set with the best in-sample mean "Buy now" forward return and reports
+    how it did on the following out-of-sample window.
+    """
+
+    def __init__(self, param_grid: Optional[Dict] = None, horizon: int = 20,
+                 train_bars: int = 504, test_bars: int = 126, min_calls: int = 30,
+                 warmup: int = 50, workers: Optional[int] = None):
+        self.param_grid = param_grid or PARAM_GRID
+        self.horizon = horizon
+        self.train_bars = train_bars
+        self.test_bars = test_bars
+        self.min_calls = min_calls
+        self.warmup = warmup
+        self.workers = workers
+
+    def parameter_sets(self, has_pe: bool = True, has_volume: bool = True) -> List[Dict]:
+        """
+        Every combination in the grid. Without P/E (or volume) data those
+        axes are pinned to their first value, since the other values would
+        only repeat the same worker run.
+        """
+        inert = (() if has_pe else PE_PARAMS) + (() if has_volume else VOLUME_PARAMS)
+        grid = {k: v[:1] if k in inert else v for k, v in self.param_grid.items()}
+        keys = list(grid)
+        sets = (dict(zip(keys, values)) for values in itertools.product(*grid.values()))
+        return [p for p in sets if p["buy_now"] > p["consider"]]
+
+    def windows(self, n_bars: int) -> List[tuple]:
+        """(train_start, train_end, test_end) bar indices for each walk-forward step."""
+        out = []
+        start = self.warmup
+        while start + self.train_bars + self.test_bars <= n_bars:
+            train_end = start + self.train_bars
+            out.append((start, train_end, train_end + self.test_bars))
+            start += self.test_bars
+        return out
+
+    def _evaluate_all(self, closes: np.ndarray, volumes: np.ndarray, pe_ratios) -> list:
+        param_sets = self.parameter_sets(has_pe=pe_ratios is not None and not np.isnan(pe_ratios).all(),
+                                         has_volume=not np.isnan(volumes).all())
+        blocks, layout = [], {}
+        try:
+            for key, array in (("closes", closes), ("volumes", volumes)):
+                shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+                np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[:] = array
+                blocks.append(shm)
+                layout[key] = (shm.name, array.shape, array.dtype.str)
+
+            with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                     initargs=(layout, pe_ratios, self.horizon)) as pool:
+                chunksize = max(1, len(param_sets) // ((self.workers or 4) * 4))
+                return list(pool.map(_evaluate_params, param_sets, chunksize=chunksize))
+        finally:
+            for shm in blocks:
+                shm.close()
+                shm.unlink()
+
+    def run(self, bars: Dict, pe_ratios=None) -> Dict:
+        """
+        Run the walk-forward search over `bars` (see BacktestAgent.load_bars).
+        Returns the best parameter set per window with in-sample and
+        out-of-sample stats, plus pooled out-of-sample totals.
+        """
+        closes = np.ascontiguousarray(bars["closes"], dtype=float)
+        volumes = bars.get("volumes")
+        volumes = np.full(closes.shape, np.nan) if volumes is None else np.ascontiguousarray(volumes, dtype=float)
+        dates = bars.get("dates")
+        pe = None if pe_ratios is None else np.asarray(pe_ratios, dtype=float)
+
+        evaluated = self._evaluate_all(closes, volumes, pe)
+
+        windows = []
+        oos_calls = oos_hits = 0
+        oos_ret = 0.0
+        for train_start, train_end, test_end in self.windows(closes.shape[1]):
+            best = None
+            for params, per_bar in evaluated:
+                # Stop in-sample scoring `horizon` bars early so forward returns don't peek into the test window
+                calls, hits, ret_sum = _window_totals(per_bar, train_start, train_end - self.horizon)
+                if calls < self.min_calls:
+                    continue
+                if best is None or ret_sum / calls > best[1][2] / best[1][0]:
+                    best = (params, (calls, hits, ret_sum), per_bar)
+            if best is None:
+                continue
+
+            params, in_sample, per_bar = best
+            out_sample = _window_totals(per_bar, train_end, test_end)
+            oos_calls += out_sample[0]
+            oos_hits += out_sample[1]
+            oos_ret += out_sample[2]
+            windows.append({
+                "train": self._span(dates, train_start, train_end),
+                "test": self._span(dates, train_end, test_end),
+                "best_params": params,
+                "in_sample": _format_stats(*in_sample),
+                "out_of_sample": _format_stats(*out_sample),
+            })
+
+        return {
+            "generated_time": datetime.datetime.utcnow().isoformat(),
+            "parameter_sets": len(evaluated),
+            "horizon": self.horizon,
+            "windows": windows,
+            "out_of_sample": _format_stats(oos_calls, oos_hits, oos_ret),
+        }
+
+    @staticmethod
+    def _span(dates, start: int, end: int):
+        if dates is None or not len(dates):
+            return [start, end]
+        return [str(dates[start]), str(dates[min(end, len(dates)) - 1])]
@@ -0,0 +1,111 @@
+# scheduler.py
+"""
+Headless precompute daemon: runs the full PortfolioOrchestrator pipeline on
+a schedule and publishes each result as a versioned snapshot, so the web app
+can show the latest analysis instantly instead of running it per click.
+
+    python scheduler.py                 # every 60 min in market hours + 16:15 ET
+    python scheduler.py --interval 0    # after the close only
+    python scheduler.py --once          # one run now, then exit
+
+Schedule times are US/Eastern weekdays; exchange holidays are not skipped.
+"""
+import argparse
+import time
+from datetime import datetime, time as dtime, timedelta
+from typing import Optional
+from zoneinfo import ZoneInfo
+from dotenv import load_dotenv
+
+from agents.portfolio_orchestrator import EarlyExitPolicy, PortfolioOrchestrator
+from agents.recommendation_agent import RecommendationAgent
+from tools.snapshot_store import SnapshotStore
+
+MARKET_TZ = ZoneInfo("America/New_York")
+MARKET_OPEN = dtime(9, 30)
+MARKET_CLOSE = dtime(16, 0)
+
+
+def next_run_time(now: datetime, interval_minutes: int = 60, close_run: dtime = dtime(16, 15)) -> datetime:
+    """
+    First scheduled slot after now (an aware datetime): every interval_minutes
+    from the open to the close on weekdays (0 = none), plus close_run.
+    """
+    now = now.astimezone(MARKET_TZ)
+    for day in range(8):
+        date = (now + timedelta(days=day)).date()
+        if date.weekday() >= 5:
+            continue
+        slots = [datetime.combine(date, close_run, tzinfo=MARKET_TZ)]
+        if interval_minutes > 0:
+            slot = datetime.combine(date, MARKET_OPEN, tzinfo=MARKET_TZ)
+            close = datetime.combine(date, MARKET_CLOSE, tzinfo=MARKET_TZ)
+            while slot <= close:
+                slots.append(slot)
+                slot += timedelta(minutes=interval_minutes)
+        upcoming = [s for s in slots if s.timestamp() > now.timestamp()]
+        if upcoming:
+            return min(upcoming, key=lambda s: s.timestamp())
+    raise RuntimeError("No run slot within a week")
+
+
+def publish_snapshot(orchestrator: PortfolioOrchestrator, store: SnapshotStore, limit: int = 20,
+                     budget: float = 100) -> str:
+    """Run the pipeline plus the budget allocation once and publish it; returns the snapshot version."""
+    output = orchestrator.run(limit=limit)
+    buy_stocks = RecommendationAgent.buy_stock_inputs(output["portfolio_results"])
+    summary_text, allocations = orchestrator.recommendation_agent.summarize_and_allocate(
+        buy_stocks, total_budget=budget)
+    if orchestrator.runs is not None:
+        orchestrator.runs.record_allocations(output["run_id"], allocations, budget)
+    return store.publish(output, {"budget": budget, "summary": summary_text, "allocations": allocations})
+
+
+def sleep_until(when: datetime):
+    # Short naps so a suspended machine or clock change doesn't oversleep by hours
+    while True:
+        remaining = when.timestamp() - time.time()
+        if remaining <= 0:
+            return
+        time.sleep(min(remaining, 60))
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Precompute portfolio snapshots on a schedule.")
+    parser.add_argument("--once", action="store_true", help="run once now and exit")
+    parser.add_argument("--limit", type=int, default=20, help="tickers to scan per run")
+    parser.add_argument("--budget", type=float, default=100, help="budget for the allocation")
+    parser.add_argument("--interval", type=int, default=60, help="minutes between runs in market hours (0 = off)")
+    parser.add_argument("--close-run", default="16:15", help="daily post-close run, HH:MM US/Eastern")
+    parser.add_argument("--snapshots", default="downloads/snapshots", help="snapshot directory")
+    parser.add_argument("--keep", type=int, default=48, help="snapshots to keep")
+    parser.add_argument("--target-buys", type=int, default=0,
+                        help="stop a run after this many buys (0 = analyse every scanned ticker)")
+    parser.add_argument("--min-sectors", type=int, default=3, help="sectors the early-exit buys must span")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    close_run = dtime.fromisoformat(args.close_run)
+    store = SnapshotStore(args.snapshots, keep=args.keep)
+    early_exit = EarlyExitPolicy(args.target_buys, args.min_sectors) if args.target_buys > 0 else None
+    orchestrator = PortfolioOrchestrator(early_exit=early_exit)
+
+    while True:
+        if not args.once:
+            when = next_run_time(datetime.now(MARKET_TZ), args.interval, close_run)
+            print(f"[Scheduler] Next run at {when:%Y-%m-%d %H:%M %Z}")
+            sleep_until(when)
+
+        started = time.time()
+        try:
+            version = publish_snapshot(orchestrator, store, limit=args.limit, budget=args.budget)
+            print(f"[Scheduler] Published snapshot {version} in {time.time() - started:.1f}s")
+        except Exception as e:
+            print(f"[Scheduler] Run failed: {e}")
+
+        if args.once:
+            break
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+# tools/async_utils.py
+import asyncio
+import contextvars
+import threading
+from typing import Any, Coroutine
+
+
+def run_sync(coro: Coroutine) -> Any:
+    """
+    Run a coroutine to completion from sync code and return its result.
+
+    Without a running event loop this is asyncio.run(). Inside one (Jupyter,
+    an async web framework, another agent's async path) asyncio.run() would
+    raise, so the coroutine gets its own loop on a helper thread instead and
+    the caller blocks until it finishes. Callbacks passed into the coroutine
+    then run on that helper thread; async callers should await the a*
+    method directly rather than go through a sync wrapper.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+
+    outcome = {}
+    context = contextvars.copy_context()
+
+    def target():
+        try:
+            outcome["value"] = context.run(asyncio.run, coro)
+        except BaseException as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=target, name="run_sync", daemon=True)
+    thread.start()
+    thread.join()
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["value"]
@@ -0,0 +1,107 @@
+# tools/checkpoint_store.py
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, Optional
+from tools.tracing import traced
+
+
+class CheckpointStore:
+    """
+    SQLite store of per-ticker stage outputs, keyed by (run_id, stage, ticker).
+    Values are pickled and zlib-compressed. A run stays "running" until
+    finish_run(), so an interrupted run can be found and resumed; prune()
+    drops runs that were never resumed.
+    """
+
+    def __init__(self, path: str = "downloads/checkpoints.sqlite", compress_level: int = 6):
+        self.path = path
+        self.compress_level = compress_level
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS runs ("
+            " run_id TEXT PRIMARY KEY, status TEXT, params TEXT, created REAL, finished REAL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoints ("
+            " run_id TEXT, stage TEXT, ticker TEXT, blob BLOB, created REAL,"
+            " PRIMARY KEY (run_id, stage, ticker))"
+        )
+        self._conn.commit()
+
+    def start_run(self, run_id: str, params: Optional[Dict] = None):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO runs (run_id, status, params, created) VALUES (?, 'running', ?, ?)",
+                (run_id, repr(params or {}), time.time()),
+            )
+            self._conn.execute("UPDATE runs SET status = 'running', finished = NULL WHERE run_id = ?", (run_id,))
+            self._conn.commit()
+
+    def finish_run(self, run_id: str):
+        with self._lock:
+            self._conn.execute("UPDATE runs SET status = 'finished', finished = ? WHERE run_id = ?",
+                               (time.time(), run_id))
+            self._conn.commit()
+
+    def latest_unfinished_run(self) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT run_id FROM runs WHERE status = 'running' ORDER BY created DESC LIMIT 1"
+            ).fetchone()
+        return row[0] if row else None
+
+    @traced("checkpoint.put", source="checkpoint", ticker_arg=3)
+    def put(self, run_id: str, stage: str, ticker: str, value: Any):
+        blob = zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), self.compress_level)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (run_id, stage, ticker, blob, created) VALUES (?, ?, ?, ?, ?)",
+                (run_id, stage, ticker, blob, time.time()),
+            )
+            self._conn.commit()
+
+    @traced("checkpoint.get", source="checkpoint", ticker_arg=3)
+    def get(self, run_id: str, stage: str, ticker: str, default=None) -> Any:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT blob FROM checkpoints WHERE run_id = ? AND stage = ? AND ticker = ?",
+                (run_id, stage, ticker),
+            ).fetchone()
+        if row is None:
+            return default
+        try:
+            return pickle.loads(zlib.decompress(row[0]))
+        except Exception as e:
+            print(f"[CheckpointStore] Dropping unreadable checkpoint {run_id}/{stage}/{ticker}: {e}")
+            return default
+
+    def completed(self, run_id: str) -> Dict[str, int]:
+        """Number of checkpointed tickers per stage."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT stage, COUNT(*) FROM checkpoints WHERE run_id = ? GROUP BY stage", (run_id,)
+            ).fetchall()
+        return dict(rows)
+
+    def delete_run(self, run_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM checkpoints WHERE run_id = ?", (run_id,))
+            self._conn.execute("DELETE FROM runs WHERE run_id = ?", (run_id,))
+            self._conn.commit()
+
+    def prune(self, days: float):
+        """Drop every run (finished or not) started more than `days` ago, with its checkpoints."""
+        cutoff = time.time() - days * 86400
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM checkpoints WHERE run_id IN (SELECT run_id FROM runs WHERE created < ?)", (cutoff,))
+            self._conn.execute("DELETE FROM runs WHERE created < ?", (cutoff,))
+            self._conn.commit()
@@ -1,7 +1,9 @@
 # tools/earnings_tool.py
+import asyncio
 import yfinance as yf
 import pandas as pd
 from typing import Optional
+from tools.tracing import traced
 
 class EarningsTool:
     """
@@ -12,6 +14,7 @@ class EarningsTool:
     def __init__(self):
         pass
 
+    @traced("earnings.history", source="yahoo")
     def get_earnings_history(self, symbol: str) -> Optional[pd.DataFrame]:
         """
         Returns historical earnings (quarterly or annual)
@@ -28,6 +31,7 @@ class EarningsTool:
             print(f"[EarningsTool] Failed to fetch earnings for {symbol}: {e}")
             return None
 
+    @traced("earnings.next_date", source="yahoo")
     def get_next_earnings_date(self, symbol: str) -> Optional[str]:
         try:
             ticker = yf.Ticker(symbol)
@@ -49,3 +53,8 @@ class EarningsTool:
         except Exception:
             return None
 
+    async def aget_earnings_history(self, symbol: str) -> Optional[pd.DataFrame]:
+        return await asyncio.to_thread(self.get_earnings_history, symbol)
+
+    async def aget_next_earnings_date(self, symbol: str) -> Optional[str]:
+        return await asyncio.to_thread(self.get_next_earnings_date, symbol)
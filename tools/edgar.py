@@ -1,40 +1,65 @@
+import asyncio
+import json
 import requests
 import os
-from typing import Optional, Dict, List
+import time
+from typing import Optional, Dict, List, Union
 from xml.etree import ElementTree
 import xml.etree.ElementTree as ET
 from pathlib import Path
+from tools.run_context import RunContext, memoized
+from tools.tracing import traced
 
 
 class EdgarTool:
     """
     Fetches SEC 13F filings from EDGAR using the Atom feed search.
     Downloads filings as TXT for display in web app.
+    With a RunContext set, the SEC ticker map, CIKs and filing lookups are
+    fetched once per run. Parsed holdings are cached on disk per ticker
+    (see get_holdings), so a filing is downloaded and parsed once.
     """
 
     SEARCH_URL = "https://www.sec.gov/cgi-bin/browse-edgar"
 
-    def __init__(self, user_agent: str = "MyStockApp/0.1 (email@example.com)"):
+    def __init__(self, user_agent: str = "MyStockApp/0.1 (email@example.com)",
+                 context: Optional[RunContext] = None):
         self.headers = {"User-Agent": user_agent}
         self.download_dir = "downloads/edgar"
-        os.makedirs(self.download_dir, exist_ok=True)
+        self.holdings_dir = os.path.join(self.download_dir, "holdings")
+        self.context = context
+        os.makedirs(self.holdings_dir, exist_ok=True)
 
+    @traced("edgar.company_tickers", source="edgar")
+    def _company_tickers(self) -> Dict:
+        """SEC ticker -> CIK map (one large JSON file)."""
+        def fetch():
+            url = "https://www.sec.gov/files/company_tickers.json"
+            resp = requests.get(url, headers=self.headers, timeout=10)
+            resp.raise_for_status()
+            return resp.json()
+        # Large and only read by get_cik, so not copied per call
+        return memoized(self.context, "sec_company_tickers", None, fetch, copy_value=False)
+
+    @traced("edgar.cik", source="edgar")
     def get_cik(self, ticker: str) -> Optional[str]:
         """Fetch CIK for a given ticker."""
-        url = "https://www.sec.gov/files/company_tickers.json"
-        resp = requests.get(url, headers=self.headers, timeout=10)
-        resp.raise_for_status()
-        tickers = resp.json()
-        for item in tickers.values():
-            if item["ticker"].upper() == ticker.upper():
-                return str(int(item["cik_str"]))  # no leading zeros
-        return None
+        def lookup():
+            for item in self._company_tickers().values():
+                if item["ticker"].upper() == ticker.upper():
+                    return str(int(item["cik_str"]))  # no leading zeros
+            return None
+        return memoized(self.context, "sec_cik", ticker.upper(), lookup)
 
+    @traced("edgar.latest_13f", source="edgar")
     def get_latest_13f(self, ticker: str) -> Optional[Dict]:
         """
         Get latest 13F-HR filing metadata from EDGAR Atom feed.
         Returns dict with keys: ticker, filing_date, accession_number, txt_url
         """
+        return memoized(self.context, "sec_latest_13f", ticker.upper(), lambda: self._fetch_latest_13f(ticker))
+
+    def _fetch_latest_13f(self, ticker: str) -> Optional[Dict]:
         cik = self.get_cik(ticker)
         if not cik:
             print(f"[EDGAR] CIK not found for {ticker}.")
@@ -83,6 +108,7 @@ class EdgarTool:
             "txt_url": txt_url
         }
 
+    @traced("edgar.download_filing", source="edgar")
     def download_filing(self, latest_13f: Dict) -> Optional[str]:
         """
         Downloads the 13F TXT filing to downloads/edgar/ and returns the file path.
@@ -116,13 +142,14 @@ class EdgarTool:
             print(f"[EDGAR] Failed to download filing: {e}")
             return None
 
-    def parse_13f_file(self, file_path: Path) -> List[Dict]:
+    @traced("edgar.parse_13f", source="edgar")
+    def parse_13f_file(self, file_path: Union[str, Path]) -> List[Dict]:
         """
         Parse the 13F INFORMATION TABLE from downloaded .txt/.xml file.
         Returns a list of holdings dictionaries.
         """
         holdings = []
-        text = file_path.read_text(encoding="utf-8")
+        text = Path(file_path).read_text(encoding="utf-8")
 
         # Extract the <informationTable> ... </informationTable> block
         start_idx = text.find("<informationTable")
@@ -151,4 +178,79 @@ class EdgarTool:
         except ET.ParseError:
             return holdings  # Return empty if XML parsing fails
 
-        return holdings
\ No newline at end of file
+        return holdings
+
+    # --- Holdings cache ---
+    def _holdings_path(self, ticker: str) -> str:
+        return os.path.join(self.holdings_dir, f"{ticker.upper()}.json")
+
+    def cached_holdings(self, ticker: str, max_age: Optional[float] = None) -> Optional[Dict]:
+        """The cached {"checked", "filing", "holdings"} entry for ticker, or None if missing/older than max_age."""
+        try:
+            with open(self._holdings_path(ticker)) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if max_age is not None and time.time() - entry.get("checked", 0) > max_age:
+            return None
+        return entry
+
+    def _store_holdings(self, ticker: str, filing: Optional[Dict], holdings: List[Dict],
+                        checked: Optional[float] = None):
+        path = self._holdings_path(ticker)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"checked": checked or time.time(), "filing": filing, "holdings": holdings}, f)
+        os.replace(tmp, path)
+
+    def _touch_holdings(self, ticker: str, entry: Dict):
+        """Mark a cached entry as re-checked without changing its filing or holdings."""
+        self._store_holdings(ticker, entry.get("filing"), entry["holdings"])
+
+    @traced("edgar.holdings", source="edgar")
+    def get_holdings(self, ticker: str, max_age: float = 86400) -> List[Dict]:
+        """
+        Parsed holdings of ticker's latest 13F-HR, straight from the holdings
+        cache when it was checked within max_age seconds. Otherwise looks up
+        the latest filing and only downloads and parses it if its accession
+        number differs from the cached one (13Fs change quarterly).
+        Only a successful download + parse is cached; when the lookup or the
+        download fails, the previous entry (if any) keeps being served.
+        """
+        cached = self.cached_holdings(ticker)
+        if cached is not None and time.time() - cached.get("checked", 0) <= max_age:
+            return cached["holdings"]
+
+        latest_13f = self.get_latest_13f(ticker)
+        if latest_13f is None:
+            if cached is not None:
+                self._touch_holdings(ticker, cached)
+                return cached["holdings"]
+            return []
+
+        if cached is not None and (cached.get("filing") or {}).get("accession_number") \
+                == latest_13f.get("accession_number"):
+            self._touch_holdings(ticker, cached)
+            return cached["holdings"]
+
+        txt_path = self.download_filing(latest_13f)
+        holdings = self.parse_13f_file(txt_path) if txt_path else []
+        if not holdings:
+            print(f"[EDGAR] No holdings parsed from {ticker}'s latest 13F; not caching.")
+            return cached["holdings"] if cached is not None else []
+
+        self._store_holdings(ticker, latest_13f, holdings)
+        return holdings
+
+    # --- Async variants: requests blocks, so each call runs in the default executor ---
+    async def aget_cik(self, ticker: str) -> Optional[str]:
+        return await asyncio.to_thread(self.get_cik, ticker)
+
+    async def aget_latest_13f(self, ticker: str) -> Optional[Dict]:
+        return await asyncio.to_thread(self.get_latest_13f, ticker)
+
+    async def adownload_filing(self, latest_13f: Dict) -> Optional[str]:
+        return await asyncio.to_thread(self.download_filing, latest_13f)
+
+    async def aget_holdings(self, ticker: str, max_age: float = 86400) -> List[Dict]:
+        return await asyncio.to_thread(self.get_holdings, ticker, max_age)
@@ -1,10 +1,12 @@
 # tools/finnhub_tool.py
+import asyncio
 import os
 from dotenv import load_dotenv
 import finnhub
 import pandas as pd
 from datetime import datetime, timedelta
 from typing import Optional, Dict
+from tools.tracing import traced
 
 class FinnhubTool:
     """
@@ -20,24 +22,28 @@ class FinnhubTool:
             raise ValueError("Missing FINNHUB_API_KEY. Please set it in your .env file.")
         self.client = finnhub.Client(api_key=self.api_key)
 
+    @traced("finnhub.quote", source="finnhub")
     def get_quote(self, symbol: str) -> Dict:
         """
         Get real-time quote for a stock.
         """
         return self.client.quote(symbol)
 
+    @traced("finnhub.profile", source="finnhub")
     def get_company_profile(self, symbol: str) -> Optional[Dict]:
         """
         Get basic company profile (name, industry, market cap).
         """
         return self.client.company_profile2(symbol=symbol)
 
+    @traced("finnhub.financials", source="finnhub")
     def get_financials(self, symbol: str) -> Optional[Dict]:
         """
         Get latest financials.
         """
         return self.client.financials_reported(symbol=symbol, freq="annual")
 
+    @traced("finnhub.news", source="finnhub")
     def get_news(self, symbol: str, num_articles: int = 5) -> pd.DataFrame:
         """
         Get latest company news (free plan: last 30 days only).
@@ -58,8 +64,22 @@ class FinnhubTool:
             df["datetime"] = pd.to_datetime(df["datetime"], unit="s")
         return df[["datetime", "headline", "source", "url"]].head(num_articles)
 
+    @traced("finnhub.sentiment", source="finnhub")
     def get_sentiment(self, symbol: str) -> Dict:
         """
         Placeholder for sentiment (premium only).
         """
         return {"error": "News sentiment API is not available on free plan"}
+
+    # --- Async variants: the finnhub client blocks, so each call runs in the default executor ---
+    async def aget_quote(self, symbol: str) -> Dict:
+        return await asyncio.to_thread(self.get_quote, symbol)
+
+    async def aget_company_profile(self, symbol: str) -> Optional[Dict]:
+        return await asyncio.to_thread(self.get_company_profile, symbol)
+
+    async def aget_financials(self, symbol: str) -> Optional[Dict]:
+        return await asyncio.to_thread(self.get_financials, symbol)
+
+    async def aget_news(self, symbol: str, num_articles: int = 5) -> pd.DataFrame:
+        return await asyncio.to_thread(self.get_news, symbol, num_articles)
@@ -0,0 +1,107 @@
+# tools/indicator_cache.py
+import hashlib
+import os
+import pickle
+import struct
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+
+def last_bar_timestamp(price_history: list) -> Optional[str]:
+    """Timestamp of the latest bar in a DataAgent price history (None if unknown)."""
+    if not price_history:
+        return None
+    last = price_history[-1]
+    for key in ("Date", "Datetime", "date", "datetime"):
+        if last.get(key) is not None:
+            return str(last[key])
+    return None
+
+
+def series_digest(values: list) -> str:
+    """Short hash of a numeric series; changes with its length, start or any value (e.g. a partial bar)."""
+    return hashlib.sha1(struct.pack(f"<{len(values)}d", *values)).hexdigest()[:16]
+
+
+class IndicatorCache:
+    """
+    LRU memo for computed indicators/signals keyed by
+    (ticker, interval, last bar timestamp, params), so results are only
+    recomputed when a new bar arrives. Optionally backed by pickle files on disk.
+    """
+
+    def __init__(self, max_entries: int = 2048, cache_dir: Optional[str] = None):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(ticker: str, interval: str, last_bar: Optional[str], params=()) -> Optional[tuple]:
+        """Cache key, or None when the last bar is unknown (result can't be cached safely)."""
+        if last_bar is None:
+            return None
+        return (ticker, interval, last_bar, tuple(params))
+
+    def _path(self, key: tuple) -> str:
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.pkl")
+
+    def get(self, key: tuple, default=None):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+        if self.cache_dir and os.path.exists(self._path(key)):
+            try:
+                with open(self._path(key), "rb") as f:
+                    value = pickle.load(f)
+                self.put(key, value, persist=False)
+                with self._lock:
+                    self.hits += 1
+                return value
+            except Exception as e:
+                print(f"[IndicatorCache] Failed to read cache entry: {e}")
+        with self._lock:
+            self.misses += 1
+        return default
+
+    def put(self, key: tuple, value: Any, persist: bool = True):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        if persist and self.cache_dir:
+            try:
+                tmp_path = self._path(key) + ".tmp"
+                with open(tmp_path, "wb") as f:
+                    pickle.dump(value, f)
+                os.replace(tmp_path, self._path(key))
+            except Exception as e:
+                print(f"[IndicatorCache] Failed to write cache entry: {e}")
+
+    def get_or_compute(self, key: Optional[tuple], compute: Callable[[], Any]):
+        """Return the cached value for key, computing and storing it on a miss."""
+        if key is None:
+            return compute()
+        _missing = object()
+        value = self.get(key, _missing)
+        if value is _missing:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Process-wide cache shared by agents (and across Streamlit reruns)
+default_indicator_cache = IndicatorCache()
@@ -0,0 +1,212 @@
+# tools/indicators.py
+"""
+Vectorized technical indicators over (tickers x bars) NumPy matrices.
+
+Rows are tickers, columns are bars (oldest first). Missing bars are NaN;
+series are usually right-aligned (NaN-padded on the left) so the latest
+bar of every ticker is the last column.
+"""
+import numpy as np
+
+
+def right_align(series_list) -> np.ndarray:
+    """Stack variable-length series into a (tickers x bars) matrix, right-aligned, NaN-padded."""
+    width = max((len(s) for s in series_list), default=0)
+    matrix = np.full((len(series_list), width), np.nan)
+    for i, series in enumerate(series_list):
+        if len(series):
+            matrix[i, width - len(series):] = series
+    return matrix
+
+
+def tail_mean(matrix: np.ndarray, window: int):
+    """Mean and count of the valid values in the last `window` bars of each row."""
+    tail = matrix[:, -window:]
+    count = np.sum(~np.isnan(tail), axis=1)
+    total = np.nansum(tail, axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return total / count, count
+
+
+def last_valid(matrix: np.ndarray) -> np.ndarray:
+    """Latest non-NaN value of each row (NaN if the row is empty)."""
+    if matrix.shape[1] == 0:
+        return np.full(matrix.shape[0], np.nan)
+    valid = ~np.isnan(matrix)
+    idx = matrix.shape[1] - 1 - np.argmax(valid[:, ::-1], axis=1)
+    return np.where(valid.any(axis=1), matrix[np.arange(matrix.shape[0]), idx], np.nan)
+
+
+def rolling_mean(x: np.ndarray, window: int, min_periods: int = 1) -> np.ndarray:
+    """Trailing mean of the valid values in each window (cumsum-based, O(bars))."""
+    valid = ~np.isnan(x)
+    csum = np.cumsum(np.where(valid, x, 0.0), axis=-1)
+    ccount = np.cumsum(valid, axis=-1)
+    total = csum.copy()
+    count = ccount.copy()
+    total[..., window:] -= csum[..., :-window]
+    count[..., window:] -= ccount[..., :-window]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(count >= max(min_periods, 1), total / count, np.nan)
+
+
+def rolling_std(x: np.ndarray, window: int, min_periods: int = 2) -> np.ndarray:
+    """Trailing sample standard deviation of each window."""
+    mean = rolling_mean(x, window, min_periods)
+    mean_sq = rolling_mean(x * x, window, min_periods)
+    valid = ~np.isnan(x)
+    ccount = np.cumsum(valid, axis=-1)
+    count = ccount.copy()
+    count[..., window:] -= ccount[..., :-window]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        var = (mean_sq - mean * mean) * count / (count - 1)
+    return np.sqrt(np.clip(var, 0.0, None))
+
+
+def ewm(x: np.ndarray, alpha: float) -> np.ndarray:
+    """
+    Exponentially weighted mean along the bar axis, seeded with each row's
+    first valid value. Loops over bars only; every step is vectorized over tickers.
+
+    The loop is deliberate: the recurrence is sequential, and its closed
+    form (a cumsum of x * (1 - alpha) ** -t) overflows float64 on long
+    histories (past ~3200 bars for a 9-bar EMA) and loses precision well
+    before that. Without a compiled linear filter (scipy isn't a dependency),
+    one vectorized step per bar keeps the cost at O(bars) Python steps
+    however many tickers the matrix holds.
+    """
+    out = np.full(x.shape, np.nan)
+    prev = np.full(x.shape[:-1], np.nan)
+    for t in range(x.shape[-1]):
+        xt = x[..., t]
+        step = np.where(np.isnan(prev), xt, alpha * xt + (1 - alpha) * prev)
+        prev = np.where(np.isnan(xt), prev, step)
+        out[..., t] = prev
+    return out
+
+
+def ema(x: np.ndarray, span: int) -> np.ndarray:
+    return ewm(x, 2.0 / (span + 1))
+
+
+class IndicatorSet:
+    """
+    Computes indicators for many tickers at once and memoizes intermediates
+    (price deltas, EMAs, true range, rolling stats), so indicators that share
+    inputs only pay for them once.
+    """
+
+    def __init__(self, closes, highs=None, lows=None, volumes=None):
+        self.closes = np.atleast_2d(np.asarray(closes, dtype=float))
+        self.highs = None if highs is None else np.atleast_2d(np.asarray(highs, dtype=float))
+        self.lows = None if lows is None else np.atleast_2d(np.asarray(lows, dtype=float))
+        self.volumes = None if volumes is None else np.atleast_2d(np.asarray(volumes, dtype=float))
+        self._cache = {}
+
+    def _memo(self, key, fn):
+        if key not in self._cache:
+            self._cache[key] = fn()
+        return self._cache[key]
+
+    # --- Shared intermediates ---
+    def delta(self) -> np.ndarray:
+        """Close-to-close change (first bar NaN)."""
+        def compute():
+            d = np.full(self.closes.shape, np.nan)
+            d[:, 1:] = np.diff(self.closes, axis=1)
+            return d
+        return self._memo(("delta",), compute)
+
+    def ema(self, span: int) -> np.ndarray:
+        return self._memo(("ema", span), lambda: ema(self.closes, span))
+
+    def sma(self, window: int) -> np.ndarray:
+        return self._memo(("sma", window), lambda: rolling_mean(self.closes, window))
+
+    def std(self, window: int) -> np.ndarray:
+        return self._memo(("std", window), lambda: rolling_std(self.closes, window))
+
+    def true_range(self) -> np.ndarray:
+        def compute():
+            if self.highs is None or self.lows is None:
+                raise ValueError("True range requires highs and lows.")
+            prev_close = np.full(self.closes.shape, np.nan)
+            prev_close[:, 1:] = self.closes[:, :-1]
+            # fmax ignores NaN, so the first bar falls back to high - low
+            return np.fmax(self.highs - self.lows,
+                           np.fmax(np.abs(self.highs - prev_close), np.abs(self.lows - prev_close)))
+        return self._memo(("true_range",), compute)
+
+    # --- Indicators ---
+    def rsi(self, period: int = 14) -> np.ndarray:
+        """Wilder RSI (0-100)."""
+        def compute():
+            d = self.delta()
+            gain = ewm(np.where(np.isnan(d), np.nan, np.clip(d, 0, None)), 1.0 / period)
+            loss = ewm(np.where(np.isnan(d), np.nan, np.clip(-d, 0, None)), 1.0 / period)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                rs = gain / loss
+                return np.where(loss == 0, np.where(gain > 0, 100.0, 50.0), 100 - 100 / (1 + rs))
+        return self._memo(("rsi", period), compute)
+
+    def macd(self, fast: int = 12, slow: int = 26, signal: int = 9) -> dict:
+        def compute():
+            line = self.ema(fast) - self.ema(slow)
+            signal_line = ema(line, signal)
+            return {"macd": line, "signal": signal_line, "hist": line - signal_line}
+        return self._memo(("macd", fast, slow, signal), compute)
+
+    def bollinger(self, window: int = 20, k: float = 2.0) -> dict:
+        def compute():
+            mid, sd = self.sma(window), self.std(window)
+            return {"middle": mid, "upper": mid + k * sd, "lower": mid - k * sd}
+        return self._memo(("bollinger", window, k), compute)
+
+    def atr(self, period: int = 14) -> np.ndarray:
+        """Wilder average true range."""
+        return self._memo(("atr", period), lambda: ewm(self.true_range(), 1.0 / period))
+
+    def obv(self) -> np.ndarray:
+        """On-balance volume."""
+        def compute():
+            if self.volumes is None:
+                raise ValueError("OBV requires volumes.")
+            flow = np.nan_to_num(np.sign(self.delta()) * self.volumes)
+            return np.where(np.isnan(self.closes), np.nan, np.cumsum(flow, axis=1))
+        return self._memo(("obv",), compute)
+
+    def drawdown(self, window: int = None) -> np.ndarray:
+        """Drawdown from the running peak (or the peak of the last `window` bars), <= 0."""
+        def compute():
+            filled = np.where(np.isnan(self.closes), -np.inf, self.closes)
+            if window is None:
+                peak = np.maximum.accumulate(filled, axis=1)
+            else:
+                padded = np.concatenate(
+                    [np.full((filled.shape[0], window - 1), -np.inf), filled], axis=1)
+                peak = np.lib.stride_tricks.sliding_window_view(padded, window, axis=1).max(axis=-1)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                return np.where(np.isfinite(peak), self.closes / peak - 1, np.nan)
+        return self._memo(("drawdown", window), compute)
+
+    def compute(self, names=("rsi", "macd", "bollinger", "atr", "obv", "drawdown")) -> dict:
+        """Compute several indicators in one pass, sharing intermediates."""
+        out = {}
+        for name in names:
+            if name == "atr" and (self.highs is None or self.lows is None):
+                continue
+            if name == "obv" and self.volumes is None:
+                continue
+            out[name] = getattr(self, name)()
+        return out
+
+    def latest(self, names=("rsi", "macd", "bollinger", "atr", "obv", "drawdown")) -> dict:
+        """Last-bar value of each indicator, per ticker (arrays of length N)."""
+        out = {}
+        for name, value in self.compute(names).items():
+            if isinstance(value, dict):
+                for part, arr in value.items():
+                    out[f"{name}_{part}"] = arr[:, -1] if arr.shape[1] else np.full(arr.shape[0], np.nan)
+            else:
+                out[name] = value[:, -1] if value.shape[1] else np.full(value.shape[0], np.nan)
+        return out
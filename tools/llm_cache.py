@@ -0,0 +1,91 @@
+# tools/llm_cache.py
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Optional, List, Dict
+from tools.tracing import traced
+
+
+def normalize_prompt(text: str) -> str:
+    """Collapse whitespace so indentation/line-wrapping changes don't miss the cache."""
+    return re.sub(r"\s+", " ", text or "").strip()
+
+
+def make_cache_key(model: str, messages: List[Dict], params: Optional[Dict] = None) -> str:
+    payload = {
+        "model": model,
+        "messages": [{"role": m.get("role"), "content": normalize_prompt(m.get("content"))} for m in messages],
+        "params": params or {},
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class LLMCache:
+    """
+    SQLite-backed cache of chat-completion outputs keyed by
+    (model, normalized prompt, parameters), with TTL and size-based eviction.
+    """
+
+    def __init__(self, path: str = "downloads/llm_cache.sqlite", ttl_seconds: float = 12 * 3600,
+                 max_entries: int = 5000):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS completions ("
+            " key TEXT PRIMARY KEY, model TEXT, content TEXT,"
+            " created REAL, last_access REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_completions_access ON completions(last_access)")
+        self._conn.commit()
+
+    @traced("llm_cache.get", source="llm_cache", ticker_arg=None)
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT content, created FROM completions WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            content, created = row
+            if now - created > self.ttl_seconds:
+                self._conn.execute("DELETE FROM completions WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE completions SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return content
+
+    @traced("llm_cache.put", source="llm_cache", ticker_arg=None)
+    def put(self, key: str, model: str, content: str):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO completions (key, model, content, created, last_access)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, model, content, now, now),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float):
+        self._conn.execute("DELETE FROM completions WHERE created < ?", (now - self.ttl_seconds,))
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM completions").fetchone()
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM completions WHERE key IN"
+                " (SELECT key FROM completions ORDER BY last_access ASC LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM completions")
+            self._conn.commit()
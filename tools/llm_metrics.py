@@ -0,0 +1,144 @@
+# tools/llm_metrics.py
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+# USD per 1M tokens (prompt, completion); unknown models are counted as 0
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4": (30.00, 60.00),
+    "gpt-4-turbo": (10.00, 30.00),
+    "gpt-3.5-turbo": (0.50, 1.50),
+}
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    prompt_price, completion_price = MODEL_PRICES.get(model, (0.0, 0.0))
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+class LLMMetrics:
+    """
+    Per-call LLM instrumentation: wall time, time to first token, token usage,
+    estimated cost, cache hits, failures and JSON parse fallbacks.
+    Each record is appended to a JSONL log (if log_path is set) and kept in
+    memory for the per-run summary().
+    """
+
+    def __init__(self, log_path: Optional[str] = "downloads/llm_metrics.jsonl"):
+        self.log_path = log_path
+        self._lock = threading.Lock()
+        self.run_id = None
+        self.records: List[Dict] = []
+        self.events: Dict[str, int] = {}
+        if log_path and os.path.dirname(log_path):
+            os.makedirs(os.path.dirname(log_path), exist_ok=True)
+
+    def start_run(self, run_id: Optional[str] = None):
+        """Reset the in-memory aggregates; records are tagged with run_id."""
+        with self._lock:
+            self.run_id = run_id or time.strftime("%Y%m%dT%H%M%S")
+            self.records = []
+            self.events = {}
+
+    def _write(self, record: Dict):
+        if not self.log_path:
+            return
+        try:
+            with open(self.log_path, "a") as f:
+                f.write(json.dumps(record, default=str) + "\n")
+        except OSError as e:
+            print(f"[LLMMetrics] Could not write metrics log: {e}")
+
+    def record(self, **fields) -> Dict:
+        record = {"ts": time.time(), "run_id": self.run_id, **fields}
+        with self._lock:
+            self.records.append(record)
+            self._write(record)
+        return record
+
+    def event(self, name: str, **fields):
+        """Count a non-call event (e.g. "parse_fallback") and log it."""
+        with self._lock:
+            self.events[name] = self.events.get(name, 0) + 1
+        self._write({"ts": time.time(), "run_id": self.run_id, "event": name, **fields})
+
+    @contextmanager
+    def track(self, model: str, kind: str = "chat"):
+        """
+        Time one chat-completion call. The caller fills in the yielded dict
+        (cached, attempts, usage, first_token_at); status/error are set on exit.
+        """
+        start = time.perf_counter()
+        call = {"model": model, "kind": kind, "cached": False, "attempts": 0,
+                "prompt_tokens": 0, "completion_tokens": 0, "first_token_at": None}
+        try:
+            yield call
+            call["status"] = "ok"
+        except BaseException as e:
+            call["status"] = "error"
+            call["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            wall = time.perf_counter() - start
+            first = call.pop("first_token_at")
+            # Non-streamed calls get everything at once, so the first token arrives at the end
+            call["ttft_s"] = round((first - start) if first is not None else wall, 4)
+            call["wall_s"] = round(wall, 4)
+            call["cost_usd"] = round(estimate_cost(model, call["prompt_tokens"], call["completion_tokens"]), 8)
+            self.record(**call)
+
+    @staticmethod
+    def usage_from(response, call: Dict):
+        """Copy token counts from an OpenAI response.usage onto a tracked call."""
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            call["prompt_tokens"] = getattr(usage, "prompt_tokens", 0) or 0
+            call["completion_tokens"] = getattr(usage, "completion_tokens", 0) or 0
+
+    def summary(self) -> Dict:
+        """Aggregates over the calls recorded since start_run()."""
+        with self._lock:
+            records = list(self.records)
+            events = dict(self.events)
+        live = [r for r in records if not r["cached"]]
+        walls = [r["wall_s"] for r in live if r["status"] == "ok"]
+        ttfts = [r["ttft_s"] for r in live if r["status"] == "ok"]
+        by_model = {}
+        for r in records:
+            m = by_model.setdefault(r["model"], {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0,
+                                                 "cost_usd": 0.0})
+            m["calls"] += 1
+            m["prompt_tokens"] += r["prompt_tokens"]
+            m["completion_tokens"] += r["completion_tokens"]
+            m["cost_usd"] += r["cost_usd"]
+        for m in by_model.values():
+            m["cost_usd"] = round(m["cost_usd"], 6)
+
+        return {
+            "run_id": self.run_id,
+            "calls": len(records),
+            "cache_hits": sum(r["cached"] for r in records),
+            "failures": sum(r["status"] == "error" for r in records),
+            "retries": sum(max(r["attempts"] - 1, 0) for r in live),
+            "prompt_tokens": sum(r["prompt_tokens"] for r in records),
+            "completion_tokens": sum(r["completion_tokens"] for r in records),
+            "cost_usd": round(sum(r["cost_usd"] for r in records), 6),
+            "wall_s_total": round(sum(walls), 3),
+            "wall_s_p50": _percentile(walls, 0.5),
+            "wall_s_p95": _percentile(walls, 0.95),
+            "ttft_s_p50": _percentile(ttfts, 0.5),
+            "events": events,
+            "by_model": by_model,
+        }
@@ -0,0 +1,152 @@
+# tools/openai_stub_server.py
+"""
+Minimal OpenAI-compatible chat-completions server for offline testing.
+
+    python -m tools.openai_stub_server --port 8001 --latency 0.5 --rate-limit 0.1
+
+Then set OPENAI_BASE_URL=http://localhost:8001/v1 (or pass base_url= to
+RecommendationAgent). Replies are canned JSON recommendations or summary text,
+as a single response or streamed as server-sent events when "stream" is set.
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _canned_content(prompt: str) -> str:
+    """Pick a reply shape that matches what the prompt asks for."""
+    if "JSON array" in prompt:
+        tickers = re.findall(r'"ticker": "([A-Z0-9.\-]+)"', prompt)
+        return json.dumps([
+            {
+                "ticker": t,
+                "buy_recommendation": True,
+                "suggested_amount": 10,
+                "rationale": "Stub rationale: solid fundamentals and an upward trend.",
+                "optimal_timing": "Buy now",
+            }
+            for t in tickers
+        ])
+    if "summary text only" in prompt:
+        return "Stub summary: diversified across the selected stocks within the sector caps."
+    if "allocations" in prompt:
+        tickers = sorted(set(re.findall(r"'ticker': '([A-Z.\-]+)'", prompt))) or ["AAPL"]
+        weight = round(100 / len(tickers), 2)
+        return json.dumps({
+            "summary": "Stub summary: diversified across the selected stocks.",
+            "allocations": [{"ticker": t, "weight_percent": weight} for t in tickers],
+        })
+    return json.dumps({
+        "buy_recommendation": True,
+        "suggested_amount": 10,
+        "rationale": "Stub rationale: solid fundamentals and an upward trend.",
+        "optimal_timing": "Buy now",
+    })
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    rate_limit = 0.0
+
+    def log_message(self, format, *args):
+        pass  # keep test output quiet
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if not self.path.endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+
+        if random.random() < self.rate_limit:
+            self._send_json(429, {"error": {"message": "Rate limit reached (stub)", "type": "rate_limit_error"}})
+            return
+
+        prompt = " ".join(str(m.get("content", "")) for m in request.get("messages", []))
+        content = _canned_content(prompt)
+        usage = {
+            "prompt_tokens": len(prompt) // 4,
+            "completion_tokens": len(content) // 4,
+            "total_tokens": (len(prompt) + len(content)) // 4,
+        }
+        if request.get("stream"):
+            self._stream(request, content, usage)
+            return
+
+        time.sleep(self.latency)
+        self._send_json(200, {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": usage,
+        })
+
+    def _stream(self, request: dict, content: str, usage: dict, chunk_chars: int = 12):
+        """Server-sent events in the chat.completion.chunk format, spread over the configured latency."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        base = {"id": f"chatcmpl-{uuid.uuid4().hex[:12]}", "object": "chat.completion.chunk",
+                "created": int(time.time()), "model": request.get("model", "stub")}
+
+        def send(payload):
+            self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode())
+            self.wfile.flush()
+
+        pieces = [content[i:i + chunk_chars] for i in range(0, len(content), chunk_chars)]
+        # First token after a fifth of the latency, the rest spread evenly
+        time.sleep(self.latency * 0.2)
+        for i, piece in enumerate(pieces):
+            if i:
+                time.sleep(self.latency * 0.8 / max(len(pieces) - 1, 1))
+            delta = {"role": "assistant", "content": piece} if i == 0 else {"content": piece}
+            send({**base, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]})
+        send({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        if (request.get("stream_options") or {}).get("include_usage"):
+            send({**base, "choices": [], "usage": usage})
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+def start_stub_server(port: int = 8001, latency: float = 0.0, rate_limit: float = 0.0,
+                      host: str = "localhost") -> ThreadingHTTPServer:
+    """Start the stub in a background thread; call .shutdown() on the result to stop it."""
+    handler = type("ConfiguredStubHandler", (StubHandler,), {"latency": latency, "rate_limit": rate_limit})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stub server")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per completion")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="fraction of requests answered with 429")
+    args = parser.parse_args()
+
+    server = start_stub_server(args.port, args.latency, args.rate_limit)
+    print(f"[StubServer] Listening on http://localhost:{args.port}/v1")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,65 @@
+# tools/partial_json.py
+import json
+
+
+def _scan(text: str):
+    """
+    (closers needed, string state, index where the top-level value ends or None).
+    String state is "" outside a string, '"' inside one, or "\\" right after an escape backslash.
+    """
+    stack, in_string, escaped = [], False, False
+    for i, ch in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        elif ch in "}]" and stack:
+            stack.pop()
+            if not stack:
+                return "", "", i + 1
+    state = ("\\" if escaped else '"') if in_string else ""
+    return "".join(reversed(stack)), state, None
+
+
+def parse_partial_json(text: str, max_trim: int = 64):
+    """
+    Best-effort parse of a JSON object/array that is still being streamed:
+    open strings and containers are closed, and a dangling key, comma or
+    partial literal is trimmed off the end. Returns None if nothing parses yet.
+
+        parse_partial_json('{"buy_recommendation": true, "rationale": "Strong marg')
+        -> {"buy_recommendation": True, "rationale": "Strong marg"}
+    """
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    if not starts:
+        return None
+    buffer = text[min(starts):]
+
+    closers, string_state, end = _scan(buffer)
+    if end is not None:
+        try:
+            return json.loads(buffer[:end])
+        except json.JSONDecodeError:
+            return None
+
+    for _ in range(max_trim):
+        if not buffer:
+            return None
+        # Close an open string (dropping a dangling escape backslash first)
+        candidate = buffer[:-1] if string_state == "\\" else buffer
+        if string_state:
+            candidate += '"'
+        try:
+            return json.loads(candidate + closers)
+        except json.JSONDecodeError:
+            buffer = buffer[:-1].rstrip()
+            closers, string_state, _ = _scan(buffer)
+    return None
+
@@ -0,0 +1,137 @@
+# tools/portfolio_optimizer.py
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from tools.indicators import right_align
+
+TRADING_DAYS = 252
+
+
+def water_fill(weights: np.ndarray, sector_ids: Optional[np.ndarray] = None,
+               max_sector: Optional[float] = None, max_position: Optional[float] = None,
+               total: float = 1.0, max_iter: int = 100) -> np.ndarray:
+    """
+    Cap each position at max_position * total and each sector at
+    max_sector * total, handing the excess to positions in uncapped sectors
+    in proportion to their current weights, until nothing is over its cap.
+    If the caps make the total unreachable, the remainder is left unallocated.
+    """
+    w = np.clip(np.asarray(weights, dtype=float), 0.0, None)
+    if w.sum() <= 0:
+        return w
+    w = w * total / w.sum()
+    n = len(w)
+    sector_ids = np.zeros(n, dtype=int) if sector_ids is None else np.asarray(sector_ids)
+    n_sectors = int(sector_ids.max()) + 1 if n else 0
+    pos_cap = np.inf if max_position is None else max_position * total
+    sec_cap = np.inf if max_sector is None else max_sector * total
+    tol = 1e-12 * max(total, 1.0)
+
+    for _ in range(max_iter):
+        # Position caps, then scale any over-cap sector down to its cap
+        w = np.minimum(w, pos_cap)
+        sector_totals = np.bincount(sector_ids, weights=w, minlength=n_sectors)
+        scale = np.where(sector_totals > sec_cap, sec_cap / np.where(sector_totals > 0, sector_totals, 1.0), 1.0)
+        w = w * scale[sector_ids]
+
+        # Hand the freed budget to positions below both caps, pro rata
+        # (split equally if the only room left is in zero-weight positions)
+        missing = total - w.sum()
+        if missing <= tol:
+            break
+        sector_full = (sector_totals * scale >= sec_cap - tol)[sector_ids]
+        free = (w < pos_cap - tol) & ~sector_full
+        if not free.any():
+            break
+        share = np.where(free, w, 0.0)
+        if share.sum() <= 0:
+            share = free.astype(float)
+        w = w + missing * share / share.sum()
+    return w
+
+
+class PortfolioOptimizer:
+    """
+    Deterministic local allocation from historical returns:
+    risk parity (equal risk contribution) or long-only mean-variance,
+    followed by per-position and per-sector caps (water-filling).
+    """
+
+    def __init__(self, method: str = "risk_parity", max_position: float = 0.25, max_sector: float = 0.40,
+                 risk_aversion: float = 3.0, shrinkage: float = 0.1, min_observations: int = 20):
+        self.method = method
+        self.max_position = max_position
+        self.max_sector = max_sector
+        self.risk_aversion = risk_aversion
+        self.shrinkage = shrinkage
+        self.min_observations = min_observations
+
+    @staticmethod
+    def returns_matrix(tickers: Sequence[str], price_histories: Sequence[Optional[List[Dict]]]) -> np.ndarray:
+        """(tickers x days) daily returns over the common trailing window of the given histories."""
+        closes = right_align([
+            [float(p[f"Close_{t}"]) for p in history or [] if p.get(f"Close_{t}") is not None]
+            for t, history in zip(tickers, price_histories)
+        ])
+        if closes.shape[1] < 2:
+            return np.empty((len(tickers), 0))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            returns = closes[:, 1:] / closes[:, :-1] - 1
+        return returns
+
+    def covariance(self, returns: np.ndarray) -> np.ndarray:
+        """Annualized covariance, shrunk towards its diagonal; tickers without history get the median variance."""
+        n = returns.shape[0]
+        has_data = np.sum(~np.isnan(returns), axis=1) >= self.min_observations
+        if has_data.sum() < 1:
+            return np.eye(n) * 0.04
+        r = returns[has_data]
+        complete = ~np.isnan(r).any(axis=0)
+        r = r[:, complete] if complete.sum() >= self.min_observations else np.nan_to_num(r)
+        sub = np.atleast_2d(np.cov(r)) * TRADING_DAYS
+        sub = (1 - self.shrinkage) * sub + self.shrinkage * np.diag(np.diag(sub))
+
+        cov = np.eye(n) * np.median(np.diag(sub))
+        idx = np.flatnonzero(has_data)
+        cov[np.ix_(idx, idx)] = sub
+        return cov
+
+    @staticmethod
+    def risk_parity_weights(cov: np.ndarray, max_iter: int = 500, tol: float = 1e-10) -> np.ndarray:
+        """Equal-risk-contribution weights by multiplicative fixed-point updates."""
+        w = 1 / np.sqrt(np.diag(cov))
+        w /= w.sum()
+        for _ in range(max_iter):
+            rc = w * (cov @ w)
+            new_w = w * np.sqrt(rc.mean() / rc)
+            new_w /= new_w.sum()
+            if np.abs(new_w - w).max() < tol:
+                return new_w
+            w = new_w
+        return w
+
+    def mean_variance_weights(self, returns: np.ndarray, cov: np.ndarray) -> np.ndarray:
+        """Long-only mean-variance: Σ⁻¹μ / risk_aversion with negatives clipped, fully invested."""
+        mu = np.nan_to_num(np.nanmean(returns, axis=1)) * TRADING_DAYS if returns.shape[1] else \
+            np.zeros(cov.shape[0])
+        w = np.clip(np.linalg.solve(cov, mu) / self.risk_aversion, 0.0, None)
+        if w.sum() <= 0:
+            return self.risk_parity_weights(cov)
+        return w / w.sum()
+
+    def optimize(self, tickers: Sequence[str], price_histories: Sequence[Optional[List[Dict]]],
+                 sectors: Sequence[Optional[str]], method: Optional[str] = None) -> np.ndarray:
+        """Capped portfolio weights (sum <= 1; below 1 only if the caps can't be met)."""
+        if not tickers:
+            return np.zeros(0)
+        returns = self.returns_matrix(tickers, price_histories)
+        cov = self.covariance(returns)
+        if (method or self.method) == "mean_variance":
+            w = self.mean_variance_weights(returns, cov)
+        else:
+            w = self.risk_parity_weights(cov)
+
+        _, sector_ids = np.unique([s or "Unknown" for s in sectors], return_inverse=True)
+        # With too few positions/sectors the caps can't sum to 100%; relax rather than hold cash
+        max_position = max(self.max_position, 1.0 / len(tickers))
+        max_sector = max(self.max_sector, 1.0 / (sector_ids.max() + 1))
+        return water_fill(w, sector_ids, max_sector=max_sector, max_position=max_position)
@@ -0,0 +1,182 @@
+# tools/prompt_builder.py
+import json
+import math
+from typing import Optional, Dict, List
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except Exception:  # tiktoken is optional; fall back to a character heuristic
+    _ENCODING = None
+
+# yfinance info keys worth sending to the LLM (the full dict has ~150 keys)
+FUNDAMENTAL_KEYS = [
+    "shortName", "sector", "industry", "country", "marketCap", "currentPrice",
+    "trailingPE", "forwardPE", "trailingEps", "pegRatio", "priceToBook",
+    "dividendYield", "payoutRatio", "beta", "profitMargins", "operatingMargins",
+    "revenueGrowth", "earningsGrowth", "returnOnEquity", "debtToEquity", "freeCashflow",
+    "fiftyTwoWeekHigh", "fiftyTwoWeekLow", "targetMeanPrice", "recommendationKey",
+]
+
+# Sections in priority order; the lowest priority ones are dropped first when over budget
+SECTION_PRIORITY = ["price_summary", "signals", "timing", "fundamentals", "analyst_ratings"]
+
+
+def estimate_tokens(text: str) -> int:
+    """Token count via tiktoken when installed, else ~4 characters per token."""
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text))
+    return math.ceil(len(text) / 4)
+
+
+def _round(value, digits=4):
+    return round(value, digits) if isinstance(value, float) else value
+
+
+def summarize_price_history(ticker: str, price_history: Optional[List[Dict]]) -> Dict:
+    """A handful of stats in place of every price-history record."""
+    close_key, volume_key = f"Close_{ticker}", f"Volume_{ticker}"
+    closes = [float(p[close_key]) for p in price_history or [] if p.get(close_key) is not None]
+    volumes = [float(p[volume_key]) for p in price_history or [] if p.get(volume_key) is not None]
+    if not closes:
+        return {}
+
+    def ret(bars):
+        return _round(closes[-1] / closes[-bars - 1] - 1) if len(closes) > bars else None
+
+    daily = [b / a - 1 for a, b in zip(closes[-21:-1], closes[-20:])]
+    vol_20 = (sum((r - sum(daily) / len(daily)) ** 2 for r in daily) / (len(daily) - 1)) ** 0.5 \
+        if len(daily) > 1 else None
+    peak, max_dd = closes[0], 0.0
+    for c in closes:
+        peak = max(peak, c)
+        max_dd = min(max_dd, c / peak - 1)
+
+    return {
+        "bars": len(closes),
+        "last_close": _round(closes[-1], 2),
+        "return_1m": ret(21),
+        "return_3m": ret(63),
+        "return_period": ret(len(closes) - 1) if len(closes) > 1 else None,
+        "ma_50": _round(sum(closes[-50:]) / min(len(closes), 50), 2),
+        "high": _round(max(closes), 2),
+        "low": _round(min(closes), 2),
+        "max_drawdown": _round(max_dd),
+        "volatility_20d_annualized": _round(vol_20 * 252 ** 0.5) if vol_20 is not None else None,
+        "avg_volume_20d": int(sum(volumes[-20:]) / min(len(volumes), 20)) if volumes else None,
+    }
+
+
+def select_fundamentals(data_snapshot: Dict) -> Dict:
+    """Relevant fundamentals from the yfinance summary plus the DataAgent fundamentals dict."""
+    summary = data_snapshot.get("summary") or {}
+    picked = {k: _round(summary[k]) for k in FUNDAMENTAL_KEYS if summary.get(k) is not None}
+    for k, v in (data_snapshot.get("fundamentals") or {}).items():
+        if v is not None:
+            picked.setdefault(k, _round(v))
+    return picked
+
+
+def summarize_analyst_ratings(recommendations) -> Optional[Dict]:
+    """Latest analyst rating counts from the yfinance recommendations DataFrame."""
+    if recommendations is None or not hasattr(recommendations, "to_dict"):
+        return None
+    records = recommendations.to_dict(orient="records")
+    return dict(records[0]) if records else None
+
+
+class PromptBuilder:
+    """
+    Builds compact, token-budgeted LLM prompts from DataAgent snapshots:
+    price history becomes a few stats, only relevant fundamentals are kept,
+    and sections are dropped in SECTION_PRIORITY order until the prompt fits.
+    """
+
+    def __init__(self, token_budget: int = 1200, batch_ticker_budget: int = 350):
+        self.token_budget = token_budget
+        self.batch_ticker_budget = batch_ticker_budget
+
+    def compact_snapshot(self, ticker: str, data_snapshot: Dict,
+                         signals: Optional[dict] = None, timing: Optional[dict] = None) -> Dict:
+        """All sections for one ticker, before budgeting."""
+        signals = signals or {}
+        timing = timing or {}
+        sections = {
+            "price": data_snapshot.get("price"),
+            "price_summary": summarize_price_history(ticker, data_snapshot.get("price_history")),
+            # Accept either SignalAgent output or its bare signals dict
+            "signals": signals.get("signals", signals) if isinstance(signals, dict) else {},
+            "timing": {k: timing.get(k) for k in ("optimal_timing", "confidence", "reasoning")
+                       if timing.get(k) is not None},
+            "fundamentals": select_fundamentals(data_snapshot),
+            "analyst_ratings": summarize_analyst_ratings(data_snapshot.get("recommendations")),
+        }
+        return {k: v for k, v in sections.items() if v not in (None, {}, [])}
+
+    def fit_to_budget(self, compact: Dict, template_tokens: int = 0, token_budget: Optional[int] = None) -> Dict:
+        """Drop / trim sections until the JSON fits in the token budget."""
+        compact = dict(compact)
+        budget = (token_budget or self.token_budget) - template_tokens
+
+        def size():
+            return estimate_tokens(json.dumps(compact, default=str))
+
+        # First trim fundamentals from the end of FUNDAMENTAL_KEYS order, then drop whole sections
+        fundamentals = dict(compact.get("fundamentals") or {})
+        while size() > budget and len(fundamentals) > 5:
+            fundamentals.popitem()
+            compact["fundamentals"] = fundamentals
+        for section in reversed(SECTION_PRIORITY):
+            if size() <= budget:
+                break
+            compact.pop(section, None)
+        return compact
+
+    def build_recommendation_prompt(self, ticker: str, data_snapshot: Dict, budget: float,
+                                    signals: Optional[dict] = None, timing: Optional[dict] = None) -> str:
+        template = """
+        You are a highly analytical stock portfolio assistant.
+        Give **long-term buy recommendations only** for a user
+        who wants to invest up to ${budget} in total.
+
+        Consider this structured data for {ticker}:
+        {data}
+
+        Also consider signals and timing factors if provided.
+        Respond **ONLY in JSON format** with fields:
+        - buy_recommendation: true or false
+        - suggested_amount: numeric allocation
+        - rationale: short paragraph explaining reasoning
+        - optimal_timing: string if relevant, else null
+        """
+        template_tokens = estimate_tokens(template)
+        compact = self.fit_to_budget(self.compact_snapshot(ticker, data_snapshot, signals, timing), template_tokens)
+        return template.format(budget=budget, ticker=ticker, data=json.dumps(compact, default=str))
+
+    def build_batch_recommendation_prompt(self, entries: List[tuple], budget: float) -> str:
+        """
+        One prompt for several tickers. entries are (ticker, data_snapshot, signals, timing);
+        each ticker's snapshot is compacted to batch_ticker_budget tokens.
+        """
+        stocks = []
+        for ticker, data_snapshot, signals, timing in entries:
+            compact = self.fit_to_budget(self.compact_snapshot(ticker, data_snapshot, signals, timing),
+                                         token_budget=self.batch_ticker_budget)
+            stocks.append({"ticker": ticker, **compact})
+
+        return """
+        You are a highly analytical stock portfolio assistant.
+        Give **long-term buy recommendations only** for a user
+        who wants to invest up to ${budget} in total.
+
+        Consider this structured data for {count} stocks:
+        {data}
+
+        Also consider signals and timing factors if provided.
+        Respond **ONLY with a JSON array**, one object per stock, each with fields:
+        - ticker: the stock ticker exactly as given
+        - buy_recommendation: true or false
+        - suggested_amount: numeric allocation
+        - rationale: short paragraph explaining reasoning
+        - optimal_timing: string if relevant, else null
+        """.format(budget=budget, count=len(stocks), data=json.dumps(stocks, default=str))
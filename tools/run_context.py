@@ -0,0 +1,95 @@
+# tools/run_context.py
+import copy
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class _Flight:
+    """One in-progress computation that other callers can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error: Optional[BaseException] = None
+
+
+class RunContext:
+    """
+    Memo shared by every agent and tool during one orchestrator run.
+    Upstream responses (Yahoo info, SEC ticker map, CIKs, ...) are fetched
+    once per (namespace, key) and reused for the rest of the run.
+    Concurrent callers asking for a key that is still being fetched wait
+    for that fetch instead of starting their own (single-flight).
+    Failures are not cached: callers waiting on them get the same error,
+    and later callers try again.
+    """
+
+    def __init__(self, run_id: Optional[str] = None):
+        self.run_id = run_id or f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        self._lock = threading.Lock()
+        self._values: Dict[tuple, Any] = {}
+        self._flights: Dict[tuple, _Flight] = {}
+        self.stats = {"hits": 0, "misses": 0, "waits": 0, "errors": 0}
+
+    def get_or_compute(self, namespace: str, key: Hashable, compute: Callable[[], Any]) -> Any:
+        full_key = (namespace, key)
+        with self._lock:
+            if full_key in self._values:
+                self.stats["hits"] += 1
+                return self._values[full_key]
+            flight = self._flights.get(full_key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[full_key] = _Flight()
+                self.stats["misses"] += 1
+            else:
+                self.stats["waits"] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = compute()
+        except BaseException as e:
+            flight.error = e
+            with self._lock:
+                self.stats["errors"] += 1
+            raise
+        else:
+            with self._lock:
+                self._values[full_key] = flight.value
+        finally:
+            with self._lock:
+                self._flights.pop(full_key, None)
+            flight.done.set()
+        return flight.value
+
+    def summary(self) -> Dict:
+        with self._lock:
+            return {"run_id": self.run_id, "entries": len(self._values), **self.stats}
+
+
+def _copy(value: Any) -> Any:
+    # DataFrames and arrays copy themselves (deep by default); everything else goes through deepcopy
+    if hasattr(value, "copy") and not isinstance(value, (dict, list, set)):
+        return value.copy()
+    return copy.deepcopy(value)
+
+
+def memoized(context: Optional[RunContext], namespace: str, key: Hashable, compute: Callable[[], Any],
+             copy_value: bool = True) -> Any:
+    """
+    compute() through the run context when one is set, else directly.
+    Every caller gets its own copy of the shared value, so mutating a result
+    can't leak into other agents; copy_value=False hands out the shared
+    object itself, for internal callers that only read it.
+    """
+    if context is None:
+        return compute()
+    value = context.get_or_compute(namespace, key, compute)
+    return _copy(value) if copy_value else value
@@ -0,0 +1,151 @@
+# tools/run_store.py
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS runs ("
+    " run_id TEXT PRIMARY KEY, created REAL, n_tickers INTEGER, llm_cost_usd REAL, params TEXT)",
+    "CREATE TABLE IF NOT EXISTS tickers ("
+    " run_id TEXT, ticker TEXT, created REAL, score REAL, price REAL, sector TEXT, market_cap REAL,"
+    " risk_flags TEXT, PRIMARY KEY (run_id, ticker))",
+    "CREATE TABLE IF NOT EXISTS signals ("
+    " run_id TEXT, ticker TEXT, created REAL, bullish_trend INTEGER, short_term_trend TEXT,"
+    " volume_spike INTEGER, pe_signal INTEGER, PRIMARY KEY (run_id, ticker))",
+    "CREATE TABLE IF NOT EXISTS timing ("
+    " run_id TEXT, ticker TEXT, created REAL, optimal_timing TEXT, confidence REAL, reasoning TEXT,"
+    " PRIMARY KEY (run_id, ticker))",
+    "CREATE TABLE IF NOT EXISTS recommendations ("
+    " run_id TEXT, ticker TEXT, created REAL, buy INTEGER, suggested_amount REAL, rationale TEXT,"
+    " fallback INTEGER, PRIMARY KEY (run_id, ticker))",
+    "CREATE TABLE IF NOT EXISTS allocations ("
+    " run_id TEXT, ticker TEXT, created REAL, weight_pct REAL, amount REAL, budget REAL,"
+    " PRIMARY KEY (run_id, ticker))",
+    "CREATE INDEX IF NOT EXISTS ix_runs_created ON runs (created)",
+    "CREATE INDEX IF NOT EXISTS ix_timing_call ON timing (optimal_timing, created)",
+]
+# Per-ticker tables carry the run time so "ticker over N days" is one index range scan
+for _table in ("tickers", "signals", "timing", "recommendations", "allocations"):
+    _SCHEMA.append(f"CREATE INDEX IF NOT EXISTS ix_{_table}_ticker ON {_table} (ticker, created)")
+    _SCHEMA.append(f"CREATE INDEX IF NOT EXISTS ix_{_table}_created ON {_table} (created)")
+
+DAY = 86400
+
+
+def _flag(value) -> Optional[int]:
+    return None if value is None else int(bool(value))
+
+
+class RunStore:
+    """
+    SQLite history of orchestrator runs, one row per (run, ticker) in each of
+    tickers / signals / timing / recommendations / allocations, indexed by
+    ticker and date so history queries never recompute anything.
+    """
+
+    def __init__(self, path: str = "downloads/runs.sqlite"):
+        self.path = path
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        for statement in _SCHEMA:
+            self._conn.execute(statement)
+        self._conn.commit()
+
+    # --- Writes ---
+    def record_run(self, output: Dict, created: Optional[float] = None, params: Optional[Dict] = None):
+        """Store one orchestrator output (all tables, one transaction)."""
+        run_id = output["run_id"]
+        created = time.time() if created is None else created
+        results = output.get("portfolio_results", [])
+
+        tickers, signals, timing, recommendations = [], [], [], []
+        for r in results:
+            ticker, data = r["ticker"], r.get("data") or {}
+            fundamentals = data.get("fundamentals") or {}
+            tickers.append((run_id, ticker, created, r.get("score"), data.get("price"), fundamentals.get("sector"),
+                            fundamentals.get("market_cap"), json.dumps(r.get("risk_flags", []))))
+            s = r.get("signals") or {}
+            signals.append((run_id, ticker, created, _flag(s.get("bullish_trend")), s.get("short_term_trend"),
+                            _flag(s.get("volume_spike")), _flag(s.get("pe_signal"))))
+            t = r.get("timing") or {}
+            timing.append((run_id, ticker, created, t.get("optimal_timing"), t.get("confidence"),
+                           t.get("reasoning")))
+            rec = r.get("recommendation") or {}
+            recommendations.append((run_id, ticker, created, _flag(rec.get("buy_recommendation")),
+                                    rec.get("suggested_amount"), rec.get("rationale"),
+                                    int(bool(rec.get("fallback")))))
+
+        cost = (output.get("llm_metrics") or {}).get("cost_usd")
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?)",
+                               (run_id, created, len(results), cost, json.dumps(params or {})))
+            self._conn.executemany("INSERT OR REPLACE INTO tickers VALUES (?, ?, ?, ?, ?, ?, ?, ?)", tickers)
+            self._conn.executemany("INSERT OR REPLACE INTO signals VALUES (?, ?, ?, ?, ?, ?, ?)", signals)
+            self._conn.executemany("INSERT OR REPLACE INTO timing VALUES (?, ?, ?, ?, ?, ?)", timing)
+            self._conn.executemany("INSERT OR REPLACE INTO recommendations VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                   recommendations)
+
+    def record_allocations(self, run_id: str, allocations: List[Dict], budget: float = 100):
+        """Store summarize_and_allocate rows ({'Ticker', 'Weight (%)', 'Allocation($)'}) for a run."""
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT created FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+            created = row["created"] if row else time.time()
+            self._conn.execute("DELETE FROM allocations WHERE run_id = ?", (run_id,))
+            self._conn.executemany(
+                "INSERT INTO allocations VALUES (?, ?, ?, ?, ?, ?)",
+                [(run_id, a["Ticker"], created, a.get("Weight (%)"), a.get("Allocation($)"), budget)
+                 for a in allocations],
+            )
+
+    # --- Queries ---
+    def _query(self, sql: str, params=()) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def runs(self, limit: int = 20) -> List[Dict]:
+        return self._query(
+            "SELECT run_id, datetime(created, 'unixepoch') AS time, n_tickers, llm_cost_usd FROM runs"
+            " ORDER BY created DESC LIMIT ?", (limit,))
+
+    def score_history(self, ticker: str, days: float = 90) -> List[Dict]:
+        """Scanner score and price per run for ticker over the last `days`, oldest first."""
+        return self._query(
+            "SELECT run_id, datetime(created, 'unixepoch') AS time, score, price FROM tickers"
+            " WHERE ticker = ? AND created >= ? ORDER BY created", (ticker, time.time() - days * DAY))
+
+    def recommendation_history(self, ticker: str, days: float = 90) -> List[Dict]:
+        """Timing call, confidence and LLM verdict per run for ticker, oldest first."""
+        return self._query(
+            "SELECT t.run_id, datetime(t.created, 'unixepoch') AS time, t.optimal_timing, t.confidence,"
+            " r.buy, r.suggested_amount, r.rationale"
+            " FROM timing t LEFT JOIN recommendations r ON r.run_id = t.run_id AND r.ticker = t.ticker"
+            " WHERE t.ticker = ? AND t.created >= ? ORDER BY t.created", (ticker, time.time() - days * DAY))
+
+    def buy_now_calls(self, days: float = 7, timing: str = "Buy now") -> List[Dict]:
+        """Every (run, ticker) the timing agent called `timing` in the last `days`, newest first."""
+        return self._query(
+            "SELECT t.run_id, t.ticker, datetime(t.created, 'unixepoch') AS time, t.confidence,"
+            " r.buy, r.rationale"
+            " FROM timing t LEFT JOIN recommendations r ON r.run_id = t.run_id AND r.ticker = t.ticker"
+            " WHERE t.optimal_timing = ? AND t.created >= ? ORDER BY t.created DESC",
+            (timing, time.time() - days * DAY))
+
+    def allocation_history(self, ticker: str, days: float = 90) -> List[Dict]:
+        return self._query(
+            "SELECT run_id, datetime(created, 'unixepoch') AS time, weight_pct, amount, budget FROM allocations"
+            " WHERE ticker = ? AND created >= ? ORDER BY created", (ticker, time.time() - days * DAY))
+
+    def delete_before(self, days: float):
+        """Drop runs older than `days` from every table."""
+        cutoff = time.time() - days * DAY
+        with self._lock, self._conn:
+            for table in ("tickers", "signals", "timing", "recommendations", "allocations", "runs"):
+                self._conn.execute(f"DELETE FROM {table} WHERE created < ?", (cutoff,))
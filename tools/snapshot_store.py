@@ -0,0 +1,100 @@
+# tools/snapshot_store.py
+import json
+import os
+import pickle
+import tempfile
+import time
+import zlib
+from typing import Any, Dict, List, Optional
+
+
+class SnapshotStore:
+    """
+    Versioned snapshots of finished orchestrator runs, for the UI to load
+    without recomputing anything.
+
+    Each snapshot is one file, snapshot-<version>.pkl.z (pickled, zlib-
+    compressed), and LATEST names the newest one. Both are written to a
+    temp file and os.replace()d into place, so a reader only ever sees a
+    complete snapshot, even while the scheduler is publishing the next one.
+    """
+
+    LATEST = "LATEST"
+
+    def __init__(self, root: str = "downloads/snapshots", keep: int = 48, compress_level: int = 6):
+        self.root = root
+        self.keep = keep
+        self.compress_level = compress_level
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, version: str) -> str:
+        return os.path.join(self.root, f"snapshot-{version}.pkl.z")
+
+    def _write_atomic(self, path: str, data: bytes):
+        fd, tmp = tempfile.mkstemp(dir=self.root, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    def publish(self, output: Dict, allocation: Optional[Dict] = None) -> str:
+        """Store an orchestrator output (plus optional precomputed allocation); returns its version."""
+        created = time.time()
+        version = f"{time.strftime('%Y%m%dT%H%M%S', time.localtime(created))}-{output.get('run_id', 'run')}"
+        snapshot = {
+            "version": version,
+            "created": created,
+            "run_id": output.get("run_id"),
+            "output": output,
+            "allocation": allocation,
+        }
+        blob = zlib.compress(pickle.dumps(snapshot, protocol=pickle.HIGHEST_PROTOCOL), self.compress_level)
+        self._write_atomic(self._path(version), blob)
+        pointer = {"version": version, "created": created, "tickers": len(output.get("portfolio_results", []))}
+        self._write_atomic(os.path.join(self.root, self.LATEST), json.dumps(pointer).encode())
+        self.prune()
+        return version
+
+    def versions(self) -> List[str]:
+        """Stored versions, oldest first (versions sort by creation time)."""
+        names = [n for n in os.listdir(self.root) if n.startswith("snapshot-") and n.endswith(".pkl.z")]
+        return sorted(n[len("snapshot-"):-len(".pkl.z")] for n in names)
+
+    def latest_version(self) -> Optional[str]:
+        try:
+            with open(os.path.join(self.root, self.LATEST)) as f:
+                version = json.load(f)["version"]
+            if os.path.exists(self._path(version)):
+                return version
+        except (OSError, ValueError, KeyError):
+            pass
+        versions = self.versions()
+        return versions[-1] if versions else None
+
+    def load(self, version: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(version), "rb") as f:
+                return pickle.loads(zlib.decompress(f.read()))
+        except Exception as e:
+            print(f"[SnapshotStore] Could not load snapshot {version}: {e}")
+            return None
+
+    def latest(self) -> Optional[Dict[str, Any]]:
+        version = self.latest_version()
+        return self.load(version) if version else None
+
+    def prune(self):
+        """Drop all but the newest `keep` snapshots."""
+        latest = self.latest_version()
+        for version in self.versions()[:-self.keep or None]:
+            if version != latest:
+                try:
+                    os.remove(self._path(version))
+                except OSError:
+                    pass
@@ -0,0 +1,162 @@
+# tools/streaming_indicators.py
+from collections import deque
+from typing import Optional, Dict
+
+
+class RollingMean:
+    """
+    Moving average over the last `window` values, updated in O(1) with a running sum.
+    Before the window fills, it averages whatever has been seen (like closes[-50:]).
+    """
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values = deque(maxlen=window)
+        self.total = 0.0
+
+    @property
+    def count(self) -> int:
+        return len(self.values)
+
+    @property
+    def value(self) -> Optional[float]:
+        return self.total / len(self.values) if self.values else None
+
+    def update(self, x: float) -> Optional[float]:
+        """Append a new bar."""
+        if len(self.values) == self.window:
+            self.total -= self.values[0]
+        self.values.append(x)
+        self.total += x
+        return self.value
+
+    def replace_last(self, x: float) -> Optional[float]:
+        """Revise the latest bar (intrabar tick)."""
+        if not self.values:
+            return self.update(x)
+        self.total += x - self.values[-1]
+        self.values[-1] = x
+        return self.value
+
+    def to_dict(self) -> Dict:
+        return {"type": "RollingMean", "window": self.window, "values": list(self.values)}
+
+    @classmethod
+    def from_dict(cls, d: Dict) -> "RollingMean":
+        obj = cls(d["window"])
+        for x in d["values"]:
+            obj.update(x)
+        return obj
+
+
+class RollingVariance:
+    """
+    Windowed Welford variance: mean and sample variance of the last `window`
+    values, updated in O(1) per bar without re-summing the window.
+    """
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values = deque(maxlen=window)
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    @property
+    def count(self) -> int:
+        return len(self.values)
+
+    @property
+    def variance(self) -> Optional[float]:
+        n = len(self.values)
+        return max(self.m2, 0.0) / (n - 1) if n > 1 else None
+
+    @property
+    def std(self) -> Optional[float]:
+        var = self.variance
+        return var ** 0.5 if var is not None else None
+
+    def _add(self, x: float):
+        n = len(self.values)  # count including x
+        delta = x - self.mean
+        self.mean += delta / n
+        self.m2 += delta * (x - self.mean)
+
+    def _remove(self, y: float):
+        n = len(self.values)  # count excluding y
+        if n == 0:
+            self.mean, self.m2 = 0.0, 0.0
+            return
+        delta = y - self.mean
+        self.mean -= delta / n
+        self.m2 -= delta * (y - self.mean)
+
+    def update(self, x: float) -> Optional[float]:
+        """Append a new bar."""
+        if len(self.values) == self.window:
+            oldest = self.values.popleft()
+            self._remove(oldest)
+        self.values.append(x)
+        self._add(x)
+        return self.variance
+
+    def replace_last(self, x: float) -> Optional[float]:
+        """Revise the latest bar (intrabar tick)."""
+        if not self.values:
+            return self.update(x)
+        last = self.values.pop()
+        self._remove(last)
+        self.values.append(x)
+        self._add(x)
+        return self.variance
+
+    def to_dict(self) -> Dict:
+        return {"type": "RollingVariance", "window": self.window, "values": list(self.values)}
+
+    @classmethod
+    def from_dict(cls, d: Dict) -> "RollingVariance":
+        obj = cls(d["window"])
+        for x in d["values"]:
+            obj.update(x)
+        return obj
+
+
+class EMA:
+    """Exponential moving average with smoothing 2 / (span + 1), seeded with the first value."""
+
+    def __init__(self, span: int):
+        self.span = span
+        self.alpha = 2.0 / (span + 1)
+        self.value: Optional[float] = None
+        self.prev: Optional[float] = None  # value before the latest bar, for replace_last
+        self.count = 0
+
+    def update(self, x: float) -> float:
+        """Append a new bar."""
+        self.prev = self.value
+        self.value = x if self.value is None else self.alpha * x + (1 - self.alpha) * self.value
+        self.count += 1
+        return self.value
+
+    def replace_last(self, x: float) -> float:
+        """Revise the latest bar (intrabar tick)."""
+        if self.count == 0:
+            return self.update(x)
+        self.value = x if self.prev is None else self.alpha * x + (1 - self.alpha) * self.prev
+        return self.value
+
+    def to_dict(self) -> Dict:
+        return {"type": "EMA", "span": self.span, "value": self.value, "prev": self.prev, "count": self.count}
+
+    @classmethod
+    def from_dict(cls, d: Dict) -> "EMA":
+        obj = cls(d["span"])
+        obj.value, obj.prev, obj.count = d["value"], d["prev"], d["count"]
+        return obj
+
+
+INDICATOR_TYPES = {"RollingMean": RollingMean, "RollingVariance": RollingVariance, "EMA": EMA}
+
+
+def indicator_from_dict(d: Dict):
+    """Restore any streaming indicator from its to_dict() state."""
+    return INDICATOR_TYPES[d["type"]].from_dict(d)
@@ -0,0 +1,207 @@
+# tools/tracing.py
+"""
+Lightweight span tracing for orchestrator runs.
+
+    from tools.tracing import tracer, traced
+
+    @traced("yahoo.info", source="yahoo")
+    def get_info(self, symbol): ...
+
+    with tracer.span("orchestrator.scan", ticker="AAPL"):
+        ...
+
+Disabled by default (or enable with STOCK_AGENT_TRACE=1); a disabled span is
+a single attribute check. Spans export as Chrome trace / Perfetto JSON
+(open in chrome://tracing or ui.perfetto.dev) and as a summary table.
+"""
+import asyncio
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+_parent = contextvars.ContextVar("trace_parent", default=None)
+
+
+def _ticker_of(args, index: Optional[int] = 1) -> Optional[str]:
+    """Best-effort ticker tag from a positional argument (a symbol or a dict with "ticker")."""
+    if index is None or len(args) <= index:
+        return None
+    first = args[index]
+    if isinstance(first, str):
+        return first
+    if isinstance(first, dict):
+        return first.get("ticker")
+    return None
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "tags", "start", "token", "tid")
+
+    def __init__(self, tracer, name: str, tags: Dict):
+        self.tracer = tracer
+        self.name = name
+        self.tags = tags
+
+    def __enter__(self):
+        self.tags["parent"] = _parent.get()
+        self.token = _parent.set(self.name)
+        task = None
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            pass
+        # Coroutines interleave on one thread, so give each task its own track
+        self.tid = id(task) if task is not None else threading.get_ident()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        _parent.reset(self.token)
+        if exc_type is not None:
+            self.tags["error"] = exc_type.__name__
+        self.tracer._record(self.name, self.start, end, self.tid, self.tags)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    """Collects finished spans as (name, start, end, track id, tags) tuples."""
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.spans: List[tuple] = []
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def enable(self, reset: bool = True):
+        if reset:
+            self.reset()
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self.spans = []
+            self._origin = time.perf_counter()
+
+    def span(self, name: str, **tags):
+        """Context manager timing one unit of work; tags (ticker, source, ...) go into the trace args."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, tags)
+
+    def _record(self, name: str, start: float, end: float, tid: int, tags: Dict):
+        with self._lock:
+            self.spans.append((name, start, end, tid, tags))
+
+    # --- Export ---
+    def chrome_trace(self) -> Dict:
+        """Spans as Chrome trace events ("X" complete events, microseconds)."""
+        pid = os.getpid()
+        events = []
+        for name, start, end, tid, tags in list(self.spans):
+            events.append({
+                "name": name,
+                "cat": tags.get("source") or name.split(".")[0],
+                "ph": "X",
+                "ts": round((start - self._origin) * 1e6, 1),
+                "dur": round((end - start) * 1e6, 1),
+                "pid": pid,
+                "tid": tid,
+                "args": {k: v for k, v in tags.items() if v is not None},
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export_chrome_trace(self, path: str) -> str:
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.chrome_trace(), f, default=str)
+        return path
+
+    def summary(self, by: str = "name", top: Optional[int] = None) -> List[Dict]:
+        """
+        Aggregate span durations grouped by "name", "source" or "ticker":
+        count, total/mean/p95/max seconds, sorted by total time.
+        """
+        groups: Dict[str, List[float]] = {}
+        for name, start, end, _, tags in list(self.spans):
+            key = name if by == "name" else tags.get(by)
+            if key is None:
+                continue
+            groups.setdefault(key, []).append(end - start)
+
+        rows = []
+        for key, durations in groups.items():
+            durations.sort()
+            rows.append({
+                by: key,
+                "count": len(durations),
+                "total_s": round(sum(durations), 4),
+                "mean_s": round(sum(durations) / len(durations), 4),
+                "p95_s": round(durations[min(len(durations) - 1, int(0.95 * (len(durations) - 1) + 0.5))], 4),
+                "max_s": round(durations[-1], 4),
+            })
+        rows.sort(key=lambda r: -r["total_s"])
+        return rows[:top] if top else rows
+
+    def format_summary(self, by: str = "name", top: Optional[int] = 20) -> str:
+        rows = self.summary(by, top)
+        if not rows:
+            return "(no spans recorded)"
+        width = max(len(str(r[by])) for r in rows + [{by: by}])
+        lines = [f"{by:<{width}}  {'count':>6}  {'total_s':>9}  {'mean_s':>8}  {'p95_s':>8}  {'max_s':>8}"]
+        for r in rows:
+            lines.append(f"{str(r[by]):<{width}}  {r['count']:>6}  {r['total_s']:>9.3f}  "
+                         f"{r['mean_s']:>8.4f}  {r['p95_s']:>8.4f}  {r['max_s']:>8.4f}")
+        return "\n".join(lines)
+
+
+tracer = Tracer(enabled=os.getenv("STOCK_AGENT_TRACE", "").lower() in ("1", "true", "yes"))
+
+
+def traced(name: Optional[str] = None, source: Optional[str] = None, ticker_arg: Optional[int] = 1):
+    """
+    Decorator that wraps a method (sync or async) in a span, tagged with the
+    ticker found at positional index ticker_arg (1 = first argument after
+    self; None = untagged). Costs one flag check when disabled.
+    """
+    def decorator(fn):
+        span_name = name or fn.__qualname__
+
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                if not tracer.enabled:
+                    return await fn(*args, **kwargs)
+                with tracer.span(span_name, ticker=_ticker_of(args, ticker_arg), source=source):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return fn(*args, **kwargs)
+            with tracer.span(span_name, ticker=_ticker_of(args, ticker_arg), source=source):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -1,58 +1,96 @@
 # tools/yahoo_finance_tool.py
+import asyncio
 import yfinance as yf
 import pandas as pd
 from typing import Optional, Dict
+from tools.run_context import RunContext, memoized
+from tools.tracing import traced
 
 class YahooFinanceTool:
     """
     A wrapper around the yfinance library for fetching stock data
-    without API keys.
+    without API keys. With a RunContext set, each upstream response is
+    fetched once per run and shared by every caller.
     """
 
-    def __init__(self):
-        pass  # no config needed
+    def __init__(self, context: Optional[RunContext] = None):
+        self.context = context
 
-    def get_price_history(self, symbol: str, period: str = "6mo", interval: str = "1d") -> list:
-        import yfinance as yf
+    @traced("yahoo.info", source="yahoo")
+    def get_info(self, symbol: str) -> Dict:
+        """yfinance Ticker.info (raises on failure, like yfinance)."""
+        return memoized(self.context, "yahoo_info", symbol, lambda: yf.Ticker(symbol).info)
 
+    def get_price_history(self, symbol: str, period: str = "6mo", interval: str = "1d") -> list:
         try:
-            df = yf.download(symbol, period=period, interval=interval, progress=False)
-            if df.empty:
-                print(f"[YahooFinanceTool] No data found for {symbol}")
-                return []
-
-            # Flatten MultiIndex columns if present
-            if isinstance(df.columns, pd.MultiIndex):
-                df.columns = ["_".join(col).strip() for col in df.columns.values]
-
-            # Rename standard columns
-            df.rename(
-                columns={
-                    "Open": "open",
-                    "High": "high",
-                    "Low": "low",
-                    "Close": "close",
-                    "Adj Close": "adj_close",
-                    "Volume": "volume",
-                },
-                inplace=True,
-            )
-
-            df = df.reset_index()
-            price_history = df.to_dict(orient="records")
-            return price_history
-
+            # Failures raise inside, so only a successful download is memoized
+            return memoized(self.context, "yahoo_price_history", (symbol, period, interval),
+                            lambda: self._download_price_history(symbol, period, interval))
         except Exception as e:
             print(f"[YahooFinanceTool] Failed to fetch price history for {symbol}: {e}")
             return []
 
+    @traced("yahoo.price_history", source="yahoo")
+    def _download_price_history(self, symbol: str, period: str, interval: str) -> list:
+        df = yf.download(symbol, period=period, interval=interval, progress=False)
+        if df.empty:
+            # yfinance reports most download errors as an empty frame
+            raise ValueError("No data found")
+
+        # Flatten MultiIndex columns if present
+        if isinstance(df.columns, pd.MultiIndex):
+            df.columns = ["_".join(col).strip() for col in df.columns.values]
+
+        # Rename standard columns
+        df.rename(
+            columns={
+                "Open": "open",
+                "High": "high",
+                "Low": "low",
+                "Close": "close",
+                "Adj Close": "adj_close",
+                "Volume": "volume",
+            },
+            inplace=True,
+        )
+
+        df = df.reset_index()
+        return df.to_dict(orient="records")
+
+    def get_price_matrix(self, symbols: list, period: str = "10y", interval: str = "1d") -> Optional[Dict]:
+        """
+        Download daily bars for many tickers in one request.
+        Returns: dict with tickers, dates and (tickers x bars) close/volume
+        NumPy matrices (NaN where a ticker has no bar), or None on failure.
+        """
+        try:
+            # Failures raise inside, so only a successful download is memoized
+            return memoized(self.context, "yahoo_price_matrix", (tuple(symbols), period, interval),
+                            lambda: self._download_price_matrix(symbols, period, interval))
+        except Exception as e:
+            print(f"[YahooFinanceTool] Failed to fetch price matrix: {e}")
+            return None
+
+    @traced("yahoo.price_matrix", source="yahoo")
+    def _download_price_matrix(self, symbols: list, period: str, interval: str) -> Dict:
+        df = yf.download(symbols, period=period, interval=interval, progress=False, group_by="column")
+        if df.empty:
+            raise ValueError(f"No data found for {len(symbols)} symbols")
+        closes = df["Close"].reindex(columns=symbols)
+        volumes = df["Volume"].reindex(columns=symbols)
+        return {
+            "tickers": list(symbols),
+            "dates": df.index.to_numpy(dtype="datetime64[D]"),
+            "closes": closes.to_numpy(dtype=float).T,
+            "volumes": volumes.to_numpy(dtype=float).T,
+        }
+
     def get_fundamentals(self, symbol: str) -> Optional[Dict]:
         """
         Fetch basic fundamentals & company info.
         Returns: dict with PE ratio, market cap, etc.
         """
-        ticker = yf.Ticker(symbol)
-        info = ticker.info
+        info = self.get_info(symbol)
         if not info or "shortName" not in info:
             return None
         fundamentals = {
@@ -68,25 +106,47 @@ class YahooFinanceTool:
         }
         return fundamentals
 
+    @traced("yahoo.recommendations", source="yahoo")
     def get_recommendations(self, symbol: str) -> Optional[pd.DataFrame]:
         """
         Fetch analyst recommendations for a ticker.
         Returns: DataFrame with date, rating, firm, etc.
         """
-        ticker = yf.Ticker(symbol)
-        recs = ticker.recommendations
+        recs = memoized(self.context, "yahoo_recommendations", symbol, lambda: yf.Ticker(symbol).recommendations)
         if recs is None or recs.empty:
             return None
         return recs.tail(10)  # last 10 recommendations
 
     def get_current_price(self, ticker: str):
         try:
-            return yf.Ticker(ticker).info.get("currentPrice", None)
+            return self.get_info(ticker).get("currentPrice", None)
         except:
             return None
 
     def get_summary(self, ticker: str):
         try:
-            return yf.Ticker(ticker).info
+            return self.get_info(ticker)
         except:
             return {}
+
+    # --- Async variants: yfinance blocks, so each call runs in the default executor ---
+    async def aget_info(self, symbol: str) -> Dict:
+        return await asyncio.to_thread(self.get_info, symbol)
+
+    async def aget_price_history(self, symbol: str, period: str = "6mo", interval: str = "1d") -> list:
+        return await asyncio.to_thread(self.get_price_history, symbol, period, interval)
+
+    async def aget_price_matrix(self, symbols: list, period: str = "10y", interval: str = "1d") -> Optional[Dict]:
+        return await asyncio.to_thread(self.get_price_matrix, symbols, period, interval)
+
+    async def aget_fundamentals(self, symbol: str) -> Optional[Dict]:
+        return await asyncio.to_thread(self.get_fundamentals, symbol)
+
+    async def aget_recommendations(self, symbol: str) -> Optional[pd.DataFrame]:
+        return await asyncio.to_thread(self.get_recommendations, symbol)
+
+    async def aget_current_price(self, ticker: str):
+        return await asyncio.to_thread(self.get_current_price, ticker)
+
+    async def aget_summary(self, ticker: str):
+        return await asyncio.to_thread(self.get_summary, ticker)
@@ -6,12 +6,13 @@ import pandas as pd
 import plotly.express as px
 import matplotlib.pyplot as plt
 from matplotlib_venn import venn2
-from pathlib import Path
 from dotenv import load_dotenv
 import os
 
 from agents.portfolio_orchestrator import PortfolioOrchestrator
+from agents.recommendation_agent import RecommendationAgent
 from tools.edgar import EdgarTool
+from tools.snapshot_store import SnapshotStore
 
 # --- Load environment variables ---
 load_dotenv()
@@ -20,16 +21,59 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 st.set_page_config(page_title="Agentic Stock Picker", layout="wide")
 st.title("📈 Agentic Fund Manager")
 
-# --- Run Portfolio Analysis Button ---
+# --- Latest precomputed snapshot (published by scheduler.py), or a fresh run ---
 st.sidebar.markdown("### Portfolio Picks")
-run_button = st.sidebar.button("Run Analysis")
+run_button = st.sidebar.button("Refresh now")
+snapshots = SnapshotStore()
+results = None
+precomputed_allocation = None
+
+
+@st.cache_data(show_spinner=False)
+def load_snapshot(version):
+    return snapshots.load(version)
+
+
+def load_holdings(ticker):
+    # Served from the EDGAR holdings cache (not st.cache_data, so an empty
+    # result from a failed lookup isn't pinned for the session); only a new
+    # filing is downloaded and parsed
+    try:
+        return EdgarTool(user_agent="MyStockApp/0.1 (email@example.com)").get_holdings(ticker)
+    except Exception as e:
+        st.warning(f"13F holdings unavailable for {ticker}: {e}")
+        return []
+
 
 if run_button:
     st.info("Running portfolio analysis...")
 
     orchestrator = PortfolioOrchestrator()
-    results = orchestrator.run([])  # Market scanner determines best tickers
 
+    # --- Live recommendations (rationale streams in as the LLM writes it) ---
+    st.subheader("Live Recommendations")
+    live_recs = st.container()
+    live_placeholders = {}
+
+    def show_partial(ticker, partial):
+        if ticker not in live_placeholders:
+            live_placeholders[ticker] = live_recs.empty()
+        verdict = partial.get("buy_recommendation")
+        label = "✅ Buy" if verdict is True else ("❌ Pass" if verdict is False else "…")
+        live_placeholders[ticker].markdown(f"**{ticker}** {label}: {partial.get('rationale', '')}")
+
+    results = orchestrator.run(on_partial=show_partial)  # Market scanner determines best tickers
+else:
+    latest_version = snapshots.latest_version()
+    snapshot = load_snapshot(latest_version) if latest_version else None
+    if snapshot:
+        results = snapshot["output"]
+        precomputed_allocation = snapshot.get("allocation")
+        st.sidebar.caption(f"Snapshot from {time.strftime('%Y-%m-%d %H:%M', time.localtime(snapshot['created']))}")
+    else:
+        st.info("No snapshot yet. Click \"Refresh now\" or start `python scheduler.py`.")
+
+if results is not None:
     portfolio_results = results["portfolio_results"]
     market_scan = results.get("aggregated_ui", {})
 
@@ -74,22 +118,18 @@ if run_button:
                 else:
                     st.info(f"No price history available for {stock['ticker']}")
 
-    # --- 13F Filings Viewer ---
+    # --- 13F Filings Viewer (fetched only when a panel is opened, then cached) ---
     st.subheader("13F Filings (Parsed)")
-    edgar = EdgarTool(user_agent="MyStockApp/0.1 (email@example.com)")
     for stock in portfolio_results:
-        filings_dir = Path("downloads/edgar") / stock["ticker"]
-        if filings_dir.exists() and any(filings_dir.iterdir()):
-            latest_file = max(filings_dir.iterdir(), key=lambda f: f.stat().st_mtime)
-            holdings = edgar.parse_13f_file(latest_file)
+        with st.expander(f"{stock['ticker']} 13F Holdings"):
+            if not st.toggle("Load 13F holdings", key=f"13f_{stock['ticker']}"):
+                continue
+            with st.spinner(f"Loading 13F holdings for {stock['ticker']}..."):
+                holdings = load_holdings(stock["ticker"])
             if holdings:
-                st.markdown(f"**{stock['ticker']} Holdings:**")
-                df = pd.DataFrame(holdings)
-                st.dataframe(df, height=400)
+                st.dataframe(pd.DataFrame(holdings), height=400)
             else:
                 st.info(f"No holdings found in the 13F filing for {stock['ticker']}")
-        else:
-            st.info(f"No filings found for {stock['ticker']}")
 
     # --- Chain of Thought / Data Flow ---
     # st.subheader("🧠 Agent Chain of Thought / Data Flow")
@@ -175,29 +215,21 @@ if run_button:
     st.subheader("📊 Portfolio Summary & Capital Allocation ($100 budget)")
 
     # Filter only buy-recommended stocks
-    buy_stocks = [s for s in portfolio_results if s.get("recommendation", {}).get("buy_recommendation")]
-
-    if buy_stocks:
-        summary_input = []
-        for stock in buy_stocks:
-            summary_input.append({
-                "ticker": stock["ticker"],
-                "price": stock["data"].get("price"),
-                "sector": stock["data"].get("fundamentals", {}).get("sector"),
-                "market_cap": stock["data"].get("fundamentals", {}).get("market_cap"),
-                "signals": stock.get("signals", {}),
-                "rationale": stock.get("recommendation", {}).get("rationale")
-            })
-
-        from agents.recommendation_agent import RecommendationAgent
-
-        rec_agent = RecommendationAgent()
-
-        # Get summary and allocations (total budget = 100)
-        summary_text, allocations = rec_agent.summarize_and_allocate(summary_input, total_budget=100)
+    summary_input = RecommendationAgent.buy_stock_inputs(portfolio_results)
 
+    if summary_input:
         st.markdown("**Reasoning & Summary:**")
-        st.markdown(summary_text)
+        summary_box = st.empty()
+        if precomputed_allocation is not None:
+            summary_text, allocations = precomputed_allocation["summary"], precomputed_allocation["allocations"]
+        else:
+            rec_agent = RecommendationAgent()
+
+            # Get summary and allocations (total budget = 100); the summary streams into its box
+            summary_text, allocations = rec_agent.summarize_and_allocate(summary_input, total_budget=100,
+                                                                         on_summary=summary_box.markdown)
+            precomputed_allocation = {"budget": 100, "summary": summary_text, "allocations": allocations}
+        summary_box.markdown(summary_text)
 
         if allocations:
             # --- Display allocations table ---
@@ -216,6 +248,13 @@ if run_button:
     else:
         st.info("No stocks selected for purchase in this analysis.")
 
+    # A manual refresh becomes the latest snapshot for every session
+    if run_button:
+        snapshots.publish(results, precomputed_allocation)
+        if orchestrator.runs is not None and precomputed_allocation:
+            orchestrator.runs.record_allocations(results["run_id"], precomputed_allocation["allocations"],
+                                                 precomputed_allocation["budget"])
+
     # --- Agent Data Flow Animation ---
 
     st.subheader("🧠 Agent Chain-of-Thought / Data Flow")